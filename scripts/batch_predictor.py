@@ -1,78 +1,463 @@
 import pandas as pd
+import numpy as np
 import joblib
-from sklearn.preprocessing import LabelEncoder
+import io
+import os
+import sys
+import json
+import time
+import argparse
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from feature_pipeline import FeaturePipeline
+from feature_store import FrequencyFeatureStore
+from parallel_scoring import scoring_pool, ordered_map, set_worker_model, worker_model, default_workers
+from dataset_io import iter_dataset_batches, COLUMNAR_FORMATS
+
+# Identifier columns are always read as strings, so every chunk has the same column types
+STRING_COLUMNS = {'user_id': str, 'timestamp': str, 'ip_address': str, 'geo_location': str, 'device_id': str}
+
+# Fields the login frequency features are counted on
+COUNT_FIELDS = [field for field, _ in FrequencyFeatureStore.ENTITIES.values()]
+
+
+def read_chunks(stream, input_format='csv', chunk_size=100000, header=None):
+    """
+    Read a CSV or NDJSON byte stream in chunks of chunk_size lines, without parsing them.
+
+    Yields (header, chunk bytes, bytes consumed) so callers can checkpoint
+    the byte offset after each chunk. The CSV header line is read from the
+    stream (and yielded alone, with chunk bytes None) unless given, as when
+    resuming mid-file. Records must not span lines (no quoted newlines in
+    CSV fields).
+    """
+    if input_format == 'csv' and header is None:
+        header = stream.readline()
+        yield header, None, len(header)
+    while True:
+        lines = []
+        for line in stream:
+            lines.append(line)
+            if len(lines) >= chunk_size:
+                break
+        if not lines:
+            return
+        yield header, b''.join(lines), sum(map(len, lines))
+
+
+def parse_chunk(header, data, input_format='csv', usecols=None):
+    """
+    Parse one chunk from read_chunks() into a DataFrame (chunks read from
+    Parquet/Feather are DataFrames already).
+
+    NDJSON lines that are not valid JSON become empty rows, which are
+    reported as missing all required fields.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data[usecols] if usecols else data
+    if input_format == 'csv':
+        return pd.read_csv(io.BytesIO(header + data), dtype=STRING_COLUMNS,
+                           usecols=(lambda column: column in usecols) if usecols else None)
+    records = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        records.append(record if isinstance(record, dict) else {})
+    df = pd.DataFrame.from_records(records)
+    for column in STRING_COLUMNS:
+        if column in df:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+def iter_chunks(stream, input_format='csv', chunk_size=100000, header=None):
+    """
+    read_chunks() with every chunk parsed: yields (DataFrame, bytes consumed),
+    with DataFrame None for the CSV header line
+    """
+    for header, data, consumed in read_chunks(stream, input_format, chunk_size, header):
+        yield (parse_chunk(header, data, input_format) if data is not None else None), consumed
+
+
+def count_logins(feature_store, df):
+    """
+    Record the logins of a chunk in the feature store and return their
+    frequency columns (one array per column, in row order)
+    """
+    keys = df.reindex(columns=COUNT_FIELDS)
+    keys = keys.astype(object).where(keys.notna(), None)
+    return {column: np.asarray(values) for column, values in feature_store.observe(keys.to_dict('records')).items()}
+
+
+def score_frame(model, pipeline, df, update_counts=True, frequencies=None):
+    """
+    Score a DataFrame of logins; returns its input columns plus the prediction
+    columns, and {row position: error message} for rows that could not be scored.
+
+    frequencies are the login frequency columns when they were counted
+    beforehand (see count_logins); otherwise they come from the pipeline's
+    feature store, updated with the chunk unless update_counts is False.
+    Unscorable rows (bad timestamp, missing or non-numeric fields) get
+    is_anomaly_predicted = -1 and NaN probabilities.
+    """
+    columns = list(df.columns)
+    errors = {}
+    try:
+        if frequencies is not None:
+            for column, values in frequencies.items():
+                df[column] = values
+            features = pipeline.transform_frame(df, counts='frame')
+        else:
+            features = pipeline.transform_frame(df, update_counts=update_counts)
+        features = features.to_numpy(dtype=np.float32)
+        positions = np.arange(len(df))
+    except (ValueError, KeyError, TypeError):
+        # Some row is malformed: score the chunk record by record to isolate it
+        records = df[columns].replace({np.nan: None}).to_dict('records')
+        features, positions, errors = pipeline.transform_records(records, update_counts=update_counts,
+                                                                  frequencies=frequencies)
+
+    result = df[columns].copy()
+    labels = np.full(len(df), -1, dtype=np.int64)
+    probabilities = np.full((len(df), 2), np.nan)
+    if len(positions):
+        # One traversal: the label is the class with the highest probability, as model.predict does
+        probabilities[positions] = model.predict_proba(features)
+        labels[positions] = model.classes_.take(np.argmax(probabilities[positions], axis=1))
+    result['is_anomaly_predicted'] = labels
+    result['probability_normal'] = probabilities[:, 0]
+    result['probability_anomaly'] = probabilities[:, 1]
+    return result, errors
+
+
+def encode_chunk(result, output_format, part_path=None):
+    """
+    Serialize a scored chunk: CSV rows without the header, NDJSON lines, or a
+    Parquet part file written to part_path (returning no bytes)
+    """
+    if output_format == 'parquet':
+        result.to_parquet(part_path, index=False)
+        return None
+    if output_format == 'csv':
+        return result.to_csv(index=False, header=False).encode('utf-8')
+    data = result.to_json(orient='records', lines=True)
+    if data and not data.endswith('\n'):
+        data += '\n'
+    return data.encode('utf-8')
+
+
+def score_task(task):
+    """
+    Parse, score and serialize one chunk; runs in a pool worker or in-process
+    """
+    model, pipeline = worker_model()
+    df = parse_chunk(task['header'], task['data'], task['input_format'])
+    result, errors = score_frame(model, pipeline, df, task['update_counts'], task['frequencies'])
+    return {
+        'data': encode_chunk(result, task['output_format'], task['part_path']),
+        'columns': list(result.columns),
+        'rows': len(result),
+        'anomalies': int((result['is_anomaly_predicted'] == 1).sum()),
+        'error_count': len(errors),
+        'errors': list(errors.items())[:3]
+    }
+
+
+class ChunkWriter:
+    """
+    Appends scored chunks to a CSV or NDJSON file, or to a directory of
+    Parquet part files (one per chunk, needs pyarrow).
+
+    offset() is the resume position recorded in checkpoints: the file size
+    for CSV/NDJSON, the number of part files for Parquet. Parts are numbered
+    in chunk order from 0, so opening with an offset keeps parts 0 to
+    offset - 1 and drops anything written after that checkpoint.
+    """
+
+    FORMATS = ('csv', 'ndjson', 'parquet')
+
+    def __init__(self, path, output_format='csv', offset=0):
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Unknown output format: {output_format!r} (expected one of {', '.join(self.FORMATS)})")
+        self.path = path
+        self.output_format = output_format
+        self.parts = 0
+        self.file = None
+        if output_format == 'parquet':
+            if path == '-':
+                raise ValueError('Parquet output needs a directory, not stdout')
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError('Parquet output requires pyarrow (pip install pyarrow)')
+            os.makedirs(path, exist_ok=True)
+            self.parts = offset
+            for name in os.listdir(path):
+                if name.startswith('part-') and name[5:10].isdigit() and int(name[5:10]) >= offset:
+                    os.remove(os.path.join(path, name))
+        elif path == '-':
+            self.file = sys.stdout.buffer
+        else:
+            self.file = open(path, 'r+b' if offset and os.path.exists(path) else 'wb')
+            if offset:
+                self.file.seek(offset)
+                self.file.truncate()
+        self.header_written = offset > 0
+
+    def part_path(self, number=None):
+        """
+        Path of Parquet part file number (default: the next one to write)
+        """
+        return os.path.join(self.path, f'part-{self.parts if number is None else number:05d}.parquet')
+
+    def write(self, df):
+        data = encode_chunk(df, self.output_format, self.part_path() if self.output_format == 'parquet' else None)
+        self.write_encoded(data, list(df.columns))
+
+    def write_encoded(self, data, columns):
+        """
+        Append a chunk serialized by encode_chunk()
+        """
+        if self.output_format == 'parquet':
+            self.parts += 1
+            return
+        if self.output_format == 'csv' and not self.header_written:
+            data = pd.DataFrame(columns=columns).to_csv(index=False).encode('utf-8') + data
+        self.file.write(data)
+        self.header_written = True
+        self.file.flush()
+        if self.path != '-' and os.path.isfile(self.path):
+            os.fsync(self.file.fileno())
+
+    def offset(self):
+        if self.output_format == 'parquet':
+            return self.parts
+        return self.file.tell() if self.path != '-' else None
+
+    def close(self):
+        if self.file is not None and self.path != '-':
+            self.file.close()
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
 class BatchAnomalyDetector:
-    def __init__(self):
+    def __init__(self, model_path='anomaly_detection_model.pkl', pipeline_path='feature_pipeline.pkl'):
         # Load the trained model and encoders
-        self.model = joblib.load('anomaly_detection_model.pkl')
-        self.geo_encoder = joblib.load('geo_encoder.pkl')
-        self.device_encoder = joblib.load('device_encoder.pkl')
-        
+        self.model_path = model_path
+        self.pipeline_path = pipeline_path
+        self.model = joblib.load(model_path)
+        self.pipeline = FeaturePipeline.load(pipeline_path)
+
     def preprocess_data(self, df):
         """
         Preprocess the input data for prediction
         """
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Extract time-based features
-        df['login_hour'] = df['timestamp'].dt.hour
-        df['login_day'] = df['timestamp'].dt.day
-        df['login_month'] = df['timestamp'].dt.month
-        df['login_year'] = df['timestamp'].dt.year
-        df['login_weekday'] = df['timestamp'].dt.weekday
-        
-        # Encode categorical variables (handle unseen categories)
-        df['geo_location_encoded'] = df['geo_location'].apply(
-            lambda x: self.geo_encoder.transform([x])[0] if x in self.geo_encoder.classes_ else -1
-        )
-        
-        df['device_id_encoded'] = df['device_id'].apply(
-            lambda x: self.device_encoder.transform([x])[0] if x in self.device_encoder.classes_ else -1
-        )
-        
-        # Feature engineering (simplified for batch prediction)
-        # In a real application, you would need to maintain running counts
-        df['user_login_frequency'] = 1  # Placeholder
-        df['device_login_frequency'] = 1  # Placeholder
-        df['location_login_frequency'] = 1  # Placeholder
-        
-        # Select features for modeling
-        features = [
-            'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-            'is_new_device', 'bytes_in', 'bytes_out', 'success',
-            'geo_location_encoded', 'device_id_encoded',
-            'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-        ]
-        
-        return df[features]
-    
+        return self.pipeline.transform_frame(df)
+
     def predict(self, df):
         """
         Predict if logins are anomalous
         """
         # Preprocess the data
         processed_data = self.preprocess_data(df)
-        
+
         # Make predictions
         predictions = self.model.predict(processed_data)
         probabilities = self.model.predict_proba(processed_data)
-        
+
         # Add predictions to the original dataframe
         df['is_anomaly_predicted'] = predictions
         df['probability_normal'] = probabilities[:, 0]
         df['probability_anomaly'] = probabilities[:, 1]
-        
+
         return df
 
-# Example usage
-if __name__ == "__main__":
-    # Initialize the detector
-    detector = BatchAnomalyDetector()
-    
+    def score_chunk(self, df, update_counts=True):
+        """
+        Score one chunk of logins and return its input columns plus the prediction columns
+        (see score_frame)
+        """
+        return score_frame(self.model, self.pipeline, df, update_counts)
+
+    def score_stream(self, input_path, output_path, input_format='csv', output_format='csv',
+                     chunk_size=100000, checkpoint_path=None, checkpoint_every=1, update_counts=True,
+                     progress=True, workers=1):
+        """
+        Score a CSV/NDJSON (or Parquet/Feather) login log chunk by chunk, writing results as they are produced.
+
+        Memory stays bounded by chunk_size (times the chunks in flight)
+        whatever the input size. input_path or output_path '-' means
+        stdin/stdout.
+
+        With workers > 1, chunks are parsed, scored and serialized in a pool
+        of worker processes that each load the model once, and written in
+        input order. The login frequency features are counted in this process
+        as chunks are read, so the results are the same for any worker count.
+
+        With checkpoint_path, the input byte offset, output offset and (when
+        counts are updated) a feature store snapshot are saved after every
+        checkpoint_every chunks, and a rerun with the same checkpoint resumes
+        after the last checkpointed chunk.
+
+        Returns a summary dict (rows, errors, anomalies, seconds, rows_per_sec).
+        """
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint_path and input_path == '-':
+            raise ValueError('Checkpoints need a file input to resume from, not stdin')
+        if checkpoint is not None:
+            if checkpoint['input'] != os.path.abspath(input_path):
+                raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint['input']}")
+            if checkpoint['finished']:
+                print(f"{input_path} was already scored completely (checkpoint {checkpoint_path})", file=sys.stderr)
+                return checkpoint['summary']
+            if checkpoint.get('feature_store'):
+                self.pipeline.feature_store = FrequencyFeatureStore.load(checkpoint['feature_store'])
+        else:
+            checkpoint = {
+                'input': os.path.abspath(input_path) if input_path != '-' else '-',
+                'output': os.path.abspath(output_path) if output_path != '-' else '-',
+                'input_format': input_format,
+                'output_format': output_format,
+                'input_offset': 0,
+                'output_offset': 0,
+                'rows': 0,
+                'errors': 0,
+                'anomalies': 0,
+                'chunks': 0,
+                'feature_store': None,
+                'finished': False
+            }
+
+        if input_format in COLUMNAR_FORMATS:
+            # Record batches of a Parquet/Feather file; the input offset counts rows
+            if input_path == '-':
+                raise ValueError(f"{input_format.capitalize()} input needs a file, not stdin")
+            stream = None
+            total_bytes = None
+            chunks = ((None, frame, len(frame))
+                      for frame in iter_dataset_batches(input_path, chunk_size, checkpoint['input_offset']))
+        else:
+            stream = sys.stdin.buffer if input_path == '-' else open(input_path, 'rb')
+            total_bytes = os.path.getsize(input_path) if input_path != '-' else None
+            header = None
+            if checkpoint['input_offset'] and input_format == 'csv':
+                header = stream.readline()
+            if checkpoint['input_offset']:
+                stream.seek(checkpoint['input_offset'])
+            chunks = read_chunks(stream, input_format, chunk_size, header)
+        writer = ChunkWriter(output_path, output_format, checkpoint['output_offset'])
+        completed_chunks = checkpoint['chunks']
+        # Parquet parts are numbered by task, from the parts the checkpoint kept: tasks are
+        # produced ahead of the writes, so the writer's own count cannot number them
+        first_part = writer.parts
+
+        def tasks():
+            """
+            Chunks to score, with their login frequencies counted in input order
+            """
+            input_offset = checkpoint['input_offset']
+            index = 0
+            for chunk_header, data, consumed in chunks:
+                input_offset += consumed
+                if data is None:
+                    continue
+                frequencies = None
+                snapshot = None
+                if update_counts:
+                    frequencies = count_logins(self.pipeline.feature_store,
+                                               parse_chunk(chunk_header, data, input_format, COUNT_FIELDS))
+                    chunk_number = completed_chunks + index + 1
+                    if checkpoint_path and chunk_number % checkpoint_every == 0:
+                        # The counts as of the end of this chunk, for resuming after it
+                        snapshot = f"{checkpoint_path}.feature_store.{chunk_number}.pkl"
+                        self.pipeline.feature_store.save(snapshot)
+                yield {
+                    'header': chunk_header, 'data': data, 'input_format': input_format,
+                    'output_format': output_format, 'update_counts': update_counts, 'frequencies': frequencies,
+                    'part_path': writer.part_path(first_part + index) if output_format == 'parquet' else None,
+                    'input_offset': input_offset, 'feature_store': snapshot
+                }
+                index += 1
+
+        pool = None
+        if workers > 1:
+            pool = scoring_pool(self.model_path, self.pipeline_path, workers)
+            results = ordered_map(pool, score_task, tasks(), workers)
+        else:
+            set_worker_model(self.model, self.pipeline)
+            results = ((task, score_task(task)) for task in tasks())
+
+        resumed_rows = checkpoint['rows']
+        started = time.perf_counter()
+        try:
+            for task, scored in results:
+                writer.write_encoded(scored['data'], scored['columns'])
+                for position, message in scored['errors']:
+                    print(f"Row {checkpoint['rows'] + position}: {message}", file=sys.stderr)
+
+                checkpoint['input_offset'] = task['input_offset']
+                checkpoint['rows'] += scored['rows']
+                checkpoint['errors'] += scored['error_count']
+                checkpoint['anomalies'] += scored['anomalies']
+                checkpoint['chunks'] += 1
+                checkpoint['output_offset'] = writer.offset()
+                if checkpoint_path and checkpoint['chunks'] % checkpoint_every == 0:
+                    previous = checkpoint['feature_store']
+                    checkpoint['feature_store'] = task['feature_store']
+                    save_checkpoint(checkpoint_path, checkpoint)
+                    if previous and previous != task['feature_store'] and os.path.exists(previous):
+                        os.remove(previous)
+
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    rows = checkpoint['rows'] - resumed_rows
+                    done = f" ({checkpoint['input_offset'] / total_bytes:.1%})" if total_bytes else ''
+                    print(f"Scored {checkpoint['rows']:,} rows{done}, {rows / elapsed:,.0f} rows/sec", file=sys.stderr)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            writer.close()
+            if stream is not None and stream is not sys.stdin.buffer:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        rows = checkpoint['rows'] - resumed_rows
+        summary = {
+            'rows': checkpoint['rows'],
+            'errors': checkpoint['errors'],
+            'anomalies': checkpoint['anomalies'],
+            'rows_this_run': rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'workers': workers
+        }
+        if checkpoint_path:
+            checkpoint['finished'] = True
+            checkpoint['summary'] = summary
+            save_checkpoint(checkpoint_path, checkpoint)
+        return summary
+
+
+def run_example(detector):
     # Create sample data for prediction
     sample_data = pd.DataFrame({
         'user_id': ['U9999', 'U8888', 'U7777'],
@@ -86,10 +471,68 @@ if __name__ == "__main__":
         'bytes_out': [200000, 1000000, 500000],
         'success': [1, 1, 0]
     })
-    
+
     # Make predictions
     results = detector.predict(sample_data)
-    
+
     # Display results
     print("Batch Prediction Results:")
-    print(results[['user_id', 'geo_location', 'is_new_device', 'is_anomaly_predicted', 'probability_anomaly']])
\ No newline at end of file
+    print(results[['user_id', 'geo_location', 'is_new_device', 'is_anomaly_predicted', 'probability_anomaly']])
+
+
+def guess_format(path, default):
+    for extension, name in (('.csv', 'csv'), ('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.parquet', 'parquet'),
+                             ('.feather', 'feather'), ('.arrow', 'feather')):
+        if path.endswith(extension):
+            return name
+    return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score login logs in constant memory, chunk by chunk')
+    parser.add_argument('--input', type=str, default=None,
+                        help="CSV, NDJSON, Parquet or Feather login log ('-' for stdin); without it a small example is scored")
+    parser.add_argument('--output', type=str, default='-',
+                        help="Output file, Parquet part-file directory, or '-' for stdout")
+    parser.add_argument('--input-format', choices=['csv', 'ndjson', 'parquet', 'feather'], default=None,
+                        help='Default: from the input extension, else csv')
+    parser.add_argument('--output-format', choices=ChunkWriter.FORMATS, default=None,
+                        help='Default: from the output extension, else csv')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes scoring chunks in parallel (0: one per CPU)')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='Checkpoint file; rerunning with it resumes after the last completed chunk')
+    parser.add_argument('--checkpoint-every', type=int, default=1,
+                        help='Chunks between checkpoints (each one snapshots the feature store)')
+    parser.add_argument('--no-update-counts', action='store_true',
+                        help='Score against the saved login frequencies without adding the scored logins')
+    parser.add_argument('--models', type=str, default='.',
+                        help='Directory with anomaly_detection_model.pkl and feature_pipeline.pkl')
+    parser.add_argument('--quiet', action='store_true', help='No per-chunk progress')
+    args = parser.parse_args()
+
+    detector = BatchAnomalyDetector(os.path.join(args.models, 'anomaly_detection_model.pkl'),
+                                    os.path.join(args.models, 'feature_pipeline.pkl'))
+    if args.input is None:
+        run_example(detector)
+        return
+
+    summary = detector.score_stream(
+        args.input, args.output,
+        input_format=args.input_format or guess_format(args.input, 'csv'),
+        output_format=args.output_format or guess_format(args.output, 'csv'),
+        chunk_size=args.chunk_size,
+        checkpoint_path=args.checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        update_counts=not args.no_update_counts,
+        progress=not args.quiet,
+        workers=args.workers or default_workers()
+    )
+    print(f"Scored {summary['rows']:,} rows ({summary['errors']:,} errors, {summary['anomalies']:,} anomalies) "
+          f"with {summary['workers']} worker(s) in {summary['seconds']:.1f}s: "
+          f"{summary['rows_per_sec'] or 0:,.0f} rows/sec", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
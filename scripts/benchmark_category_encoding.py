@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from category_encoder import CategoryEncoder
+
+
+def timed(function, repeat=3):
+    """
+    Best wall time of several runs, with the result of the last one
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def legacy_encode(values, label_encoder):
+    """
+    The per-row pattern previously used by AnomalyDetector and BatchAnomalyDetector
+    """
+    return values.apply(
+        lambda x: label_encoder.transform([x])[0] if x in label_encoder.classes_ else -1
+    ).to_numpy()
+
+
+def benchmark(name, values, label_encoder, legacy_rows=5000):
+    encoder = CategoryEncoder.from_label_encoder(label_encoder)
+    n = len(values)
+
+    candidates = {
+        'dict encode per row': lambda: np.array([encoder.encode(x) for x in values]),
+        'categorical batch': lambda: encoder.transform(values, method='categorical'),
+        'searchsorted batch': lambda: encoder.transform(values, method='searchsorted'),
+        'LabelEncoder.transform batch': lambda: label_encoder.transform(values),
+    }
+
+    print(f"\n{name}: {n:,} rows, {len(encoder):,} categories")
+    print("=" * 60)
+
+    # The legacy path is orders of magnitude slower, so it is timed on a slice
+    sample = values.iloc[:legacy_rows]
+    expected, elapsed = timed(lambda: legacy_encode(sample, label_encoder), repeat=1)
+    print(f"{'legacy apply + transform':<30}{len(sample) / elapsed:>16,.0f} rows/sec  (first {len(sample):,} rows)")
+
+    for label, function in candidates.items():
+        codes, elapsed = timed(function)
+        assert np.array_equal(np.asarray(codes)[:len(sample)], expected), f"{label} disagrees with the legacy codes"
+        print(f"{label:<30}{n / elapsed:>16,.0f} rows/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark category encoding strategies')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--models', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'models'),
+                        help='Directory with geo_encoder.pkl and device_encoder.pkl')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data, usecols=['geo_location', 'device_id'])
+    geo_encoder = joblib.load(os.path.join(args.models, 'geo_encoder.pkl'))
+    device_encoder = joblib.load(os.path.join(args.models, 'device_encoder.pkl'))
+
+    benchmark('geo_location', df['geo_location'], geo_encoder)
+    benchmark('device_id', df['device_id'], device_encoder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import warnings
+import pandas as pd
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from dataset_io import read_dataset, write_dataset, TRAINING_COLUMNS
+from feature_pipeline import FeaturePipeline, FEATURES
+
+
+def best_time(function, repeat):
+    """
+    Fastest of `repeat` calls, in seconds, and the last result
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load time and memory of the dataset from CSV, Parquet and Feather')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--repeat', type=int, default=5, help='Loads per variant (the fastest is reported)')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    variants = [
+        ('csv, inferred dtypes', args.data, lambda: pd.read_csv(args.data)),
+        ('csv, compact + pruned', args.data, lambda: read_dataset(args.data, TRAINING_COLUMNS, prefer_columnar=False))
+    ]
+    for file_format in ('parquet', 'feather'):
+        path = os.path.join(tmp_dir, f'dataset.{file_format}')
+        try:
+            write_dataset(read_dataset(args.data, prefer_columnar=False), path)
+        except ImportError as e:
+            print(f"Skipping {file_format}: {e}")
+            continue
+        variants.append((f'{file_format}, compact + pruned', path,
+                         lambda path=path: read_dataset(path, TRAINING_COLUMNS)))
+
+    reference = None
+    print(f"\n{'variant':<26}{'file MB':>9}{'load ms':>10}{'speedup':>9}{'memory MB':>11}{'+ features ms':>15}")
+    try:
+        for name, path, load in variants:
+            seconds, df = best_time(load, args.repeat)
+            memory = df.memory_usage(deep=True).sum() / 1e6
+            features_seconds, _ = best_time(lambda: FeaturePipeline().fit_transform(load())[FEATURES], args.repeat)
+            reference = reference or seconds
+            print(f"{name:<26}{os.path.getsize(path) / 1e6:>9.2f}{seconds * 1000:>10.1f}{reference / seconds:>9.1f}"
+                  f"{memory:>11.1f}{features_seconds * 1000:>15.1f}")
+    finally:
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import io
+import os
+import sys
+import time
+import joblib
+import argparse
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from main import load_training_features, split_data, forest_params
+from feature_cache import features_frame
+from compiled_forest import compile_model
+from detectors import DETECTORS, train_detector
+
+
+def latency(function, X, repeat):
+    """
+    Median wall time of repeated calls
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def train(name, X_train, y_train, args):
+    """
+    The detector as the API loads it: (model to score with sklearn, model compiled for serving)
+    """
+    if name == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier(**forest_params(n_jobs=args.n_jobs)).fit(X_train, y_train)
+        model.set_params(n_jobs=None)
+    else:
+        model, _ = train_detector(name, X_train, args.contamination, args.svm_max_samples, args.n_jobs)
+    # A pickle round trip, as between main.py --train and the API
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    buffer.seek(0)
+    compiled = compile_model(joblib.load(buffer), 'compiled', args.compiled_max_rows)
+    return model, compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and latency of each detector backend')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--detectors', type=str, default=','.join(DETECTORS), help='Comma-separated detector backends')
+    parser.add_argument('--batch-sizes', type=str, default='1,10,100,1000,10000',
+                        help='Comma-separated batch sizes to time')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--single-rows', type=int, default=2000, help='Rows scored one at a time for the latency percentiles')
+    parser.add_argument('--contamination', type=float, default=0.1)
+    parser.add_argument('--svm-max-samples', type=int, default=20000)
+    parser.add_argument('--compiled-max-rows', type=int, default=512)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    from sklearn.metrics import roc_auc_score, f1_score
+
+    X, y, _ = load_training_features(args.data)
+    X_train, X_test, y_train, y_test = split_data(features_frame(X, y))
+    X_train = X_train.to_numpy(dtype=np.float32)
+    X_test = X_test.to_numpy(dtype=np.float32)
+    sizes = [int(size) for size in args.batch_sizes.split(',')]
+
+    print(f"\n{'detector':>17}{'fit s':>8}{'ROC AUC':>9}{'F1':>8}{'1-row p50 ms':>14}{'1-row p99 ms':>14}")
+    timings = {}
+    for name in args.detectors.split(','):
+        started = time.perf_counter()
+        model, compiled = train(name, X_train, y_train, args)
+        fit_seconds = time.perf_counter() - started
+
+        probabilities = compiled.predict_proba(X_test)
+        if not np.allclose(probabilities, model.predict_proba(X_test), rtol=0, atol=1e-9):
+            raise SystemExit(f"{name}: compiled probabilities differ from sklearn")
+        auc = roc_auc_score(y_test, probabilities[:, 1])
+        f1 = f1_score(y_test, probabilities.argmax(axis=1))
+
+        # One row per call, as /predict scores
+        single = []
+        for row in X_test[:args.single_rows]:
+            start = time.perf_counter()
+            compiled.predict_proba(row[np.newaxis])
+            single.append((time.perf_counter() - start) * 1000)
+        p50, p99 = np.percentile(single, [50, 99])
+        print(f"{name:>17}{fit_seconds:>8.1f}{auc:>9.4f}{f1:>8.4f}{p50:>14.3f}{p99:>14.3f}")
+
+        timings[name] = []
+        for size in sizes:
+            batch = X_test[np.arange(size) % len(X_test)]
+            repeat = args.repeat if size <= 1000 else max(args.repeat // 10, 1)
+            timings[name].append((latency(model.predict_proba, batch, repeat), latency(compiled.predict_proba, batch, repeat)))
+
+    print(f"\n{'detector':>17}{'rows':>8}{'sklearn ms':>12}{'served ms':>11}{'rows/sec':>12}")
+    for name, rows in timings.items():
+        for size, (sklearn_time, served_time) in zip(sizes, rows):
+            print(f"{name:>17}{size:>8,}{sklearn_time * 1000:>12.3f}{served_time * 1000:>11.3f}{size / served_time:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
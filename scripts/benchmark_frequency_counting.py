@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from sketches import CountMinSketch, HyperLogLog
+
+
+def exact_counts(keys):
+    """
+    Exact per-key counts with a dict, as the value_counts() maps in main.py
+    """
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def measure(function, *args):
+    """
+    Run function, returning its result, wall time and peak traced memory
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(name, keys, epsilon, delta, chunk_size=100000):
+    print(f"\n{name}: {len(keys):,} logins, {len(set(keys)):,} distinct keys")
+    print("=" * 60)
+
+    exact, exact_time, exact_memory = measure(exact_counts, keys)
+
+    def build_sketch():
+        sketch = CountMinSketch.from_error(epsilon, delta)
+        for start in range(0, len(keys), chunk_size):
+            sketch.add(keys[start:start + chunk_size])
+        return sketch
+
+    sketch, sketch_time, sketch_memory = measure(build_sketch)
+
+    distinct_keys = np.array(list(exact.keys()), dtype=object)
+    true_counts = np.array(list(exact.values()))
+    estimates = sketch.query(distinct_keys)
+    errors = estimates - true_counts
+
+    def build_hll():
+        hll = HyperLogLog.from_error(0.01)
+        for start in range(0, len(keys), chunk_size):
+            hll.add(keys[start:start + chunk_size])
+        return hll
+
+    hll, hll_time, _ = measure(build_hll)
+
+    print(f"{'backend':<18}{'logins/sec':>14}{'peak memory':>16}")
+    print(f"{'exact dict':<18}{len(keys) / exact_time:>14,.0f}{exact_memory / 1e6:>13.1f} MB")
+    print(f"{'count-min sketch':<18}{len(keys) / sketch_time:>14,.0f}{sketch_memory / 1e6:>13.1f} MB"
+          f"  (table {sketch.nbytes / 1e6:.1f} MB)")
+    print(f"Count-Min error: mean {errors.mean():.2f}, max {errors.max()}, "
+          f"bound {sketch.error_bound:.1f} (epsilon={epsilon}, delta={delta}), "
+          f"{np.mean(errors == 0) * 100:.1f}% of keys exact")
+    print(f"HyperLogLog distinct estimate: {hll.count():,} vs {len(exact):,} "
+          f"({hll.nbytes} bytes, {len(keys) / hll_time:,.0f} keys/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare exact and sketch-based login frequency counting')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--synthetic-rows', type=int, default=2000000,
+                        help='Logins in the synthetic high-cardinality stream (0 to skip)')
+    parser.add_argument('--synthetic-keys', type=int, default=1000000,
+                        help='Distinct user ids in the synthetic stream')
+    parser.add_argument('--epsilon', type=float, default=1e-5)
+    parser.add_argument('--delta', type=float, default=1e-3)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data, usecols=['user_id', 'device_id'])
+    benchmark('Dataset user_id', df['user_id'].to_numpy(dtype=object), args.epsilon, args.delta)
+    benchmark('Dataset device_id', df['device_id'].to_numpy(dtype=object), args.epsilon, args.delta)
+
+    if args.synthetic_rows:
+        # Zipf-distributed user ids: a few very active users and a long tail
+        rng = np.random.default_rng(42)
+        ids = rng.zipf(1.2, size=args.synthetic_rows) % args.synthetic_keys
+        keys = np.char.add('U', ids.astype(str)).astype(object)
+        benchmark('Synthetic high-cardinality user_id', keys, args.epsilon, args.delta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BACKEND_DIR = os.path.join(ROOT, 'src', 'backend')
+API_DIR = os.path.join(ROOT, 'src', 'api')
+
+# Entry points, their default cold-start budgets and the modules they must not pull in
+ENTRY_POINTS = {
+    'api': {'budget_ms': 1500, 'forbidden': ['matplotlib', 'seaborn', 'sklearn']},
+    'main': {'budget_ms': 1000, 'forbidden': ['matplotlib', 'seaborn', 'sklearn']},
+    'model_evaluation': {'budget_ms': 1000, 'forbidden': ['matplotlib', 'seaborn', 'sklearn']},
+    'feature_visualization': {'budget_ms': 1000, 'forbidden': ['matplotlib', 'seaborn']},
+}
+
+
+def import_times(module, env=None):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns {module name: (self us, cumulative us)} for every module imported,
+    keeping the first (outermost) entry when a name appears more than once.
+    """
+    process_env = dict(os.environ, **(env or {}))
+    process_env['PYTHONPATH'] = os.pathsep.join([API_DIR, BACKEND_DIR, process_env.get('PYTHONPATH', '')])
+    # The API would otherwise start its history writer and stats threads
+    process_env.setdefault('API_DEFER_SERVICES', '1')
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', f'import {module}'],
+                            env=process_env, capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return times
+
+
+def check_entry_point(module, budget_ms=None, forbidden=None, env=None, top=0):
+    """
+    Measure one entry point and return (cumulative ms, list of problems)
+    """
+    spec = ENTRY_POINTS.get(module, {})
+    budget_ms = spec.get('budget_ms') if budget_ms is None else budget_ms
+    forbidden = spec.get('forbidden', []) if forbidden is None else forbidden
+
+    times = import_times(module, env)
+    total_ms = times[module][1] / 1000
+    problems = []
+    if budget_ms is not None and total_ms > budget_ms:
+        problems.append(f"{module}: import took {total_ms:.0f} ms, over the {budget_ms:.0f} ms budget")
+    for name in forbidden:
+        if name in times:
+            problems.append(f"{module}: imports {name} at import time")
+
+    if top:
+        # Heaviest top-level packages pulled in by the entry point
+        packages = {}
+        for name, (_, cumulative_us) in times.items():
+            if name != module:
+                package = name.split('.')[0]
+                packages[package] = max(packages.get(package, 0), cumulative_us)
+        print(f"\n{module}: {total_ms:.0f} ms (self {times[module][0] / 1000:.0f} ms)")
+        for package, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {package:<30}{cumulative_us / 1000:>10.1f} ms")
+    return total_ms, problems
+
+
+def export_artifact(path):
+    """
+    Export the trained model to a temporary artifact so the API import can skip sklearn
+    (the committed model was trained on data/Dataset.csv, which the export is evaluated on)
+    """
+    data = os.path.join(ROOT, 'data', 'Dataset.csv')
+    subprocess.run([sys.executable, '-W', 'ignore', 'main.py', '--export', '--artifact', path, '--data', data],
+                   cwd=BACKEND_DIR, check=True, capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start import time of the API and backend entry points')
+    parser.add_argument('--modules', type=str, default=','.join(ENTRY_POINTS),
+                        help='Comma-separated entry point modules to measure')
+    parser.add_argument('--budget-scale', type=float, default=float(os.environ.get('IMPORT_TIME_BUDGET_SCALE', 1.0)),
+                        help='Multiply every budget, e.g. for slower machines')
+    parser.add_argument('--artifact', type=str, default=None,
+                        help='Model artifact for the API (default: export one to a temporary directory)')
+    parser.add_argument('--top', type=int, default=8, help='Heaviest imported packages to list per entry point')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifact = args.artifact
+        if artifact is None:
+            artifact = os.path.join(tmp_dir, 'model.bin')
+            export_artifact(artifact)
+
+        failures = []
+        for module in args.modules.split(','):
+            budget_ms = ENTRY_POINTS.get(module, {}).get('budget_ms')
+            if budget_ms is not None:
+                budget_ms *= args.budget_scale
+            _, problems = check_entry_point(module, budget_ms, env={'MODEL_ARTIFACT': artifact}, top=args.top)
+            failures.extend(problems)
+
+    print()
+    if failures:
+        for problem in failures:
+            print(f"FAIL {problem}")
+        sys.exit(1)
+    print("All entry points within their import budgets")
+
+
+if __name__ == "__main__":
+    main()
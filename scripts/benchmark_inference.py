@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from compiled_forest import CompiledForest
+from feature_pipeline import FeaturePipeline
+
+
+def latency(function, X, repeat):
+    """
+    Median wall time of repeated calls
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sklearn and compiled forest inference')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--models', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'models'),
+                        help='Directory with anomaly_detection_model.pkl and feature_pipeline.pkl')
+    parser.add_argument('--batch-sizes', type=str, default='1,10,100,500,1000,10000',
+                        help='Comma-separated batch sizes to time')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    model = joblib.load(os.path.join(args.models, 'anomaly_detection_model.pkl'))
+    pipeline = FeaturePipeline.load(os.path.join(args.models, 'feature_pipeline.pkl'))
+    X = pipeline.transform_frame(pd.read_csv(args.data), counts='dataset').to_numpy(dtype=np.float32)
+
+    start = time.perf_counter()
+    forest = CompiledForest.from_sklearn(model)
+    print(f"Compiled {forest.n_trees} trees, {forest.node_count:,} nodes, max depth {forest.max_depth} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    expected = model.predict_proba(X)
+    if not np.array_equal(forest.predict_proba(X), expected):
+        raise SystemExit('Compiled probabilities differ from sklearn')
+    print(f"Probabilities identical to sklearn on {len(X):,} rows")
+
+    print(f"\n{'rows':>8}{'sklearn':>14}{'compiled':>14}{'speedup':>10}")
+    for size in [int(size) for size in args.batch_sizes.split(',')]:
+        batch = X[:size]
+        repeat = args.repeat if size <= 1000 else max(args.repeat // 10, 1)
+        sklearn_time = latency(model.predict_proba, batch, repeat)
+        compiled_time = latency(forest.predict_proba, batch, repeat)
+        print(f"{len(batch):>8,}{sklearn_time * 1000:>11.2f} ms{compiled_time * 1000:>11.2f} ms"
+              f"{sklearn_time / compiled_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
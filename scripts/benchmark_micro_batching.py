@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api')
+
+
+async def call(app, record):
+    """
+    One POST /predict through the ASGI app, without the network
+    """
+    body = json.dumps(record).encode('utf-8')
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({'type': 'http', 'method': 'POST', 'path': '/predict', 'headers': [], 'query_string': b''},
+              receive, send)
+    return sent[0]['status']
+
+
+async def run_load(asgi, records, concurrency):
+    """
+    Keep `concurrency` requests in flight until every record is scored; returns (seconds, latencies in ms)
+    """
+    latencies = []
+    next_record = iter(records)
+
+    async def client():
+        for record in next_record:
+            start = time.perf_counter()
+            status = await call(asgi.app, record)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                raise RuntimeError(f"/predict returned {status}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started, np.asarray(latencies)
+
+
+async def benchmark(asgi, records, concurrency, max_batch_size, max_wait_ms):
+    from micro_batcher import MicroBatcher
+    asgi.batcher = MicroBatcher(asgi.score_records, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    asgi.batcher.start()
+    # A short warm-up so the first batches do not count
+    await run_load(asgi, records[:concurrency * 2], concurrency)
+    await asgi.batcher.stop()
+    asgi.batcher = MicroBatcher(asgi.score_records, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    asgi.batcher.start()
+    elapsed, latencies = await run_load(asgi, records, concurrency)
+    metrics = asgi.batcher.metrics()
+    await asgi.batcher.stop()
+    return elapsed, latencies, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and latency of micro-batched /predict requests')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per configuration')
+    parser.add_argument('--concurrency', type=str, default='1,16,64', help='Comma-separated concurrent clients')
+    parser.add_argument('--configs', type=str, default='1:0,16:1,64:2,256:5',
+                        help='Comma-separated max_batch_size:max_wait_ms pairs (1:0 scores every request alone)')
+    args = parser.parse_args()
+
+    # Keep the benchmark's history, stats and feature store snapshots out of data/
+    tmp_dir = tempfile.mkdtemp()
+    os.environ.setdefault('PREDICTIONS_HISTORY_DB', os.path.join(tmp_dir, 'history.db'))
+    os.environ.setdefault('PREDICTION_STATS_SNAPSHOT', os.path.join(tmp_dir, 'stats.json'))
+    os.environ.setdefault('FEATURE_STORE_SNAPSHOT', os.path.join(tmp_dir, 'feature_store.pkl'))
+    os.environ['HISTORY_QUEUE_SIZE'] = str(args.requests * 4)
+    sys.path.insert(0, API_DIR)
+    import asgi
+
+    records = pd.read_csv(args.data, nrows=args.requests).drop(columns=['is_anomaly']).to_dict('records')
+
+    print(f"\n{'clients':>8}{'batch':>7}{'wait ms':>9}{'req/sec':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'mean batch':>12}{'queue p50':>11}{'queue p99':>11}")
+    for concurrency in [int(value) for value in args.concurrency.split(',')]:
+        for config in args.configs.split(','):
+            max_batch_size, max_wait_ms = config.split(':')
+            elapsed, latencies, metrics = asyncio.run(
+                benchmark(asgi, records, concurrency, int(max_batch_size), float(max_wait_ms))
+            )
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{concurrency:>8}{max_batch_size:>7}{max_wait_ms:>9}{len(records) / elapsed:>10,.0f}"
+                  f"{p50:>9.2f}{p99:>9.2f}{metrics['mean_batch_size']:>12.1f}"
+                  f"{metrics['queue_delay_ms']['p50']:>11.2f}{metrics['queue_delay_ms']['p99']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from batch_predictor import BatchAnomalyDetector
+from parallel_scoring import default_workers
+
+
+def replicate_dataset(data_path, rows, output_path):
+    """
+    Write the dataset's rows over and over to output_path until it has `rows` rows
+    """
+    with open(data_path, 'rb') as f:
+        header = f.readline()
+        lines = f.readlines()
+    with open(output_path, 'wb') as out:
+        out.write(header)
+        remaining = rows
+        while remaining > 0:
+            out.writelines(lines[:remaining])
+            remaining -= len(lines)
+
+
+def worker_counts(max_workers):
+    """
+    1, 2, 4, ... up to max_workers (always included)
+    """
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling of parallel batch scoring with the number of worker processes')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--rows', type=int, default=10000000, help='Rows to score (the dataset is replicated)')
+    parser.add_argument('--workers', type=str, default=None,
+                        help='Comma-separated worker counts (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per chunk')
+    parser.add_argument('--output-format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--models', type=str, default='.',
+                        help='Directory with anomaly_detection_model.pkl and feature_pipeline.pkl')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.workers.split(',')] if args.workers else worker_counts(default_workers())
+    tmp_dir = tempfile.mkdtemp()
+    input_path = os.path.join(tmp_dir, 'logins.csv')
+    print(f"Writing {args.rows:,} rows to {input_path}...")
+    replicate_dataset(args.data, args.rows, input_path)
+
+    results = []
+    try:
+        # With running counts the login frequencies are counted serially in the parent process,
+        # without them chunks are scored fully independently
+        for update_counts in (True, False):
+            baseline = None
+            print(f"\nLogin counts {'updated' if update_counts else 'read-only'}:")
+            print(f"{'workers':>8}{'seconds':>10}{'rows/sec':>12}{'speedup':>9}{'efficiency':>12}")
+            for workers in counts:
+                # A fresh detector per run, so every run starts from the saved counts
+                detector = BatchAnomalyDetector(os.path.join(args.models, 'anomaly_detection_model.pkl'),
+                                                os.path.join(args.models, 'feature_pipeline.pkl'))
+                summary = detector.score_stream(input_path, os.devnull, output_format=args.output_format,
+                                                chunk_size=args.chunk_size, update_counts=update_counts,
+                                                progress=False, workers=workers)
+                baseline = baseline or summary['rows_per_sec']
+                speedup = summary['rows_per_sec'] / baseline
+                print(f"{workers:>8}{summary['seconds']:>10.1f}{summary['rows_per_sec']:>12,.0f}"
+                      f"{speedup:>9.2f}{speedup / workers:>12.0%}")
+                results.append({'update_counts': update_counts, 'workers': workers, 'rows': summary['rows'],
+                                'seconds': summary['seconds'], 'rows_per_sec': summary['rows_per_sec'],
+                                'speedup': round(speedup, 3)})
+    finally:
+        os.remove(input_path)
+        os.rmdir(tmp_dir)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': args.rows, 'chunk_size': args.chunk_size, 'cpus': default_workers(),
+                       'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT_DIR, 'src', 'api')
+MODELS_DIR = os.path.join(ROOT_DIR, 'models')
+
+
+def run_load(api, records, concurrency, batch_size):
+    """
+    Send every record from `concurrency` client threads; returns (seconds, latencies in ms)
+    """
+    latencies = []
+    next_record = iter(range(0, len(records), batch_size))
+    lock = threading.Lock()
+    errors = []
+
+    def client():
+        test_client = api.app.test_client()
+        while True:
+            with lock:
+                start = next(next_record, None)
+            if start is None:
+                return
+            started = time.perf_counter()
+            if batch_size == 1:
+                response = test_client.post('/predict', json=records[start])
+            else:
+                response = test_client.post('/predict/batch', json=records[start:start + batch_size])
+            latency = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(latency)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise RuntimeError(f"{len(errors)} requests failed, e.g. with status {errors[0]}")
+    return time.perf_counter() - started, np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Live /predict latency with a candidate model shadowing a sample of requests')
+    parser.add_argument('--data', type=str, default=os.path.join(ROOT_DIR, 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--candidate-model', type=str, default=os.path.join(MODELS_DIR, 'anomaly_detection_model.pkl'),
+                        help='Candidate model pickle (default: the live model, so both always agree)')
+    parser.add_argument('--requests', type=int, default=3000, help='Records per configuration')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+    parser.add_argument('--batch-size', type=int, default=1, help='Records per request (1 uses /predict)')
+    parser.add_argument('--sample-rates', type=str, default='0,0.1,1', help='Comma-separated shadow sample rates')
+    args = parser.parse_args()
+
+    # Keep the benchmark's history, stats, snapshots and registry out of data/ and models/
+    tmp_dir = tempfile.mkdtemp()
+    os.environ.setdefault('PREDICTIONS_HISTORY_DB', os.path.join(tmp_dir, 'history.db'))
+    os.environ.setdefault('PREDICTION_STATS_SNAPSHOT', os.path.join(tmp_dir, 'stats.json'))
+    os.environ.setdefault('FEATURE_STORE_SNAPSHOT', os.path.join(tmp_dir, 'feature_store.pkl'))
+    os.environ['HISTORY_QUEUE_SIZE'] = str(args.requests * 4)
+    os.environ['MODEL_REGISTRY_DIR'] = os.path.join(tmp_dir, 'registry')
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    sys.path.insert(0, API_DIR)
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'src', 'backend'))
+
+    from model_registry import ModelRegistry, MODEL_FILES
+    registry = ModelRegistry(os.environ['MODEL_REGISTRY_DIR'])
+    files = {name: os.path.join(MODELS_DIR, name) for name in MODEL_FILES}
+    registry.publish(files, {'role': 'live'})
+    candidate = registry.publish(dict(files, **{'anomaly_detection_model.pkl': args.candidate_model}),
+                                 {'role': 'candidate'}, promote=False)
+    import api
+
+    records = pd.read_csv(args.data, nrows=args.requests).drop(columns=['is_anomaly']).to_dict('records')
+    # A warm-up run so the first requests do not count
+    run_load(api, records[:200], args.concurrency, args.batch_size)
+
+    print(f"\n{'shadow rate':>12}{'req/sec':>10}{'p50 ms':>9}{'p99 ms':>9}{'compared':>10}{'dropped':>9}"
+          f"{'agreement':>11}{'mean |delta|':>14}{'live p50 ms':>13}{'cand p50 ms':>13}")
+    for sample_rate in [float(value) for value in args.sample_rates.split(',')]:
+        if sample_rate > 0:
+            api.shadow_scorer.start(api.shadow_spec(candidate), sample_rate)
+            while api.shadow_scorer.status == 'loading':
+                time.sleep(0.1)
+            if api.shadow_scorer.status != 'running':
+                raise RuntimeError(f"Candidate did not load: {api.shadow_scorer.error}")
+        else:
+            api.shadow_scorer.stop()
+        elapsed, latencies = run_load(api, records, args.concurrency, args.batch_size)
+        # Let the shadow process catch up before reading its statistics
+        while api.shadow_scorer.sample_rate and api.shadow_scorer.metrics()['queued']:
+            time.sleep(0.1)
+        time.sleep(0.5)
+        metrics = api.shadow_scorer.metrics()
+        counters = metrics['counters']
+        latency = metrics['latency_ms']
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{sample_rate:>12g}{len(records) / elapsed:>10,.0f}{p50:>9.2f}{p99:>9.2f}"
+              f"{counters['compared_requests']:>10}{counters['dropped_requests']:>9}"
+              f"{metrics['agreement_rate'] if metrics['agreement_rate'] is not None else float('nan'):>11.4f}"
+              f"{metrics['probability_anomaly_delta']['mean_abs'] or 0:>14.4f}"
+              f"{latency['live']['p50'] if latency['live'] else float('nan'):>13.3f}"
+              f"{latency['candidate']['p50'] if latency['candidate'] else float('nan'):>13.3f}")
+    api.shadow_scorer.stop()
+
+
+if __name__ == "__main__":
+    main()
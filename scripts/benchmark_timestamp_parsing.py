@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from timestamp_decoder import TimestampDecoder, TIME_FEATURES
+
+
+def timed(function, repeat=3):
+    """
+    Best wall time of several runs, with the result of the last one
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def legacy_frame(values):
+    """
+    The previous transform_frame path: infer the format, then read the .dt accessors
+    """
+    timestamps = pd.to_datetime(values, format='mixed')
+    return {
+        'login_hour': timestamps.dt.hour.to_numpy(),
+        'login_day': timestamps.dt.day.to_numpy(),
+        'login_month': timestamps.dt.month.to_numpy(),
+        'login_year': timestamps.dt.year.to_numpy(),
+        'login_weekday': timestamps.dt.weekday.to_numpy(),
+    }
+
+
+def legacy_record(value):
+    """
+    The previous single-record path: pd.to_datetime with format inference per request
+    """
+    timestamp = pd.to_datetime(value)
+    return timestamp.hour, timestamp.day, timestamp.month, timestamp.year, timestamp.weekday()
+
+
+def benchmark_batch(name, values):
+    n = len(values)
+    print(f"\n{name}: {n:,} rows")
+    print("=" * 60)
+
+    expected, elapsed = timed(lambda: legacy_frame(values))
+    print(f"{'pd.to_datetime + .dt':<32}{n / elapsed:>16,.0f} rows/sec")
+
+    codes, elapsed = timed(lambda: TimestampDecoder().decode_array(values))
+    for column in TIME_FEATURES:
+        assert np.array_equal(codes[column], expected[column]), f"decode_array disagrees on {column}"
+    print(f"{'TimestampDecoder.decode_array':<32}{n / elapsed:>16,.0f} rows/sec")
+
+
+def benchmark_records(values, rows):
+    values = values[:rows]
+    print(f"\nSingle records: {len(values):,} calls")
+    print("=" * 60)
+
+    expected, elapsed = timed(lambda: [legacy_record(value) for value in values], repeat=1)
+    print(f"{'pd.to_datetime per record':<32}{len(values) / elapsed:>16,.0f} records/sec")
+
+    for label, decoder in (('decode (cold cache)', None), ('decode (warm cache)', TimestampDecoder())):
+        decode = (decoder or TimestampDecoder()).decode
+        if decoder is not None:
+            for value in values:
+                decode(value)
+        result, elapsed = timed(lambda: [decode(value) for value in values], repeat=1)
+        assert result == expected, f"{label} disagrees with pd.to_datetime"
+        print(f"{label:<32}{len(values) / elapsed:>16,.0f} records/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark timestamp parsing for the time features')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--record-rows', type=int, default=20000,
+                        help='Number of single-record decodes to time')
+    args = parser.parse_args()
+
+    timestamps = pd.read_csv(args.data, usecols=['timestamp'])['timestamp']
+    benchmark_batch("'%Y-%m-%d %H:%M:%S' strings", timestamps)
+    benchmark_batch('ISO-8601 strings', timestamps.str.replace(' ', 'T', regex=False))
+
+    # Epoch seconds are compared against pandas' own epoch conversion
+    seconds = pd.to_datetime(timestamps).astype('datetime64[s]').astype(np.int64)
+    expected, elapsed = timed(lambda: legacy_frame(pd.Series(pd.to_datetime(seconds, unit='s'))))
+    decoded, decoder_elapsed = timed(lambda: TimestampDecoder().decode_array(seconds))
+    for column in TIME_FEATURES:
+        assert np.array_equal(decoded[column], expected[column]), f"epoch decode disagrees on {column}"
+    print(f"\nEpoch seconds: {len(seconds):,} rows")
+    print("=" * 60)
+    print(f"{'pd.to_datetime(unit=s) + .dt':<32}{len(seconds) / elapsed:>16,.0f} rows/sec")
+    print(f"{'TimestampDecoder.decode_array':<32}{len(seconds) / decoder_elapsed:>16,.0f} rows/sec")
+
+    benchmark_records(timestamps.tolist(), args.record_rows)
+
+
+if __name__ == "__main__":
+    main()
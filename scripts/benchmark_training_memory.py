@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchmark_parallel_scoring import replicate_dataset
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend')
+
+# Feature preparation of each training mode, run in its own process so its peak RSS is its own
+MODES = {
+    'legacy': """
+import pandas as pd
+from feature_pipeline import FeaturePipeline, FEATURES
+df = pd.read_csv(PATH)
+df = FeaturePipeline().fit_transform(df)
+X = df[FEATURES]
+""",
+    'optimized': """
+from main import load_and_preprocess_data
+df, pipeline = load_and_preprocess_data(PATH)
+""",
+    'chunked': """
+import tempfile
+from chunked_features import build_features_chunked
+X, y, pipeline = build_features_chunked(PATH, tempfile.mkdtemp(dir=TMP_DIR), CHUNK_SIZE)
+"""
+}
+
+REPORT = """
+import json, time
+from memory_report import peak_rss_mb
+print(json.dumps({'seconds': time.perf_counter() - STARTED, 'peak_rss_mb': peak_rss_mb()}))
+"""
+
+
+def run_mode(mode, path, chunk_size, tmp_dir):
+    code = (f"import time, warnings\nwarnings.filterwarnings('ignore')\nSTARTED = time.perf_counter()\n"
+            f"PATH = {path!r}\nCHUNK_SIZE = {chunk_size}\nTMP_DIR = {tmp_dir!r}\n" + MODES[mode] + REPORT)
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    output = subprocess.run([sys.executable, '-c', code], env=env, cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory of building the training features, per training mode')
+    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', 'data', 'Dataset.csv'),
+                        help='Path to the dataset CSV file')
+    parser.add_argument('--rows', type=int, default=2000000, help='Rows of training data (the dataset is replicated)')
+    parser.add_argument('--chunk-size', type=int, default=250000, help='Rows per chunk in chunked mode')
+    parser.add_argument('--modes', type=str, default='legacy,optimized,chunked', help='Comma-separated modes')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'training.csv')
+    print(f"Writing {args.rows:,} rows to {path}...")
+    replicate_dataset(args.data, args.rows, path)
+    try:
+        print(f"\n{'mode':<12}{'seconds':>10}{'peak RSS MB':>14}")
+        for mode in args.modes.split(','):
+            result = run_mode(mode, os.path.abspath(path), args.chunk_size, tmp_dir)
+            print(f"{mode:<12}{result['seconds']:>10.1f}{result['peak_rss_mb']:>14.1f}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
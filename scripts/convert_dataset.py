@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import argparse
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from dataset_io import read_dataset, write_dataset, TRAINING_COLUMNS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert login CSV datasets to Parquet or Feather with compact dtypes')
+    parser.add_argument('inputs', nargs='+', help='CSV datasets to convert')
+    parser.add_argument('--format', choices=['parquet', 'feather'], default='parquet', help='Output format')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output path (one input only; default: next to the input with the new extension)')
+    parser.add_argument('--columns', choices=['all', 'training'], default='all',
+                        help="'training' keeps only the columns the feature pipeline and training read")
+    args = parser.parse_args()
+
+    if args.output and len(args.inputs) > 1:
+        parser.error('--output needs a single input')
+    for input_path in args.inputs:
+        output_path = args.output or os.path.splitext(input_path)[0] + '.' + args.format
+        started = time.perf_counter()
+        df = read_dataset(input_path, TRAINING_COLUMNS if args.columns == 'training' else None, prefer_columnar=False)
+        try:
+            write_dataset(df, output_path)
+        except ImportError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        elapsed = time.perf_counter() - started
+        print(f"{input_path} ({os.path.getsize(input_path) / 1e6:.1f} MB) -> {output_path} "
+              f"({os.path.getsize(output_path) / 1e6:.1f} MB, {len(df):,} rows, {len(df.columns)} columns) "
+              f"in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
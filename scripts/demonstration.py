@@ -1,10 +1,15 @@
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import LabelEncoder
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from feature_pipeline import FeaturePipeline
+from parallel_scoring import scoring_pool, ordered_map, validate_records_task, score_records_task
+
 class AnomalyDetector:
     def __init__(self):
         """
@@ -12,52 +17,19 @@ class AnomalyDetector:
         """
         # Load the trained model and encoders
         self.model = joblib.load('anomaly_detection_model.pkl')
-        self.geo_encoder = joblib.load('geo_encoder.pkl')
-        self.device_encoder = joblib.load('device_encoder.pkl')
+        self.pipeline = FeaturePipeline.load('feature_pipeline.pkl')
+        # Worker processes for parallel batches, started on first use
+        self.pool = None
+        self.pool_workers = None
         
     def preprocess_single_record(self, record):
         """
         Preprocess a single login record for prediction
         """
-        # Convert to DataFrame
-        df = pd.DataFrame([record])
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Extract time-based features
-        df['login_hour'] = df['timestamp'].dt.hour
-        df['login_day'] = df['timestamp'].dt.day
-        df['login_month'] = df['timestamp'].dt.month
-        df['login_year'] = df['timestamp'].dt.year
-        df['login_weekday'] = df['timestamp'].dt.weekday
-        
-        # Encode categorical variables (handle unseen categories)
-        try:
-            df['geo_location_encoded'] = self.geo_encoder.transform(df['geo_location'])
-        except ValueError:
-            df['geo_location_encoded'] = -1  # Unknown category
-            
-        try:
-            df['device_id_encoded'] = self.device_encoder.transform(df['device_id'])
-        except ValueError:
-            df['device_id_encoded'] = -1  # Unknown category
-        
-        # Feature engineering (simplified for single prediction)
-        # In a real application, you would need to maintain running counts
-        df['user_login_frequency'] = 1  # Placeholder
-        df['device_login_frequency'] = 1  # Placeholder
-        df['location_login_frequency'] = 1  # Placeholder
-        
-        # Select features for modeling
-        features = [
-            'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-            'is_new_device', 'bytes_in', 'bytes_out', 'success',
-            'geo_location_encoded', 'device_id_encoded',
-            'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-        ]
-        
-        return df[features]
+        features, _, errors = self.pipeline.transform_records([record])
+        if errors:
+            raise ValueError(errors[0])
+        return features
     
     def predict_single(self, record):
         """
@@ -77,49 +49,25 @@ class AnomalyDetector:
             'probability_anomaly': float(probability[0][1])
         }
     
-    def predict_batch(self, records):
+    def predict_batch(self, records, workers=1, chunk_size=10000):
         """
         Predict if multiple login records are anomalous
+
+        With workers > 1, batches larger than chunk_size are split into
+        chunks scored in parallel by worker processes that each load the
+        model once; results keep the input order and match a serial run.
         """
-        # Convert to DataFrame
-        df = pd.DataFrame(records)
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Extract time-based features
-        df['login_hour'] = df['timestamp'].dt.hour
-        df['login_day'] = df['timestamp'].dt.day
-        df['login_month'] = df['timestamp'].dt.month
-        df['login_year'] = df['timestamp'].dt.year
-        df['login_weekday'] = df['timestamp'].dt.weekday
-        
-        # Encode categorical variables (handle unseen categories)
-        df['geo_location_encoded'] = df['geo_location'].apply(
-            lambda x: self.geo_encoder.transform([x])[0] if x in self.geo_encoder.classes_ else -1
-        )
-        
-        df['device_id_encoded'] = df['device_id'].apply(
-            lambda x: self.device_encoder.transform([x])[0] if x in self.device_encoder.classes_ else -1
-        )
-        
-        # Feature engineering (simplified for batch prediction)
-        # In a real application, you would need to maintain running counts
-        df['user_login_frequency'] = 1  # Placeholder
-        df['device_login_frequency'] = 1  # Placeholder
-        df['location_login_frequency'] = 1  # Placeholder
-        
-        # Select features for modeling
-        features = [
-            'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-            'is_new_device', 'bytes_in', 'bytes_out', 'success',
-            'geo_location_encoded', 'device_id_encoded',
-            'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-        ]
+        if workers > 1 and len(records) > chunk_size:
+            return self.predict_batch_parallel(records, workers, chunk_size)
+
+        # Transform all records into one feature matrix
+        features, _, errors = self.pipeline.transform_records(records)
+        if errors:
+            raise ValueError(f"Invalid records: {errors}")
         
         # Make predictions
-        predictions = self.model.predict(df[features])
-        probabilities = self.model.predict_proba(df[features])
+        predictions = self.model.predict(features)
+        probabilities = self.model.predict_proba(features)
         
         # Return results
         results = []
@@ -132,6 +80,54 @@ class AnomalyDetector:
         
         return results
 
+    def predict_batch_parallel(self, records, workers, chunk_size):
+        """
+        predict_batch() over a process pool
+        """
+        if self.pool is None or self.pool_workers != workers:
+            self.close()
+            self.pool = scoring_pool('anomaly_detection_model.pkl', 'feature_pipeline.pkl', workers)
+            self.pool_workers = workers
+
+        # As in predict_batch(), only valid records are counted, and any invalid one fails the batch;
+        # the records are checked by the workers first, so the counting below can assume they are valid
+        errors = {}
+        offset = 0
+        chunks = (records[start:start + chunk_size] for start in range(0, len(records), chunk_size))
+        for chunk, chunk_errors in ordered_map(self.pool, validate_records_task, chunks, workers):
+            errors.update({offset + i: message for i, message in chunk_errors.items()})
+            offset += len(chunk)
+        if errors:
+            self.pipeline.feature_store.observe([record for i, record in enumerate(records) if i not in errors])
+            raise ValueError(f"Invalid records: {errors}")
+
+        # Login frequencies are counted here, in input order, so each chunk can be scored independently
+        frequencies = self.pipeline.feature_store.observe(records)
+        chunks = (
+            (records[start:start + chunk_size],
+             {column: values[start:start + chunk_size] for column, values in frequencies.items()})
+            for start in range(0, len(records), chunk_size)
+        )
+
+        results = []
+        for _, (predictions, probabilities, _) in ordered_map(self.pool, score_records_task, chunks, workers):
+            for i in range(len(predictions)):
+                results.append({
+                    'is_anomaly': bool(predictions[i]),
+                    'probability_normal': float(probabilities[i][0]),
+                    'probability_anomaly': float(probabilities[i][1])
+                })
+        return results
+
+    def close(self):
+        """
+        Stop the worker processes of parallel batches
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.pool_workers = None
+
 # Example usage
 if __name__ == "__main__":
     # Initialize the detector
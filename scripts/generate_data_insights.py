@@ -2,11 +2,16 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
-# Load the dataset
-df = pd.read_csv('../data/sample_dataset.csv')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'backend'))
+from dataset_io import read_dataset
+
+# Load the dataset (its Parquet/Feather conversion when there is one)
+df = read_dataset('../data/sample_dataset.csv')
 
 # Set up the plotting style
 plt.style.use('seaborn-v0_8')
@@ -1,121 +1,486 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import StandardScaler, LabelEncoder
 import json
 import os
+import sys
+import glob
+import hashlib
+import atexit
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-# File to store prediction history
-PREDICTIONS_HISTORY_FILE = '../../data/predictions_history.json'
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, '..', 'backend'))
+
+from compiled_forest import CompiledForest, compile_model
+from feature_pipeline import FeaturePipeline
+from model_artifact import load_artifact
+from feature_store import FrequencyFeatureStore
+from history_store import PredictionHistoryStore
+from history_writer import HistoryWriter
+from prediction_stats import PredictionStats
+from model_registry import ModelRegistry, file_sha256
+from model_reloader import ModelReloader, ServingModel
+from shadow_scorer import ShadowScorer
+
+# Startup time breakdown in seconds, reported by /ready
+startup_timings = {'imports': time.perf_counter() - STARTUP_STARTED}
+
+# Prediction history: SQLite store (WAL mode) plus the legacy JSON file it is seeded from
+PREDICTIONS_HISTORY_FILE = os.path.join(current_dir, '..', '..', 'data', 'predictions_history.json')
+PREDICTIONS_HISTORY_DB = os.environ.get(
+    'PREDICTIONS_HISTORY_DB', os.path.join(current_dir, '..', '..', 'data', 'predictions_history.db')
+)
+
+# History retention: keep at most HISTORY_MAX_RECORDS rows and, if set, drop rows older than HISTORY_MAX_AGE_DAYS
+HISTORY_MAX_RECORDS = int(os.environ.get('HISTORY_MAX_RECORDS', 1000))
+HISTORY_MAX_AGE_DAYS = float(os.environ['HISTORY_MAX_AGE_DAYS']) if os.environ.get('HISTORY_MAX_AGE_DAYS') else None
+HISTORY_COMPACT_INTERVAL = float(os.environ.get('HISTORY_COMPACT_INTERVAL', 60))
+
+# Background history writer: bounded queue, group-commit size/interval and full-queue policy ('drop' or 'block')
+HISTORY_QUEUE_SIZE = int(os.environ.get('HISTORY_QUEUE_SIZE', 10000))
+HISTORY_FLUSH_SIZE = int(os.environ.get('HISTORY_FLUSH_SIZE', 500))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 0.5))
+HISTORY_QUEUE_POLICY = os.environ.get('HISTORY_QUEUE_POLICY', 'drop')
+
+# Page size limits for /predictions/history
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 100))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 1000))
+
+# Snapshot of the incrementally maintained prediction statistics, written on shutdown
+PREDICTION_STATS_SNAPSHOT = os.environ.get(
+    'PREDICTION_STATS_SNAPSHOT', os.path.join(current_dir, '..', '..', 'data', 'prediction_stats.json')
+)
+
+# Set by the preforked server (server.py): the master loads and warms up the model, and each
+# forked worker starts its own history store, writer and stats with start_services()
+API_DEFER_SERVICES = os.environ.get('API_DEFER_SERVICES') == '1'
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-import os
-
-# Get the directory of the current script
-current_dir = os.path.dirname(os.path.abspath(__file__))
+model_load_started = time.perf_counter()
 
-# Load the trained model and encoders from models directory
+# Load the trained model and feature pipeline from models directory
 model_path = os.path.join(current_dir, '..', '..', 'models', 'anomaly_detection_model.pkl')
 scaler_path = os.path.join(current_dir, '..', '..', 'models', 'scaler.pkl')
-geo_encoder_path = os.path.join(current_dir, '..', '..', 'models', 'geo_encoder.pkl')
-device_encoder_path = os.path.join(current_dir, '..', '..', 'models', 'device_encoder.pkl')
+pipeline_path = os.path.join(current_dir, '..', '..', 'models', 'feature_pipeline.pkl')
+# Compact memory-mapped model exported by `main.py --export`; used instead of the pickles when present
+MODEL_ARTIFACT = os.environ.get(
+    'MODEL_ARTIFACT', os.path.join(current_dir, '..', '..', 'models', 'anomaly_detection_model.bin')
+)
 
-if not os.path.exists(model_path):
-    raise FileNotFoundError(f"Model file not found: {model_path}")
+# Inference backend: 'compiled' walks the forest as flat NumPy node arrays (low per-call overhead for
+# single rows and small batches; batches over COMPILED_MAX_ROWS rows still go to sklearn when the
+# pickled model is loaded), 'sklearn' always calls the model's predict_proba. Both give identical probabilities.
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'compiled')
+COMPILED_MAX_ROWS = int(os.environ.get('COMPILED_MAX_ROWS', 512))
 
-model = joblib.load(model_path)
-scaler = joblib.load(scaler_path)
-geo_encoder = joblib.load(geo_encoder_path)
-device_encoder = joblib.load(device_encoder_path)
+# Versioned models (see src/backend/model_registry.py): the version named by the registry's
+# CURRENT file is served, and promoting another one is picked up within MODEL_RELOAD_INTERVAL
+# seconds (0 disables the watcher). Without a promoted version the files above are served.
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', os.path.join(current_dir, '..', '..', 'models', 'registry'))
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+# Required in the X-Admin-Token header of /admin routes when set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+registry = ModelRegistry(MODEL_REGISTRY_DIR) if MODEL_REGISTRY_DIR else None
 
-def preprocess_data(data):
+# Shadow scoring: SHADOW_SAMPLE_RATE of the requests are also scored by the registry version
+# SHADOW_MODEL_VERSION in a background process and compared with the live model (/shadow/metrics)
+SHADOW_MODEL_VERSION = os.environ.get('SHADOW_MODEL_VERSION')
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 0.05))
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1000))
+SHADOW_NICE = int(os.environ.get('SHADOW_NICE', 10))
+
+# Unseen geo locations/devices: 'value' encodes them as CATEGORY_UNKNOWN_VALUE, 'error' rejects the record
+CATEGORY_UNKNOWN_POLICY = os.environ.get('CATEGORY_UNKNOWN_POLICY', 'value')
+CATEGORY_UNKNOWN_VALUE = int(os.environ.get('CATEGORY_UNKNOWN_VALUE', -1))
+
+# The running login counts, shared by every model version served (set up below)
+feature_store = None
+
+def load_serving_model(version=None):
     """
-    Preprocess the input data for prediction
+    Load a model version from the registry (default: its current version),
+    or the model files in models/ when no version was promoted
     """
-    # Convert to DataFrame
-    df = pd.DataFrame([data])
-    
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Extract time-based features
-    df['login_hour'] = df['timestamp'].dt.hour
-    df['login_day'] = df['timestamp'].dt.day
-    df['login_month'] = df['timestamp'].dt.month
-    df['login_year'] = df['timestamp'].dt.year
-    df['login_weekday'] = df['timestamp'].dt.weekday
-    
-    # Encode categorical variables (handle unseen categories)
+    if version is None and registry is not None:
+        version = registry.current_version()
+    if version is not None:
+        files = registry.files(version)
+        if 'anomaly_detection_model.pkl' not in files:
+            raise FileNotFoundError(f"Model version {version} not found in {registry.directory}")
+        source = registry.version_path(version)
+        version_model_path = files['anomaly_detection_model.pkl']
+        version_scaler_path = files['scaler.pkl']
+        version_pipeline_path = files['feature_pipeline.pkl']
+        artifact_path = files.get('anomaly_detection_model.bin')
+    else:
+        source = os.path.dirname(os.path.abspath(model_path))
+        version_model_path, version_scaler_path, version_pipeline_path = model_path, scaler_path, pipeline_path
+        artifact_path = MODEL_ARTIFACT
+
+    serving_pipeline = FeaturePipeline.load(version_pipeline_path)
+    if INFERENCE_BACKEND == 'compiled' and artifact_path and os.path.exists(artifact_path):
+        # Opened read-only with mmap: every worker shares the same pages and no pickle is loaded
+        artifact = load_artifact(artifact_path)
+        artifact.validate(serving_pipeline)
+        serving_model, serving_scaler, serving_predictor = None, None, artifact.forest
+        loaded_path = artifact_path
+    else:
+        if not os.path.exists(version_model_path):
+            raise FileNotFoundError(f"Model file not found: {version_model_path}")
+        artifact = None
+        serving_model = joblib.load(version_model_path)
+        serving_scaler = joblib.load(version_scaler_path)
+        serving_predictor = compile_model(serving_model, INFERENCE_BACKEND, COMPILED_MAX_ROWS)
+        loaded_path = version_model_path
+    if version is None:
+        # Unversioned model files are identified by their content
+        version = f"local-{file_sha256(loaded_path)[:12]}"
+
+    serving_pipeline.set_unknown_policy(CATEGORY_UNKNOWN_POLICY, CATEGORY_UNKNOWN_VALUE)
+    # A reloaded model keeps counting logins where the previous one left off
+    if feature_store is not None:
+        serving_pipeline.feature_store = feature_store
+    return ServingModel(version, serving_pipeline, serving_predictor, serving_model, serving_scaler, artifact, source)
+
+def warm_up_model(serving):
+    """
+    Score a synthetic login once so the first real request does not pay for lazy
+    initialization; the feature store counts are left untouched
+    """
+    record = {
+        'user_id': 'warm-up', 'timestamp': '2025-01-01 12:00:00',
+        'geo_location': str(serving.pipeline.geo_encoder.classes_[0]),
+        'device_id': str(serving.pipeline.device_encoder.classes_[0]),
+        'is_new_device': 0, 'bytes_in': 1000, 'bytes_out': 1000, 'success': 1
+    }
+    features, _, errors = serving.pipeline.transform_records([record], update_counts=False)
+    if errors:
+        raise RuntimeError(f"Warm-up record was rejected: {errors}")
+    score(features, serving)
+    # The batch path (and sklearn, for batches over COMPILED_MAX_ROWS) is warmed up too
+    score(np.repeat(features, COMPILED_MAX_ROWS + 1, axis=0), serving)
+
+# Holds the active model; warm-up runs with the other startup steps below
+model_reloader = ModelReloader(load_serving_model, warm_up_model, registry, MODEL_RELOAD_INTERVAL)
+model_reloader.active = load_serving_model()
+pipeline = model_reloader.active.pipeline
+
+# Running login counts per user/device/location: restored from the last API
+# snapshot, else the one saved with the pipeline, else bootstrapped from the dataset
+FEATURE_STORE_SNAPSHOT = os.environ.get(
+    'FEATURE_STORE_SNAPSHOT', os.path.join(current_dir, '..', '..', 'data', 'feature_store_snapshot.pkl')
+)
+# Counting backend when bootstrapping: 'exact' (bounded by FEATURE_STORE_MAX_KEYS per entity type)
+# or 'sketch' (fixed-memory Count-Min Sketch with additive error FEATURE_STORE_SKETCH_EPSILON * logins)
+FEATURE_STORE_BACKEND = os.environ.get('FEATURE_STORE_BACKEND', 'exact')
+FEATURE_STORE_MAX_KEYS = int(os.environ.get('FEATURE_STORE_MAX_KEYS', 1000000))
+FEATURE_STORE_SKETCH_EPSILON = float(os.environ.get('FEATURE_STORE_SKETCH_EPSILON', 1e-5))
+# Half-life in days of time-decayed login counts, served instead of the all-time counts
+# the model was trained on when set (exact backend only; unset: all-time counts)
+FEATURE_STORE_HALF_LIFE_DAYS = float(os.environ['FEATURE_STORE_HALF_LIFE_DAYS']) if os.environ.get('FEATURE_STORE_HALF_LIFE_DAYS') else None
+training_data_path = os.path.join(current_dir, '..', '..', 'data', 'Dataset.csv')
+
+if os.path.exists(FEATURE_STORE_SNAPSHOT):
+    pipeline.feature_store = FrequencyFeatureStore.load(FEATURE_STORE_SNAPSHOT)
+elif pipeline.feature_store is None:
+    if FEATURE_STORE_BACKEND == 'sketch':
+        feature_store_options = {'epsilon': FEATURE_STORE_SKETCH_EPSILON}
+    else:
+        feature_store_options = {'max_keys': FEATURE_STORE_MAX_KEYS, 'half_life_days': FEATURE_STORE_HALF_LIFE_DAYS}
+    pipeline.feature_store = FrequencyFeatureStore.load_or_bootstrap(
+        [], training_data_path, backend=FEATURE_STORE_BACKEND, **feature_store_options
+    )
+feature_store = pipeline.feature_store
+if isinstance(feature_store, FrequencyFeatureStore):
+    feature_store.max_keys = FEATURE_STORE_MAX_KEYS
+    # A store saved without a half-life starts decaying its counts from each key's last login
+    feature_store.half_life_days = FEATURE_STORE_HALF_LIFE_DAYS
+elif FEATURE_STORE_HALF_LIFE_DAYS is not None:
+    print("FEATURE_STORE_HALF_LIFE_DAYS is ignored: the sketch feature store keeps no decayed counts")
+
+def worker_snapshot_paths():
+    """
+    Snapshots saved by the forked workers of the preforked server, one per worker
+    """
+    return sorted(glob.glob(f"{glob.escape(FEATURE_STORE_SNAPSHOT)}.worker-*"))
+
+def save_feature_store():
+    """
+    Snapshot the running counts so the next start is warm. A forked worker
+    saves its own file, merged into the snapshot by merge_worker_snapshots()
+    """
+    path = f"{FEATURE_STORE_SNAPSHOT}.worker-{os.getpid()}" if API_DEFER_SERVICES else FEATURE_STORE_SNAPSHOT
     try:
-        df['geo_location_encoded'] = geo_encoder.transform(df['geo_location'])
-    except ValueError:
-        df['geo_location_encoded'] = -1  # Unknown category
-    
+        feature_store.save(path)
+    except Exception as e:
+        print(f"Error saving feature store snapshot: {e}")
+
+def merge_worker_snapshots():
+    """
+    Add the logins the workers counted to the feature store they were forked
+    with and save it as the snapshot. Runs in the server when its workers have
+    exited, and at startup for snapshots left by a server that did not
+    """
+    paths = worker_snapshot_paths()
+    if not paths:
+        return
+    forks = []
+    for path in paths:
+        try:
+            fork = FrequencyFeatureStore.load(path)
+        except Exception as e:
+            print(f"Error loading worker feature store snapshot {path}: {e}")
+            continue
+        if type(fork) is not type(feature_store):
+            print(f"Skipping worker feature store snapshot {path}: it was saved by a different backend")
+            continue
+        forks.append(fork)
     try:
-        df['device_id_encoded'] = device_encoder.transform(df['device_id'])
-    except ValueError:
-        df['device_id_encoded'] = -1  # Unknown category
+        feature_store.merge_forks(forks)
+        feature_store.save(FEATURE_STORE_SNAPSHOT)
+    except Exception as e:
+        print(f"Error merging worker feature store snapshots: {e}")
+        return
+    for path in paths:
+        os.remove(path)
+
+merge_worker_snapshots()
+
+startup_timings['model_load'] = time.perf_counter() - model_load_started
+
+shadow_scorer = ShadowScorer(max_queue=SHADOW_QUEUE_SIZE, nice=SHADOW_NICE)
+atexit.register(shadow_scorer.stop)
+
+def shadow_spec(version):
+    """
+    What the shadow process needs to load a registry version as the candidate
+    """
+    files = registry.files(version) if registry is not None else {}
+    if 'anomaly_detection_model.pkl' not in files:
+        raise ValueError(f"Model version {version} not found in the registry")
+    return {
+        'version': version,
+        'model_path': files['anomaly_detection_model.pkl'],
+        'pipeline_path': files['feature_pipeline.pkl'],
+        'artifact_path': files.get('anomaly_detection_model.bin'),
+        'inference_backend': INFERENCE_BACKEND,
+        'compiled_max_rows': COMPILED_MAX_ROWS,
+        'unknown_policy': CATEGORY_UNKNOWN_POLICY,
+        'unknown_value': CATEGORY_UNKNOWN_VALUE
+    }
+
+def shadow_request(records, features, results, live_seconds):
+    """
+    Hand a sampled request (its valid records, features and live results) to the shadow scorer
+    """
+    shadow_scorer.submit(
+        records, features,
+        np.fromiter((result['anomaly'] for result in results), dtype=np.int64, count=len(results)),
+        np.fromiter((result['probability_anomaly'] for result in results), dtype=np.float64, count=len(results)),
+        live_seconds
+    )
+
+# Upper bound on the number of records accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+def preprocess_records(records, serving=None):
+    """
+    Preprocess a list of login records into one float32 feature matrix.
+
+    Returns the feature matrix for the valid records, the positions of
+    those records in the input list, and a dict mapping the position of
+    every malformed record to an error message.
+    """
+    return (serving or model_reloader.active).pipeline.transform_records(records)
+
+def preprocess_data(data, serving=None):
+    """
+    Preprocess the input data for prediction
+    """
+    features, _, errors = preprocess_records([data], serving)
+    if errors:
+        raise ValueError(errors[0])
+    return features
+
+def score(features, serving=None):
+    """
+    Score preprocessed features with a single predict_proba call.
+
+    The label is derived from the probabilities the same way
+    RandomForestClassifier.predict does, so the forest is traversed once.
+    Each result names the model version that scored it.
+    """
+    serving = serving or model_reloader.active
+    probabilities = serving.predictor.predict_proba(features)
+    predictions = serving.predictor.classes_.take(np.argmax(probabilities, axis=1))
+    return [
+        {
+            'anomaly': int(prediction),
+            'probability_normal': float(probability[0]),
+            'probability_anomaly': float(probability[1]),
+            'model_version': serving.version
+        }
+        for prediction, probability in zip(predictions, probabilities)
+    ]
+
+def predict_records(records, errors=None):
+    """
+    Preprocess and score a list of records as one block and queue their history.
+
+    errors maps positions already known to be malformed to their message.
+    Returns the results in input order (an {'error': ...} slot for each
+    malformed record) and the number of errors.
+    """
+    errors = dict(errors or {})
+    # One model version for the whole block, even if a reload swaps it meanwhile
+    serving = model_reloader.active
+    pending = [i for i in range(len(records)) if i not in errors]
+    processed_data, positions, record_errors = preprocess_records([records[i] for i in pending], serving)
+    for i, message in record_errors.items():
+        errors[pending[i]] = message
     
-    # Feature engineering (simplified for single prediction)
-    # In a real application, you would need to maintain running counts
-    df['user_login_frequency'] = 1  # Placeholder
-    df['device_login_frequency'] = 1  # Placeholder
-    df['location_login_frequency'] = 1  # Placeholder
+    results = [None] * len(records)
+    for i, message in errors.items():
+        results[i] = {'error': message}
     
-    # Select features for modeling
-    features = [
-        'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-        'is_new_device', 'bytes_in', 'bytes_out', 'success',
-        'geo_location_encoded', 'device_id_encoded',
-        'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-    ]
+    if positions:
+        scoring_started = time.perf_counter()
+        scored = score(processed_data, serving)
+        live_seconds = time.perf_counter() - scoring_started
+        history = []
+        for position, result in zip(positions, scored):
+            index = pending[position]
+            results[index] = result
+            history.append({'input_data': records[index], 'prediction': result})
+        save_predictions_to_history(history)
+        if shadow_scorer.sampled():
+            shadow_request([records[pending[position]] for position in positions], processed_data, scored, live_seconds)
+    return results, len(errors)
+
+def parse_batch_request():
+    """
+    Parse the records of a batch request from a JSON array or NDJSON body.
+
+    NDJSON lines that are not valid JSON are returned as error slots so they
+    keep their position in the response.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        records = []
+        errors = {}
+        lines = [line for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        for i, line in enumerate(lines):
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                records.append(None)
+                errors[i] = f"Invalid JSON: {e.msg}"
+        return records, errors
     
-    return df[features]
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get('records'), list):
+        data = data['records']
+    if not isinstance(data, list):
+        raise ValueError('Request body must be a JSON array of login records or NDJSON')
+    return data, {}
+
+history_store = None
+history_writer = None
+prediction_stats = None
+
+def shutdown_history():
+    """
+    Flush queued history, then persist the stats snapshot
+    """
+    history_writer.stop()
+    try:
+        prediction_stats.refresh()
+        prediction_stats.save_snapshot()
+    except Exception as e:
+        print(f"Error saving prediction stats snapshot: {e}")
+
+def start_services():
+    """
+    Open the history store and start the background writer, compactor and
+    stats, registering their shutdown (and the feature store snapshot) at exit.
+
+    Runs at import, or in each forked worker of the preforked server, since
+    threads and SQLite connections must not be shared across a fork.
+    """
+    global history_store, history_writer, prediction_stats
+    services_started = time.perf_counter()
+    history_store = PredictionHistoryStore(
+        PREDICTIONS_HISTORY_DB,
+        max_records=HISTORY_MAX_RECORDS,
+        max_age_days=HISTORY_MAX_AGE_DAYS,
+        compact_interval=HISTORY_COMPACT_INTERVAL,
+        legacy_json_path=PREDICTIONS_HISTORY_FILE
+    )
+    history_store.start_compactor()
+    atexit.register(history_store.close)
+
+    history_writer = HistoryWriter(
+        history_store,
+        max_queue=HISTORY_QUEUE_SIZE,
+        flush_interval=HISTORY_FLUSH_INTERVAL,
+        flush_size=HISTORY_FLUSH_SIZE,
+        policy=HISTORY_QUEUE_POLICY
+    )
+    history_writer.start()
+
+    prediction_stats = PredictionStats(history_store, snapshot_path=PREDICTION_STATS_SNAPSHOT)
+    # Registers this worker as a reader, so no other worker compacts rows it has not counted
+    prediction_stats.refresh()
+    history_store.before_compact.append(prediction_stats.refresh)
+
+    # Promoted registry versions are picked up by every process serving requests
+    model_reloader.start_watcher()
+    atexit.register(model_reloader.stop)
+
+    if SHADOW_MODEL_VERSION:
+        try:
+            shadow_scorer.start(shadow_spec(SHADOW_MODEL_VERSION), SHADOW_SAMPLE_RATE)
+        except ValueError as e:
+            print(f"Shadow scoring disabled: {e}")
+
+    atexit.register(save_feature_store)
+    atexit.register(shutdown_history)
+    startup_timings['services'] = time.perf_counter() - services_started
 
 def load_prediction_history():
     """
-    Load prediction history from file
+    Load prediction history from the history store
     """
     try:
-        if os.path.exists(PREDICTIONS_HISTORY_FILE):
-            with open(PREDICTIONS_HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            return []
+        return history_store.load(limit=HISTORY_MAX_RECORDS)
     except Exception as e:
         print(f"Error loading prediction history: {e}")
         return []
 
 def save_prediction_to_history(prediction_data):
     """
-    Save prediction to history file
+    Save prediction to the history store
+    """
+    return save_predictions_to_history([prediction_data])
+
+def save_predictions_to_history(predictions):
+    """
+    Queue a group of predictions for the background history writer.
+
+    Returns False if any of them were dropped because the queue is full.
     """
     try:
-        # Load existing history
-        history = load_prediction_history()
-        
-        # Add timestamp to the prediction
-        prediction_data['timestamp'] = datetime.now().isoformat()
-        
-        # Add to history
-        history.append(prediction_data)
-        
-        # Keep only the last 1000 predictions to avoid file growing too large
-        if len(history) > 1000:
-            history = history[-1000:]
-        
-        # Save back to file
-        with open(PREDICTIONS_HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
-            
-        return True
+        return history_writer.submit(predictions) == len(predictions)
     except Exception as e:
         print(f"Error saving prediction to history: {e}")
         return False
@@ -125,45 +490,7 @@ def calculate_prediction_stats():
     Calculate statistics about predictions
     """
     try:
-        # Load prediction history
-        history = load_prediction_history()
-        
-        # Calculate basic stats
-        total_predictions = len(history)
-        anomaly_count = sum(1 for pred in history if pred['prediction']['anomaly'] == 1)
-        normal_count = total_predictions - anomaly_count
-        
-        # Calculate accuracy (assuming normal predictions are correct)
-        accuracy = normal_count / total_predictions if total_predictions > 0 else 0
-        
-        # Calculate hourly distribution
-        hourly_counts = {hour: 0 for hour in range(24)}
-        geo_counts = {}
-        
-        for pred in history:
-            # Parse timestamp and extract hour
-            try:
-                timestamp = pred.get('timestamp') or pred['input_data'].get('timestamp')
-                if timestamp:
-                    hour = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).hour
-                    hourly_counts[hour] += 1
-            except Exception:
-                # If we can't parse the timestamp, skip this record
-                pass
-            
-            # Count geographic locations
-            geo_location = pred['input_data'].get('geo_location')
-            if geo_location:
-                geo_counts[geo_location] = geo_counts.get(geo_location, 0) + 1
-        
-        return {
-            'total_predictions': total_predictions,
-            'anomaly_count': anomaly_count,
-            'normal_count': normal_count,
-            'accuracy': accuracy,
-            'hourly_distribution': hourly_counts,
-            'geographic_distribution': geo_counts
-        }
+        return prediction_stats.summary()
     except Exception as e:
         print(f"Error calculating prediction stats: {e}")
         return {
@@ -172,7 +499,8 @@ def calculate_prediction_stats():
             'normal_count': 0,
             'accuracy': 0,
             'hourly_distribution': {hour: 0 for hour in range(24)},
-            'geographic_distribution': {}
+            'geographic_distribution': {},
+            'windows': {}
         }
 
 @app.route('/')
@@ -218,20 +546,15 @@ def predict():
     try:
         # Get data from request
         data = request.json
+        serving = model_reloader.active
         
         # Preprocess the data
-        processed_data = preprocess_data(data)
+        processed_data = preprocess_data(data, serving)
         
         # Make prediction
-        prediction = model.predict(processed_data)
-        probability = model.predict_proba(processed_data)
-        
-        # Prepare response
-        result = {
-            'anomaly': int(prediction[0]),
-            'probability_normal': float(probability[0][0]),
-            'probability_anomaly': float(probability[0][1])
-        }
+        scoring_started = time.perf_counter()
+        result = score(processed_data, serving)[0]
+        live_seconds = time.perf_counter() - scoring_started
         
         # Save prediction to history (include input data)
         prediction_record = {
@@ -239,27 +562,221 @@ def predict():
             'prediction': result
         }
         save_prediction_to_history(prediction_record)
+        if shadow_scorer.sampled():
+            shadow_request([data], processed_data, [result], live_seconds)
         
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Predict a batch of logins in one vectorized pass.
+
+    Results are returned in input order; malformed records get an
+    {'error': ...} slot instead of a prediction.
+    """
+    try:
+        records, errors = parse_batch_request()
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large: {len(records)} records (max {MAX_BATCH_SIZE})'}), 413
+        
+        results, error_count = predict_records(records, errors)
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'error_count': error_count,
+            'model_version': next((result['model_version'] for result in results if 'model_version' in result),
+                                  model_reloader.active.version)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/health', methods=['GET'])
 def health():
     """
     Health check endpoint
     """
-    return jsonify({'status': 'healthy'})
+    active = model_reloader.active
+    return jsonify({'status': 'healthy', 'model_version': active.version, 'model_loaded_at': active.loaded_at})
+
+def warm_up():
+    """
+    Warm up the model loaded at startup
+    """
+    warm_up_started = time.perf_counter()
+    warm_up_model(model_reloader.active)
+    startup_timings['warm_up'] = time.perf_counter() - warm_up_started
+
+def admin_authorized():
+    return not ADMIN_TOKEN or request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+@app.route('/admin/model', methods=['GET'])
+def admin_model():
+    """
+    The served model version, reload history and registry versions
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    status = model_reloader.status()
+    status['registry'] = {
+        'directory': registry.directory if registry is not None else None,
+        'current': registry.current_version() if registry is not None else None,
+        'versions': registry.versions() if registry is not None else []
+    }
+    return jsonify(status)
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Load a model version in the background, warm it up and swap it in.
+
+    JSON body (optional): version (default: the registry's current
+    version), promote (also make it the registry's current version, so the
+    other workers follow), wait (respond once the swap is done).
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    body = request.get_json(silent=True) or {}
+    version = body.get('version')
+    try:
+        if version and registry is not None and body.get('promote'):
+            registry.promote(version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    if body.get('wait'):
+        result = model_reloader.reload(version, force=bool(body.get('force')))
+        return jsonify(result), 500 if result['status'] == 'failed' else 200
+    model_reloader.reload_in_background(version, force=bool(body.get('force')))
+    return jsonify({'status': 'loading', 'version': version or (registry.current_version() if registry else None),
+                    'active_version': model_reloader.active.version}), 202
+
+@app.route('/admin/shadow', methods=['POST'])
+def admin_shadow():
+    """
+    Start shadowing a candidate registry version, change the sample rate, or stop.
+
+    JSON body: version (null stops shadow scoring) and sample_rate (default SHADOW_SAMPLE_RATE).
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    body = request.get_json(silent=True) or {}
+    version = body.get('version')
+    sample_rate = float(body.get('sample_rate', SHADOW_SAMPLE_RATE))
+    if not 0 <= sample_rate <= 1:
+        return jsonify({'error': 'sample_rate must be between 0 and 1'}), 400
+    if version is None:
+        shadow_scorer.stop()
+    elif version == shadow_scorer.version and shadow_scorer.status in ('loading', 'running'):
+        shadow_scorer.sample_rate = sample_rate
+    else:
+        try:
+            shadow_scorer.start(shadow_spec(version), sample_rate)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 404
+    return jsonify(shadow_scorer.metrics())
+
+@app.route('/shadow/metrics', methods=['GET'])
+def shadow_metrics():
+    """
+    Agreement rate, probability deltas and latency of the candidate vs the live model
+    """
+    metrics = shadow_scorer.metrics()
+    metrics['live_version'] = model_reloader.active.version
+    return jsonify(metrics)
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness endpoint: 503 until the model is warmed up and the history services are running
+    """
+    is_ready = 'warm_up' in startup_timings and history_writer is not None
+    return jsonify({
+        'status': 'ready' if is_ready else 'starting',
+        'pid': os.getpid(),
+        'startup_seconds': {name: round(seconds, 4) for name, seconds in startup_timings.items()}
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Operational metrics (history persistence queue)
+    """
+    active = model_reloader.active
+    return jsonify({
+        'history_writer': history_writer.metrics(),
+        'inference_backend': 'compiled' if isinstance(active.predictor, CompiledForest) else 'sklearn',
+        'model_artifact': active.model_artifact.path if active.model_artifact is not None else None,
+        'model_version': active.version,
+        'shadow': {name: value for name, value in shadow_scorer.metrics().items()
+                   if name in ('candidate_version', 'status', 'sample_rate', 'agreement_rate')}
+    })
+
+def parse_time_param(value):
+    """
+    Parse a since/until query value given as epoch seconds or an ISO-8601 timestamp
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
 
 @app.route('/predictions/history', methods=['GET'])
 def get_predictions_history():
     """
-    Get prediction history
+    Get a page of prediction history, newest first.
+
+    Query parameters: limit, cursor (next_cursor of the previous page) or
+    offset, since/until (epoch seconds or ISO-8601), anomaly, user_id,
+    geo_location, device_id, fields (comma separated) and order (desc/asc).
+    Responses carry an ETag; a matching If-None-Match returns 304.
     """
     try:
-        history = load_prediction_history()
-        return jsonify(history)
+        args = request.args
+        
+        # The store version changes whenever rows are added or compacted away,
+        # so it identifies the page contents without running the query
+        etag = hashlib.sha1(
+            f"{history_store.version()}?{sorted(args.items(multi=True))}".encode()
+        ).hexdigest()
+        if etag in request.if_none_match:
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        limit = min(int(args.get('limit', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+        filters = {
+            column: args[column] for column in history_store.FILTER_COLUMNS if column in args
+        }
+        if 'anomaly' in filters:
+            filters['anomaly'] = int(filters['anomaly'])
+        fields = [field.strip() for field in args['fields'].split(',')] if args.get('fields') else None
+        
+        items, next_cursor = history_store.query(
+            filters=filters,
+            since=parse_time_param(args.get('since')),
+            until=parse_time_param(args.get('until')),
+            cursor=int(args['cursor']) if args.get('cursor') else None,
+            offset=int(args.get('offset', 0)),
+            limit=limit,
+            fields=fields,
+            newest_first=args.get('order', 'desc') != 'asc'
+        )
+        
+        response = jsonify({
+            'items': items,
+            'count': len(items),
+            'next_cursor': str(next_cursor) if next_cursor is not None else None
+        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -275,5 +792,13 @@ def get_predictions_stats():
         return jsonify({'error': str(e)}), 400
 
 
+warm_up()
+if not API_DEFER_SERVICES:
+    start_services()
+
+
 if __name__ == '__main__':
+    # Importers report startup themselves (server.py from gunicorn's when_ready hook, asgi.py on start);
+    # /ready has the breakdown too
+    print("API startup: " + ', '.join(f"{name} {seconds:.3f}s" for name, seconds in startup_timings.items()))
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
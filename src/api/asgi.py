@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import api
+from micro_batcher import MicroBatcher
+
+# Micro-batching of single-record /predict requests: a batch is scored as soon as
+# ASYNC_MAX_BATCH_SIZE requests are waiting or ASYNC_MAX_WAIT_MS has passed since the first one
+ASYNC_MAX_BATCH_SIZE = int(os.environ.get('ASYNC_MAX_BATCH_SIZE', 64))
+ASYNC_MAX_WAIT_MS = float(os.environ.get('ASYNC_MAX_WAIT_MS', 2.0))
+# Threads running the Flask routes that are not micro-batched (history, stats, static pages)
+ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 8))
+# Largest request body accepted (413 beyond it)
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', 16 * 1024 * 1024))
+
+
+def score_records(records):
+    """
+    Score one micro-batch with a single vectorized pass; malformed records fail only their own request
+    """
+    results, _ = api.predict_records(records)
+    return [ValueError(result['error']) if 'error' in result else result for result in results]
+
+
+batcher = MicroBatcher(score_records, max_batch_size=ASYNC_MAX_BATCH_SIZE, max_wait_ms=ASYNC_MAX_WAIT_MS)
+wsgi_executor = ThreadPoolExecutor(max_workers=ASYNC_WSGI_THREADS, thread_name_prefix='wsgi')
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def read_body(receive, limit=None):
+    """
+    The whole request body; raises BodyTooLarge as soon as it exceeds limit bytes
+    """
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if limit is not None and len(body) > limit:
+            raise BodyTooLarge()
+        if not message.get('more_body'):
+            break
+    return body
+
+
+async def send_response(send, status, body, headers=()):
+    headers = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, status, data):
+    await send_response(send, status, json.dumps(data).encode('utf-8'), [('content-type', 'application/json')])
+
+
+class WsgiInstance(WsgiToAsgiInstance):
+    """
+    asgiref's WSGI bridge for one request, run on the given thread pool
+    (asgiref runs every WSGI call on one shared thread by default)
+    """
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        # The undecorated method, read from the class dict as attribute access binds the async wrapper
+        run_wsgi_app = vars(WsgiToAsgiInstance)['run_wsgi_app'].func
+        self.run_wsgi_app = sync_to_async(functools.partial(run_wsgi_app, self), thread_sensitive=False,
+                                          executor=executor)
+
+
+async def forward_to_flask(scope, body, send, executor=None):
+    """
+    Serve the request with the Flask app, on executor (default: the WSGI threads)
+    """
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    # The body has been read whole, so Flask sees it with a plain Content-Length even if it came chunked
+    headers = [(name, value) for name, value in scope['headers'] if name not in (b'content-length', b'transfer-encoding')]
+    headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    await WsgiInstance(api.app, executor or wsgi_executor)(dict(scope, headers=headers), receive, send)
+
+
+async def predict(body, send):
+    """
+    POST /predict: parse the record on the event loop and wait for its micro-batch
+    """
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        await send_json(send, 400, {'error': f"Invalid JSON: {e}"})
+        return
+    try:
+        result = await batcher.submit(data)
+    except Exception as e:
+        await send_json(send, 400, {'error': str(e)})
+        return
+    await send_json(send, 200, result)
+
+
+async def metrics(scope, body, send):
+    """
+    GET /metrics: the Flask metrics plus the micro-batching metrics
+    """
+    messages = []
+
+    async def capture(message):
+        messages.append(message)
+
+    await forward_to_flask(scope, body, capture)
+    data = json.loads(b''.join(message.get('body', b'') for message in messages[1:]))
+    data['micro_batching'] = batcher.metrics()
+    await send_json(send, messages[0]['status'], data)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            batcher.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await batcher.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    ASGI application: single-record /predict requests are micro-batched, /predict/batch
+    is scored on the same scoring thread, and every other route is served by the Flask app
+    """
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    # uvicorn rejects malformed framing itself; the size cap is checked before and while reading
+    length = dict(scope['headers']).get(b'content-length')
+    if length is not None and not length.isdigit():
+        await send_json(send, 400, {'error': 'Invalid Content-Length header'})
+        return
+    try:
+        if length is not None and int(length) > ASYNC_MAX_BODY_BYTES:
+            raise BodyTooLarge()
+        body = await read_body(receive, ASYNC_MAX_BODY_BYTES)
+    except BodyTooLarge:
+        await send_json(send, 413, {'error': f"Request body larger than {ASYNC_MAX_BODY_BYTES} bytes"})
+        return
+    method, path = scope['method'], scope['path']
+    if method == 'POST' and path == '/predict':
+        await predict(body, send)
+    elif method == 'POST' and path == '/predict/batch':
+        # Explicit batches are already vectorized; running them on the scoring thread keeps
+        # feature store updates in arrival order with the micro-batches
+        await forward_to_flask(scope, body, send, batcher.executor)
+    elif method == 'GET' and path == '/metrics':
+        await metrics(scope, body, send)
+    else:
+        await forward_to_flask(scope, body, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Async anomaly detection API with micro-batched scoring')
+    parser.add_argument('--host', type=str, default=os.environ.get('API_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('API_PORT', 5000)))
+    parser.add_argument('--max-batch-size', type=int, default=ASYNC_MAX_BATCH_SIZE,
+                        help='Largest micro-batch of /predict requests scored in one call')
+    parser.add_argument('--max-wait-ms', type=float, default=ASYNC_MAX_WAIT_MS,
+                        help='Longest a request waits for its micro-batch to fill')
+    args = parser.parse_args()
+
+    batcher.max_batch_size = args.max_batch_size
+    batcher.max_wait = args.max_wait_ms / 1000
+    print(f"Async API on http://{args.host}:{args.port}: micro-batches of up to {args.max_batch_size} "
+          f"requests, waiting at most {args.max_wait_ms} ms")
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit('The async API is served by uvicorn: pip install -r requirements.txt')
+    uvicorn.run(app, host=args.host, port=args.port, lifespan='on', log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+import sqlite3
+import threading
+import json
+import time
+import os
+from datetime import datetime
+
+
+class PredictionHistoryStore:
+    """
+    Append-only prediction history backed by a SQLite table in WAL mode.
+
+    Every write is a single INSERT, so recording a prediction costs the same
+    regardless of how much history is kept. WAL mode plus a busy timeout lets
+    several API worker processes append to the same file safely, and old
+    rows are trimmed by a background compactor instead of on the write path.
+
+    Consumers that tail the store (see PredictionStats) record how far they
+    have read with mark_read() and register a refresh in before_compact; the
+    compactor runs those first and never deletes rows a consumer of any
+    process has not read yet. A consumer that has not marked its position
+    for reader_ttl seconds (e.g. an exited worker) no longer holds rows back.
+    """
+
+    # Columns that can be filtered on by equality
+    FILTER_COLUMNS = ('user_id', 'geo_location', 'device_id', 'anomaly')
+
+    # Fields that can be projected in query results
+    FIELDS = ('id', 'timestamp', 'input_data', 'prediction', 'user_id', 'geo_location', 'device_id', 'anomaly')
+    DEFAULT_FIELDS = ('id', 'timestamp', 'input_data', 'prediction')
+
+    def __init__(self, db_path, max_records=1000, max_age_days=None, compact_interval=60,
+                 legacy_json_path=None, reader_ttl=3600):
+        self.db_path = db_path
+        self.max_records = max_records
+        self.max_age_days = max_age_days
+        self.compact_interval = compact_interval
+        self.reader_ttl = reader_ttl
+        # Callables run before every compaction, so consumers catch up before rows are deleted
+        self.before_compact = []
+        self._local = threading.local()
+        self._compactor = None
+        self._stop = threading.Event()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._create_schema()
+        if legacy_json_path:
+            self._import_legacy_json(legacy_json_path)
+
+    def _connect(self):
+        """
+        Get the SQLite connection for the calling thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        """
+        Create the predictions table and indexes if they do not exist yet
+        """
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS predictions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recorded_at REAL NOT NULL,
+                timestamp TEXT NOT NULL,
+                user_id TEXT,
+                geo_location TEXT,
+                device_id TEXT,
+                anomaly INTEGER,
+                input_data TEXT NOT NULL,
+                prediction TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_predictions_recorded_at ON predictions (recorded_at)')
+        # Last row id read by each consumer tailing the store
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS readers (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        # Filter columns are indexed together with id so filtered pages are served in id order from the index
+        for column in self.FILTER_COLUMNS:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_predictions_{column} ON predictions ({column}, id)')
+
+    def _import_legacy_json(self, json_path):
+        """
+        Import the old predictions_history.json file once, into an empty store
+        """
+        if not os.path.exists(json_path):
+            return
+        conn = self._connect()
+        if conn.execute('SELECT 1 FROM predictions LIMIT 1').fetchone():
+            return
+        try:
+            with open(json_path, 'r') as f:
+                history = json.load(f)
+        except Exception as e:
+            print(f"Error importing legacy prediction history: {e}")
+            return
+
+        rows = []
+        for record in history:
+            timestamp = record.get('timestamp') or datetime.now().isoformat()
+            try:
+                recorded_at = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                recorded_at = time.time()
+            rows.append(self._row(record, timestamp, recorded_at))
+        self._insert(rows)
+
+    @staticmethod
+    def _row(record, timestamp, recorded_at):
+        """
+        Flatten a prediction record into a table row
+        """
+        input_data = record.get('input_data') or {}
+        prediction = record.get('prediction') or {}
+        return (
+            recorded_at,
+            timestamp,
+            input_data.get('user_id'),
+            input_data.get('geo_location'),
+            input_data.get('device_id'),
+            prediction.get('anomaly'),
+            json.dumps(input_data),
+            json.dumps(prediction)
+        )
+
+    def _insert(self, rows):
+        """
+        Insert rows in one transaction
+        """
+        if not rows:
+            return
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO predictions (recorded_at, timestamp, user_id, geo_location, device_id, '
+                'anomaly, input_data, prediction) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def append(self, records):
+        """
+        Append prediction records in one transaction.
+
+        Records that already carry a 'timestamp' (ISO format, as written by
+        HistoryWriter) keep it; the others are stamped with the current time,
+        matching the format the JSON history file used.
+        """
+        now = datetime.now()
+        rows = []
+        for record in records:
+            timestamp = record.get('timestamp')
+            if timestamp:
+                recorded_at = datetime.fromisoformat(timestamp).timestamp()
+            else:
+                timestamp = record['timestamp'] = now.isoformat()
+                recorded_at = now.timestamp()
+            rows.append(self._row(record, timestamp, recorded_at))
+        self._insert(rows)
+
+    def load(self, limit=None):
+        """
+        Load prediction records, oldest first
+        """
+        query = 'SELECT timestamp, input_data, prediction FROM predictions ORDER BY id DESC'
+        params = ()
+        if limit is not None:
+            query += ' LIMIT ?'
+            params = (limit,)
+        rows = self._connect().execute(query, params).fetchall()
+        return [
+            {
+                'input_data': json.loads(input_data),
+                'prediction': json.loads(prediction),
+                'timestamp': timestamp
+            }
+            for timestamp, input_data, prediction in reversed(rows)
+        ]
+
+    def last_id(self):
+        """
+        Highest row id ever assigned (0 for a new store)
+        """
+        row = self._connect().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'predictions'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def rows_since(self, last_id, batch_size=10000):
+        """
+        Yield (id, timestamp, recorded_at, geo_location, anomaly) for rows after last_id, in id order
+        """
+        conn = self._connect()
+        while True:
+            rows = conn.execute(
+                'SELECT id, timestamp, recorded_at, geo_location, anomaly FROM predictions '
+                'WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, batch_size)
+            ).fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def mark_read(self, name, last_id):
+        """
+        Record that consumer name has read every row up to last_id
+        """
+        self._connect().execute(
+            'INSERT OR REPLACE INTO readers (name, last_id, updated_at) VALUES (?, ?, ?)',
+            (name, last_id, time.time())
+        )
+
+    def _read_bound(self, conn):
+        """
+        Highest row id every live consumer has read (None without consumers)
+        """
+        conn.execute('DELETE FROM readers WHERE updated_at < ?', (time.time() - self.reader_ttl,))
+        return conn.execute('SELECT MIN(last_id) FROM readers').fetchone()[0]
+
+    def version(self):
+        """
+        Token that changes whenever rows are added or removed
+        """
+        row = self._connect().execute('SELECT MIN(id) FROM predictions').fetchone()
+        return f"{row[0] or 0}-{self.last_id()}"
+
+    def query(self, filters=None, since=None, until=None, cursor=None, offset=0, limit=100,
+              fields=None, newest_first=True):
+        """
+        Query a page of prediction records.
+
+        filters maps FILTER_COLUMNS to the value they must equal, since/until
+        bound the recording time (epoch seconds), and cursor is the id of the
+        last record of the previous page. Returns the records (as dicts
+        holding only the requested fields) and the cursor for the next page,
+        or None when there are no more records.
+        """
+        fields = list(fields or self.DEFAULT_FIELDS)
+        unknown = [field for field in fields if field not in self.FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        clauses = []
+        params = []
+        for column, value in (filters or {}).items():
+            if column not in self.FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on {column}")
+            clauses.append(f'{column} = ?')
+            params.append(value)
+        if since is not None:
+            clauses.append('recorded_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('recorded_at < ?')
+            params.append(until)
+        if cursor is not None:
+            clauses.append('id < ?' if newest_first else 'id > ?')
+            params.append(cursor)
+
+        columns = ['id'] + [field for field in fields if field != 'id']
+        query = f"SELECT {', '.join(columns)} FROM predictions"
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY id DESC' if newest_first else ' ORDER BY id'
+        # Fetch one extra row to know whether there is a next page
+        query += ' LIMIT ? OFFSET ?'
+        params.extend([limit + 1, offset])
+
+        rows = self._connect().execute(query, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        records = []
+        for row in rows:
+            record = {}
+            for column, value in zip(columns, row):
+                if column == 'id' and 'id' not in fields:
+                    continue
+                if column in ('input_data', 'prediction'):
+                    value = json.loads(value)
+                record[column] = value
+            records.append(record)
+        next_cursor = rows[-1][0] if has_more and rows else None
+        return records, next_cursor
+
+    def compact(self):
+        """
+        Apply the retention policy (by count and by age).
+
+        Returns the number of rows removed. Rows not yet read by every
+        consumer are kept until they are.
+        """
+        for refresh in self.before_compact:
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error refreshing a history consumer before compaction: {e}")
+        conn = self._connect()
+        bound = self._read_bound(conn)
+        if bound is None:
+            bound = self.last_id()
+        removed = 0
+        if self.max_records is not None:
+            cursor = conn.execute(
+                'DELETE FROM predictions WHERE id <= MIN((SELECT MAX(id) FROM predictions) - ?, ?)',
+                (self.max_records, bound)
+            )
+            removed += cursor.rowcount
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            cursor = conn.execute('DELETE FROM predictions WHERE recorded_at < ? AND id <= ?', (cutoff, bound))
+            removed += cursor.rowcount
+        if removed:
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        return removed
+
+    def _compact_loop(self):
+        """
+        Run compaction periodically until the store is closed
+        """
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Error compacting prediction history: {e}")
+
+    def start_compactor(self):
+        """
+        Start the background compactor thread
+        """
+        if self._compactor is None and self.compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name='history-compactor', daemon=True)
+            self._compactor.start()
+
+    def close(self):
+        """
+        Stop the compactor and close this thread's connection
+        """
+        self._stop.set()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class HistoryWriter:
+    """
+    Background writer that moves prediction history off the request path.
+
+    Records are put on a bounded in-memory queue and a writer thread
+    group-commits them to the history store, flushing whenever flush_size
+    records are waiting or flush_interval seconds have passed. When the
+    queue is full the 'drop' policy discards the record and the 'block'
+    policy waits up to block_timeout seconds for room before dropping it.
+    """
+
+    POLICIES = ('drop', 'block')
+
+    def __init__(self, store, max_queue=10000, flush_interval=0.5, flush_size=500,
+                 policy='drop', block_timeout=1.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy!r} (expected one of {', '.join(self.POLICIES)})")
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = {
+            'enqueued': 0,
+            'dropped': 0,
+            'flushed': 0,
+            'flush_batches': 0,
+            'flush_errors': 0
+        }
+        self._last_flush_at = None
+        self._last_flush_seconds = None
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def submit(self, records):
+        """
+        Queue prediction records for writing.
+
+        Each record is stamped with the submission time. Returns the number
+        of records accepted; the rest were dropped because the queue is full.
+        """
+        timestamp = datetime.now().isoformat()
+        accepted = 0
+        for record in records:
+            record['timestamp'] = timestamp
+            try:
+                if self.policy == 'block':
+                    self._queue.put(record, timeout=self.block_timeout)
+                else:
+                    self._queue.put_nowait(record)
+                accepted += 1
+            except queue.Full:
+                self._count('dropped')
+        if accepted:
+            self._count('enqueued', accepted)
+        return accepted
+
+    def _drain(self):
+        """
+        Collect the next group of records to commit
+        """
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        """
+        Commit a group of records to the store
+        """
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            self.store.append(batch)
+        except Exception as e:
+            self._count('flush_errors')
+            self._count('dropped', len(batch))
+            print(f"Error writing prediction history: {e}")
+            return
+        with self._lock:
+            self._counters['flushed'] += len(batch)
+            self._counters['flush_batches'] += 1
+            self._last_flush_at = datetime.now().isoformat()
+            self._last_flush_seconds = time.perf_counter() - start
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush(self._drain())
+        # Commit whatever is still queued before exiting
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.flush_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+    def start(self):
+        """
+        Start the writer thread
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """
+        Stop the writer thread after flushing queued records
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def metrics(self):
+        """
+        Queue depth and counters for monitoring persistence lag
+        """
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics['last_flush_at'] = self._last_flush_at
+            metrics['last_flush_seconds'] = self._last_flush_seconds
+        metrics['queued'] = self._queue.qsize()
+        metrics['queue_capacity'] = self._queue.maxsize
+        metrics['policy'] = self.policy
+        metrics['running'] = self._thread is not None and self._thread.is_alive()
+        return metrics
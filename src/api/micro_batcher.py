@@ -0,0 +1,192 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects single items submitted by concurrent asyncio requests into
+    micro-batches scored with one call.
+
+    A batch is closed as soon as max_batch_size items are waiting or
+    max_wait_ms milliseconds have passed since its first item arrived.
+    score_batch(items) runs on a dedicated worker thread (so the event loop
+    keeps accepting requests) and must return one result per item; a result
+    that is an Exception is raised to that item's caller only. If the whole
+    call raises, the batch's items are rescored one at a time, so an item
+    that breaks the batch fails only its own caller. While one
+    batch is being scored the next one fills up, so under load batches grow
+    towards max_batch_size without any extra wait.
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=2.0, executor=None, window=10000):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # One scoring thread: batches are scored in order and the feature store is never updated concurrently
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batcher')
+        self._queue = None
+        self._task = None
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'batches': 0, 'errors': 0}
+        self._batch_sizes = {}
+        # Rolling windows of the most recent queueing delays and batch scoring times, in milliseconds
+        self._queue_delays = deque(maxlen=window)
+        self._score_times = deque(maxlen=window)
+
+    def start(self):
+        """
+        Start the batching task on the running event loop
+        """
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Score whatever is queued, then stop the batching task
+        """
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        """
+        Queue one item and wait for its result
+        """
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """
+        Wait for the first item, then gather more until the batch is full or max_wait has passed
+        """
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Items that are already waiting join the batch without another timer
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.perf_counter()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self._score, items)
+            except Exception as e:
+                if len(batch) == 1:
+                    results = [e]
+                else:
+                    # Rescore the items one at a time, so only the item that breaks the batch fails
+                    results = await loop.run_in_executor(self.executor, self._score_each, items)
+            finished = time.perf_counter()
+            self._record(batch, started, finished, results)
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    # The caller went away (e.g. the client disconnected)
+                    pass
+                elif isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _score(self, items):
+        results = self.score_batch(items)
+        if len(results) != len(items):
+            raise RuntimeError(f"score_batch returned {len(results)} results for {len(items)} items")
+        return results
+
+    def _score_each(self, items):
+        results = []
+        for item in items:
+            try:
+                results.append(self._score([item])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _record(self, batch, started, finished, results):
+        size = len(batch)
+        with self._lock:
+            self._counters['requests'] += size
+            self._counters['batches'] += 1
+            self._counters['errors'] += sum(isinstance(result, Exception) for result in results)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._queue_delays.extend((started - queued_at) * 1000 for _, _, queued_at in batch)
+            self._score_times.append((finished - started) * 1000)
+
+    def metrics(self):
+        """
+        Batch size distribution, queueing delay and scoring time, for tuning
+        max_batch_size and max_wait_ms
+        """
+        with self._lock:
+            metrics = dict(self._counters)
+            batch_sizes = dict(self._batch_sizes)
+            queue_delays = np.asarray(self._queue_delays)
+            score_times = np.asarray(self._score_times)
+        metrics['max_batch_size'] = self.max_batch_size
+        metrics['max_wait_ms'] = self.max_wait * 1000
+        metrics['queued'] = self._queue.qsize() if self._queue is not None else 0
+        metrics['mean_batch_size'] = metrics['requests'] / metrics['batches'] if metrics['batches'] else None
+        metrics['batch_size_histogram'] = _power_of_two_histogram(batch_sizes)
+        metrics['queue_delay_ms'] = _summary(queue_delays)
+        metrics['batch_score_ms'] = _summary(score_times)
+        return metrics
+
+
+def _power_of_two_histogram(counts):
+    """
+    Batch counts bucketed as 1, 2, 3-4, 5-8, 9-16, ...
+    """
+    histogram = {}
+    for size in sorted(counts):
+        upper = 1 << (size - 1).bit_length()
+        lower = upper // 2 + 1 if upper > 2 else upper
+        label = str(upper) if lower == upper else f"{lower}-{upper}"
+        histogram[label] = histogram.get(label, 0) + counts[size]
+    return histogram
+
+
+def _summary(values):
+    """
+    Mean and percentiles of the recent values, in milliseconds
+    """
+    if not len(values):
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': int(len(values)),
+        'mean': round(float(values.mean()), 4),
+        'p50': round(float(p50), 4),
+        'p95': round(float(p95), 4),
+        'p99': round(float(p99), 4),
+        'max': round(float(values.max()), 4)
+    }
@@ -0,0 +1,127 @@
+import threading
+import time
+import traceback
+
+
+class ServingModel:
+    """
+    Everything needed to score with one model version: the fitted feature
+    pipeline, the predictor (compiled forest or sklearn model) and, when
+    loaded from pickles, the model and scaler themselves
+    """
+
+    def __init__(self, version, pipeline, predictor, model=None, scaler=None, model_artifact=None, source=None):
+        self.version = version
+        self.pipeline = pipeline
+        self.predictor = predictor
+        self.model = model
+        self.scaler = scaler
+        self.model_artifact = model_artifact
+        self.source = source
+        self.loaded_at = time.time()
+
+
+class ModelReloader:
+    """
+    Holds the active ServingModel and replaces it without stopping traffic.
+
+    reload() loads a version with load(version) -> ServingModel, warms it up
+    with warm_up(serving), and only then swaps it in with a single reference
+    assignment; requests read `active` once and score with that snapshot, so
+    in-flight requests finish on the model they started with. A failed load
+    or warm-up keeps the current model. With a registry and interval > 0, a
+    watcher thread polls the registry's CURRENT version and reloads when it
+    changes, which also keeps every worker of the preforked server in step.
+    """
+
+    def __init__(self, load, warm_up, registry=None, interval=5.0, history_size=20):
+        self.load = load
+        self.warm_up = warm_up
+        self.registry = registry
+        self.interval = interval
+        self.history_size = history_size
+        self.active = None
+        self.history = []
+        self.last_error = None
+        self.reloading = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self, version=None, force=False):
+        """
+        Load, warm up and swap in version (default: the registry's current
+        version). Returns the status of the reload
+        """
+        with self._lock:
+            self.last_error = None
+            target = version or (self.registry.current_version() if self.registry else None)
+            previous = self.active.version if self.active else None
+            if target is not None and target == previous and not force:
+                return {'status': 'unchanged', 'version': previous}
+            self.reloading = target
+            started = time.perf_counter()
+            try:
+                serving = self.load(target)
+                loaded = time.perf_counter()
+                self.warm_up(serving)
+            except Exception as e:
+                self.last_error = {'version': target, 'error': str(e), 'at': time.time()}
+                print(f"Model reload of {target} failed, keeping {previous}: {e}")
+                traceback.print_exc()
+                return {'status': 'failed', 'version': previous, 'error': str(e)}
+            finally:
+                self.reloading = None
+            self.active = serving
+            entry = {
+                'version': serving.version,
+                'previous': previous,
+                'at': time.time(),
+                'load_seconds': round(loaded - started, 4),
+                'warm_up_seconds': round(time.perf_counter() - loaded, 4)
+            }
+            self.history = (self.history + [entry])[-self.history_size:]
+            print(f"Model {previous} replaced by {serving.version} "
+                  f"(load {entry['load_seconds']:.3f}s, warm-up {entry['warm_up_seconds']:.3f}s)")
+            return dict(entry, status='reloaded')
+
+    def reload_in_background(self, version=None, force=False):
+        thread = threading.Thread(target=self.reload, args=(version, force), name='model-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                current = self.registry.current_version()
+                # A version that failed to load is left to POST /admin/reload rather than retried every poll
+                failed = self.last_error['version'] if self.last_error else None
+                if current and current not in (self.active.version, self.reloading, failed):
+                    self.reload(current)
+            except Exception as e:
+                print(f"Error checking the model registry: {e}")
+
+    def start_watcher(self):
+        """
+        Poll the registry every interval seconds and reload promoted versions
+        """
+        if self.registry is None or self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        active = self.active
+        return {
+            'version': active.version if active else None,
+            'source': active.source if active else None,
+            'loaded_at': active.loaded_at if active else None,
+            'reloading': self.reloading,
+            'watching': self._thread is not None,
+            'reload_interval': self.interval,
+            'history': list(self.history),
+            'last_error': self.last_error
+        }
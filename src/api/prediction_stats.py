@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+
+
+class RollingCounter:
+    """
+    Totals and anomaly counts over a sliding time window.
+
+    The window is split into a fixed ring of buckets, so both recording and
+    querying cost the same no matter how many predictions fall inside it.
+    """
+
+    def __init__(self, window_seconds, bucket_seconds):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.size = int(window_seconds // bucket_seconds)
+        self.epochs = [-1] * self.size
+        self.totals = [0] * self.size
+        self.anomalies = [0] * self.size
+
+    def add(self, recorded_at, anomaly, now=None):
+        bucket = int(recorded_at // self.bucket_seconds)
+        current = int((now if now is not None else time.time()) // self.bucket_seconds)
+        if bucket <= current - self.size:
+            return
+        slot = bucket % self.size
+        if self.epochs[slot] != bucket:
+            self.epochs[slot] = bucket
+            self.totals[slot] = 0
+            self.anomalies[slot] = 0
+        self.totals[slot] += 1
+        self.anomalies[slot] += anomaly
+
+    def counts(self, now=None):
+        current = int((now if now is not None else time.time()) // self.bucket_seconds)
+        oldest = current - self.size
+        total = anomalies = 0
+        for epoch, bucket_total, bucket_anomalies in zip(self.epochs, self.totals, self.anomalies):
+            if epoch > oldest:
+                total += bucket_total
+                anomalies += bucket_anomalies
+        return {'total': total, 'anomaly_count': anomalies}
+
+    def to_dict(self):
+        return {'epochs': self.epochs, 'totals': self.totals, 'anomalies': self.anomalies}
+
+    def load(self, state):
+        if len(state['epochs']) == self.size:
+            self.epochs = list(state['epochs'])
+            self.totals = list(state['totals'])
+            self.anomalies = list(state['anomalies'])
+
+
+class PredictionStats:
+    """
+    Prediction aggregates maintained incrementally from the history store.
+
+    Instead of re-reading the whole history on every request, the stats tail
+    the store by row id: each refresh folds in only the rows recorded since
+    the last one, which also picks up predictions made by other worker
+    processes. Totals are cumulative over everything ever recorded (they are
+    not affected by history retention: the store's compactor refreshes the
+    stats first and keeps rows until they are read, see
+    PredictionHistoryStore.mark_read); the rolling windows cover the last
+    hour, day and week. A snapshot is written on shutdown so a restart does
+    not need to rescan the history.
+    """
+
+    # name -> (window seconds, bucket seconds)
+    WINDOWS = {
+        '1h': (3600, 60),
+        '24h': (86400, 900),
+        '7d': (7 * 86400, 3600)
+    }
+
+    def __init__(self, store, snapshot_path=None):
+        self.store = store
+        self.snapshot_path = snapshot_path
+        # Every worker process tails the store on its own
+        self.reader_name = f"prediction-stats-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._reset()
+        if snapshot_path:
+            self.load_snapshot()
+
+    def _reset(self):
+        self.last_id = 0
+        self.total = 0
+        self.anomaly_count = 0
+        self.hourly = [0] * 24
+        self.geo = {}
+        self.windows = {
+            name: RollingCounter(window, bucket) for name, (window, bucket) in self.WINDOWS.items()
+        }
+
+    def _add(self, timestamp, recorded_at, geo_location, anomaly, now):
+        anomaly = 1 if anomaly == 1 else 0
+        self.total += 1
+        self.anomaly_count += anomaly
+        try:
+            # ISO timestamps carry the hour at a fixed offset: YYYY-MM-DDTHH
+            self.hourly[int(timestamp[11:13])] += 1
+        except (TypeError, ValueError, IndexError):
+            pass
+        if geo_location:
+            self.geo[geo_location] = self.geo.get(geo_location, 0) + 1
+        for counter in self.windows.values():
+            counter.add(recorded_at, anomaly, now)
+
+    def refresh(self):
+        """
+        Fold in predictions recorded since the last refresh
+        """
+        with self._lock:
+            if self.last_id > self.store.last_id():
+                # The store was recreated; rebuild from what it holds
+                self._reset()
+            now = time.time()
+            for row_id, timestamp, recorded_at, geo_location, anomaly in self.store.rows_since(self.last_id):
+                self._add(timestamp, recorded_at, geo_location, anomaly, now)
+                self.last_id = row_id
+            self.store.mark_read(self.reader_name, self.last_id)
+
+    def summary(self):
+        """
+        Current aggregates in the /predictions/stats response format
+        """
+        self.refresh()
+        with self._lock:
+            normal_count = self.total - self.anomaly_count
+            now = time.time()
+            return {
+                'total_predictions': self.total,
+                'anomaly_count': self.anomaly_count,
+                'normal_count': normal_count,
+                # Accuracy assumes normal predictions are correct
+                'accuracy': normal_count / self.total if self.total > 0 else 0,
+                'hourly_distribution': {hour: count for hour, count in enumerate(self.hourly)},
+                'geographic_distribution': dict(self.geo),
+                'windows': {name: counter.counts(now) for name, counter in self.windows.items()}
+            }
+
+    def save_snapshot(self):
+        """
+        Persist the aggregates so a restart only has to catch up on new rows
+        """
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            state = {
+                'last_id': self.last_id,
+                'total': self.total,
+                'anomaly_count': self.anomaly_count,
+                'hourly': self.hourly,
+                'geo': self.geo,
+                'windows': {name: counter.to_dict() for name, counter in self.windows.items()}
+            }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def load_snapshot(self):
+        """
+        Restore aggregates from a snapshot, if there is a usable one
+        """
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                state = json.load(f)
+            self.last_id = state['last_id']
+            self.total = state['total']
+            self.anomaly_count = state['anomaly_count']
+            self.hourly = list(state['hourly'])
+            self.geo = dict(state['geo'])
+            for name, counter in self.windows.items():
+                if name in state['windows']:
+                    counter.load(state['windows'][name])
+        except Exception as e:
+            print(f"Error loading prediction stats snapshot: {e}")
+            self._reset()
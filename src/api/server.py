@@ -0,0 +1,97 @@
+import time
+SERVER_STARTED = time.perf_counter()
+
+import os
+import sys
+import gc
+import atexit
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    raise SystemExit('The production server runs on gunicorn (Linux/macOS): pip install -r requirements.txt')
+
+
+def post_fork(server, worker):
+    """
+    Worker process: keep the inherited objects out of the garbage collector's reach,
+    then start the per-process services (threads and SQLite connections must not
+    be shared across a fork)
+    """
+    import api
+    # Collections in the worker would otherwise write to (and copy) the pages shared with the master
+    gc.freeze()
+    api.start_services()
+    print(f"Worker {os.getpid()} ready (services {api.startup_timings['services']:.3f}s)")
+
+
+def worker_exit(server, worker):
+    # Flush the history writer and the feature store snapshot registered by start_services()
+    atexit._run_exitfuncs()
+
+
+def when_ready(server):
+    import api
+    timings = {'server_imports': api.STARTUP_STARTED - SERVER_STARTED}
+    timings.update(api.startup_timings)
+    print(f"Master {os.getpid()} serving on http://{server.cfg.bind[0]} with {server.cfg.workers} workers; startup: "
+          + ', '.join(f"{name} {seconds:.3f}s" for name, seconds in timings.items())
+          + f", total {time.perf_counter() - SERVER_STARTED:.3f}s")
+
+
+def on_exit(server):
+    import api
+    # Every worker saved the login counts it added; combine them into one snapshot
+    api.merge_worker_snapshots()
+
+
+class APIServer(BaseApplication):
+    """
+    gunicorn serving the Flask app: the master loads the model, pipeline and feature
+    store once and warms up (preload_app), and the forked workers share them copy-on-write
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        os.environ['API_DEFER_SERVICES'] = '1'
+        import api
+        gc.collect()
+        return api.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Preforked production server for the anomaly detection API')
+    parser.add_argument('--host', type=str, default=os.environ.get('API_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('API_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('API_WORKERS', os.cpu_count() or 1)),
+                        help='Number of forked worker processes')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('API_THREADS', 8)),
+                        help='Request threads per worker')
+    args = parser.parse_args()
+
+    APIServer({
+        'bind': f"{args.host}:{args.port}",
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'preload_app': True,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'when_ready': when_ready,
+        'on_exit': on_exit,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+import os
+import sys
+import queue
+import pickle
+import random
+import threading
+import subprocess
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+def _load_candidate(spec):
+    """
+    Load a candidate model from its files (run in the shadow process)
+    """
+    import joblib
+    from feature_pipeline import FeaturePipeline
+    from model_artifact import load_artifact
+    from compiled_forest import compile_model
+
+    pipeline = FeaturePipeline.load(spec['pipeline_path'])
+    pipeline.set_unknown_policy(spec['unknown_policy'], spec['unknown_value'])
+    artifact_path = spec.get('artifact_path')
+    if spec['inference_backend'] == 'compiled' and artifact_path and os.path.exists(artifact_path):
+        artifact = load_artifact(artifact_path)
+        artifact.validate(pipeline)
+        predictor = artifact.forest
+    else:
+        predictor = compile_model(joblib.load(spec['model_path']), spec['inference_backend'], spec['compiled_max_rows'])
+    return pipeline, predictor
+
+
+def _shadow_main():
+    """
+    Shadow process (python shadow_scorer.py): reads the candidate spec, then
+    the sampled requests, pickled from stdin, and writes the comparisons
+    pickled to stdout
+    """
+    requests, results = sys.stdin.buffer, sys.stdout.buffer
+    # Prints must not end up in the result stream
+    sys.stdout = sys.stderr
+
+    def send(kind, payload):
+        pickle.dump((kind, payload), results, protocol=pickle.HIGHEST_PROTOCOL)
+        results.flush()
+
+    spec = pickle.load(requests)
+    sys.path[:0] = [path for path in spec['sys_path'] if path not in sys.path]
+    try:
+        os.nice(spec['nice'])
+    except (AttributeError, OSError):
+        pass
+    try:
+        from feature_pipeline import FEATURES
+        from feature_store import FrequencyFeatureStore
+        columns = [column for _, column in FrequencyFeatureStore.ENTITIES.values()]
+        pipeline, predictor = _load_candidate(spec)
+        # Warm-up, with the login frequencies given so the candidate's own counts are never read
+        warm_up = {
+            'timestamp': '2025-01-01 12:00:00', 'geo_location': str(pipeline.geo_encoder.classes_[0]),
+            'device_id': str(pipeline.device_encoder.classes_[0]),
+            'is_new_device': 0, 'bytes_in': 1000, 'bytes_out': 1000, 'success': 1
+        }
+        features, _, errors = pipeline.transform_records([warm_up], frequencies={column: [1] for column in columns})
+        if errors:
+            raise RuntimeError(f"Warm-up record was rejected: {errors}")
+        predictor.predict_proba(features)
+    except Exception as e:
+        send('error', f"Could not load candidate {spec['version']}: {e}")
+        return
+    send('ready', spec['version'])
+
+    while True:
+        try:
+            item = pickle.load(requests)
+        except EOFError:
+            # The API process stopped shadowing or exited
+            return
+        if item is None:
+            return
+        records, live_features, live_labels, live_probabilities, live_seconds = item
+        try:
+            # The candidate encodes the records with its own vocabularies and reuses the
+            # live login frequencies, so both models see the same counts
+            frequencies = {column: live_features[:, FEATURES.index(column)] for column in columns}
+            features, positions, _ = pipeline.transform_records(records, frequencies=frequencies)
+            started = time.perf_counter()
+            probabilities = predictor.predict_proba(features)
+            candidate_seconds = time.perf_counter() - started
+            labels = predictor.classes_.take(np.argmax(probabilities, axis=1))
+            send('result', {
+                'live_labels': np.asarray(live_labels)[positions],
+                'candidate_labels': labels,
+                'deltas': probabilities[:, 1] - np.asarray(live_probabilities)[positions],
+                'skipped': len(records) - len(positions),
+                'live_seconds': live_seconds,
+                'candidate_seconds': candidate_seconds
+            })
+        except Exception as e:
+            send('failed', f"{type(e).__name__}: {e}")
+            traceback.print_exc()
+
+
+def _summary(values):
+    """
+    Mean and percentiles of the recent values
+    """
+    if not len(values):
+        return None
+    values = np.asarray(values)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': int(len(values)),
+        'mean': round(float(values.mean()), 6),
+        'p50': round(float(p50), 6),
+        'p95': round(float(p95), 6),
+        'p99': round(float(p99), 6),
+        'max': round(float(values.max()), 6)
+    }
+
+
+class ShadowScorer:
+    """
+    Scores a sample of live requests with a candidate model, off the response path.
+
+    The live path only draws a random number and, for a sampled request,
+    puts the valid records, their live features and live scores on a
+    bounded in-process queue without waiting (a full queue drops the
+    sample). A feeder thread pipes them to a separate, lower-priority
+    Python process that loads the candidate, re-encodes the records with
+    the candidate's pipeline (reusing the live login frequencies), scores
+    them and pipes back the comparison; a collector thread folds it into
+    agreement, score delta and latency statistics. Running the candidate
+    in its own process keeps it from competing with request threads for
+    the interpreter lock.
+    """
+
+    def __init__(self, max_queue=1000, window=10000, nice=10):
+        self.max_queue = max_queue
+        self.window = window
+        self.nice = nice
+        self.sample_rate = 0.0
+        self.spec = None
+        self._process = None
+        self._requests = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self, version=None):
+        with self._lock:
+            self.version = version
+            self.status = 'off' if version is None else 'loading'
+            self.error = None
+            self.started_at = time.time() if version else None
+            self._counters = {
+                'sampled_requests': 0, 'compared_requests': 0, 'compared_rows': 0, 'skipped_rows': 0,
+                'agreements': 0, 'dropped_requests': 0, 'failed_requests': 0,
+                'both_anomaly': 0, 'both_normal': 0, 'live_only_anomaly': 0, 'candidate_only_anomaly': 0
+            }
+            self._delta_sum = 0.0
+            self._abs_delta_sum = 0.0
+            self._max_abs_delta = 0.0
+            self._deltas = deque(maxlen=self.window)
+            self._live_ms = deque(maxlen=self.window)
+            self._candidate_ms = deque(maxlen=self.window)
+            self._live_ms_per_row = deque(maxlen=self.window)
+            self._candidate_ms_per_row = deque(maxlen=self.window)
+
+    def start(self, spec, sample_rate):
+        """
+        Shadow the candidate described by spec (version, file paths and
+        scoring options) on sample_rate of the requests; replaces any
+        previous candidate and resets the statistics
+        """
+        self.stop()
+        self._reset(spec['version'])
+        self.spec = spec
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__)],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        pickle.dump(dict(spec, sys_path=list(sys.path), nice=self.nice), process.stdin,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+        process.stdin.flush()
+        requests = queue.Queue(maxsize=self.max_queue)
+        self._requests = requests
+        self._process = process
+        self.sample_rate = float(sample_rate)
+        threading.Thread(target=self._feed, args=(requests, process), name='shadow-feeder', daemon=True).start()
+        threading.Thread(target=self._collect, args=(process,), name='shadow-collector', daemon=True).start()
+
+    def stop(self, timeout=5):
+        """
+        Stop shadowing: the shadow process exits after the request it is scoring
+        """
+        process, requests = self._process, self._requests
+        self.sample_rate = 0.0
+        self._process = None
+        if process is None:
+            return
+        try:
+            requests.put_nowait(None)
+        except queue.Full:
+            process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        with self._lock:
+            self.status = 'off'
+
+    def sampled(self):
+        """
+        Whether to shadow the current request (cheap enough for every request)
+        """
+        return self.sample_rate > 0 and self.status == 'running' and random.random() < self.sample_rate
+
+    def submit(self, records, features, live_labels, live_probabilities, live_seconds):
+        """
+        Queue a sampled request for the candidate; never blocks the caller
+        """
+        with self._lock:
+            self._counters['sampled_requests'] += 1
+        try:
+            self._requests.put_nowait((records, features, live_labels, live_probabilities, live_seconds))
+        except (queue.Full, AttributeError):
+            with self._lock:
+                self._counters['dropped_requests'] += 1
+
+    def _feed(self, requests, process):
+        try:
+            while True:
+                item = requests.get()
+                if item is None:
+                    break
+                pickle.dump(item, process.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+                process.stdin.flush()
+            process.stdin.close()
+        except (OSError, ValueError):
+            # The shadow process exited; the collector reports it
+            pass
+
+    def _collect(self, process):
+        while True:
+            try:
+                kind, payload = pickle.load(process.stdout)
+            except Exception:
+                exitcode = process.wait()
+                with self._lock:
+                    if self._process is process and self.status != 'error':
+                        self.status = 'error'
+                        self.error = self.error or f"Shadow process exited with code {exitcode}"
+                return
+            with self._lock:
+                if self._process is not process:
+                    # Results of a candidate that was replaced or stopped
+                    continue
+                if kind == 'ready':
+                    self.status = 'running'
+                elif kind == 'error':
+                    self.status = 'error'
+                    self.error = payload
+                    print(f"Shadow scoring disabled: {payload}")
+                elif kind == 'failed':
+                    self._counters['failed_requests'] += 1
+                    self.error = payload
+                else:
+                    self._record(payload)
+
+    def _record(self, result):
+        live, candidate, deltas = result['live_labels'], result['candidate_labels'], result['deltas']
+        rows = len(deltas)
+        counters = self._counters
+        counters['compared_requests'] += 1
+        counters['compared_rows'] += rows
+        counters['skipped_rows'] += result['skipped']
+        counters['agreements'] += int(np.sum(live == candidate))
+        counters['both_anomaly'] += int(np.sum((live == 1) & (candidate == 1)))
+        counters['both_normal'] += int(np.sum((live == 0) & (candidate == 0)))
+        counters['live_only_anomaly'] += int(np.sum((live == 1) & (candidate == 0)))
+        counters['candidate_only_anomaly'] += int(np.sum((live == 0) & (candidate == 1)))
+        if rows:
+            self._delta_sum += float(deltas.sum())
+            self._abs_delta_sum += float(np.abs(deltas).sum())
+            self._max_abs_delta = max(self._max_abs_delta, float(np.abs(deltas).max()))
+            self._deltas.extend(deltas.tolist())
+            self._live_ms_per_row.append(result['live_seconds'] * 1000 / rows)
+            self._candidate_ms_per_row.append(result['candidate_seconds'] * 1000 / rows)
+        self._live_ms.append(result['live_seconds'] * 1000)
+        self._candidate_ms.append(result['candidate_seconds'] * 1000)
+
+    def _queued(self):
+        return self._requests.qsize() if self._requests is not None and self._process is not None else 0
+
+    def metrics(self):
+        """
+        Agreement, probability deltas (candidate - live) and scoring latency of both models
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            rows = counters['compared_rows']
+            deltas = np.asarray(self._deltas)
+            metrics = {
+                'candidate_version': self.version,
+                'status': self.status,
+                'error': self.error,
+                'sample_rate': self.sample_rate,
+                'started_at': self.started_at,
+                'queued': self._queued(),
+                'queue_capacity': self.max_queue,
+                'counters': counters,
+                'agreement_rate': counters['agreements'] / rows if rows else None,
+                'probability_anomaly_delta': {
+                    'mean': self._delta_sum / rows if rows else None,
+                    'mean_abs': self._abs_delta_sum / rows if rows else None,
+                    'max_abs': self._max_abs_delta if rows else None,
+                    'recent_abs': _summary(np.abs(deltas)),
+                    'recent': _summary(deltas)
+                },
+                'latency_ms': {
+                    'live': _summary(self._live_ms),
+                    'candidate': _summary(self._candidate_ms),
+                    'live_per_row': _summary(self._live_ms_per_row),
+                    'candidate_per_row': _summary(self._candidate_ms_per_row)
+                }
+            }
+        return metrics
+
+
+if __name__ == '__main__':
+    _shadow_main()
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from feature_pipeline import FeaturePipeline
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -10,47 +10,13 @@ class AnomalyDetector:
         # Load the trained model and encoders
         self.model = joblib.load('anomaly_detection_model.pkl')
         self.scaler = joblib.load('scaler.pkl')
-        self.geo_encoder = joblib.load('geo_encoder.pkl')
-        self.device_encoder = joblib.load('device_encoder.pkl')
+        self.pipeline = FeaturePipeline.load('feature_pipeline.pkl')
         
     def preprocess_data(self, data):
         """
         Preprocess the input data for prediction
         """
-        # Convert timestamp to datetime
-        data['timestamp'] = pd.to_datetime(data['timestamp'])
-        
-        # Extract time-based features
-        data['login_hour'] = data['timestamp'].dt.hour
-        data['login_day'] = data['timestamp'].dt.day
-        data['login_month'] = data['timestamp'].dt.month
-        data['login_year'] = data['timestamp'].dt.year
-        data['login_weekday'] = data['timestamp'].dt.weekday
-        
-        # Encode categorical variables (handle unseen categories)
-        data['geo_location_encoded'] = data['geo_location'].apply(
-            lambda x: self.geo_encoder.transform([x])[0] if x in self.geo_encoder.classes_ else -1
-        )
-        
-        data['device_id_encoded'] = data['device_id'].apply(
-            lambda x: self.device_encoder.transform([x])[0] if x in self.device_encoder.classes_ else -1
-        )
-        
-        # Feature engineering (simplified for single prediction)
-        # In a real application, you would need to maintain running counts
-        data['user_login_frequency'] = 1  # Placeholder
-        data['device_login_frequency'] = 1  # Placeholder
-        data['location_login_frequency'] = 1  # Placeholder
-        
-        # Select features for modeling
-        features = [
-            'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-            'is_new_device', 'bytes_in', 'bytes_out', 'success',
-            'geo_location_encoded', 'device_id_encoded',
-            'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-        ]
-        
-        return data[features]
+        return self.pipeline.transform_frame(data)
     
     def predict(self, data):
         """
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+
+class CategoryEncoder:
+    """
+    Category-to-code encoder with O(1) lookups, compatible with LabelEncoder codes.
+
+    The vocabulary is compiled into a dict for single values and encoded in
+    one vectorized call for batches, either through pd.Categorical (hash
+    based) or np.searchsorted over the sorted vocabulary. Unseen values map
+    to unknown_value when unknown='value', or raise ValueError when
+    unknown='error'.
+    """
+
+    UNKNOWN_POLICIES = ('value', 'error')
+
+    def __init__(self, classes, unknown='value', unknown_value=-1):
+        if unknown not in self.UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown policy must be one of {', '.join(self.UNKNOWN_POLICIES)}")
+        self.classes_ = np.asarray(classes)
+        self.unknown = unknown
+        self.unknown_value = unknown_value
+        self.codes = {value: code for code, value in enumerate(self.classes_.tolist())}
+        self._order = np.argsort(self.classes_)
+        self._sorted = self.classes_[self._order].astype(str)
+
+    @classmethod
+    def fit(cls, values, **kwargs):
+        """
+        Build an encoder with the sorted unique values, numbered like LabelEncoder.fit
+        """
+        return cls(np.unique(np.asarray(values)), **kwargs)
+
+    def extended(self, values):
+        """
+        A new encoder with the unseen values appended after the current
+        vocabulary, so existing categories keep their codes (unlike refitting)
+        """
+        known = set(self.codes)
+        new_values = np.unique(np.asarray([value for value in pd.unique(np.asarray(values)) if value not in known]))
+        if not len(new_values):
+            return self
+        return CategoryEncoder(np.concatenate([self.classes_, new_values]),
+                               unknown=self.unknown, unknown_value=self.unknown_value)
+
+    @property
+    def is_sorted(self):
+        """
+        Whether codes follow the sorted vocabulary, as in a fitted LabelEncoder
+        """
+        return bool(np.all(self._order == np.arange(len(self._order))))
+
+    @classmethod
+    def from_label_encoder(cls, encoder, **kwargs):
+        """
+        Compile a fitted sklearn LabelEncoder (e.g. geo_encoder.pkl)
+        """
+        return cls(encoder.classes_, **kwargs)
+
+    def to_label_encoder(self):
+        """
+        Equivalent fitted sklearn LabelEncoder (only for a sorted vocabulary, see extended())
+        """
+        if not self.is_sorted:
+            raise ValueError('An extended vocabulary is not in sorted order and has no LabelEncoder equivalent')
+        from sklearn.preprocessing import LabelEncoder
+        encoder = LabelEncoder()
+        encoder.classes_ = self.classes_
+        return encoder
+
+    def _unknown(self, values):
+        if self.unknown == 'error':
+            raise ValueError(f"Unseen categories: {list(values)[:5]}")
+        return self.unknown_value
+
+    def encode(self, value):
+        """
+        Code for a single value
+        """
+        code = self.codes.get(value)
+        if code is None:
+            return self._unknown([value])
+        return code
+
+    def transform(self, values, method='categorical'):
+        """
+        Codes for a batch of values as an int32 array.
+
+        method='categorical' hashes the values with pd.Categorical;
+        method='searchsorted' binary-searches the sorted vocabulary.
+        """
+        if method == 'categorical':
+            codes = pd.Categorical(values, categories=self.classes_).codes.astype(np.int32)
+            unseen = codes == -1
+        elif method == 'searchsorted':
+            values = np.asarray(values).astype(str)
+            positions = np.searchsorted(self._sorted, values)
+            positions[positions == len(self._sorted)] = 0
+            found = self._sorted[positions] == values if len(self._sorted) else np.zeros(len(values), dtype=bool)
+            codes = np.where(found, self._order[positions], -1).astype(np.int32)
+            unseen = ~found
+        else:
+            raise ValueError(f"Unknown method: {method!r}")
+        if unseen.any():
+            codes[unseen] = self._unknown(np.asarray(values)[unseen])
+        return codes
+
+    def __len__(self):
+        return len(self.classes_)
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pandas as pd
+from category_encoder import CategoryEncoder
+from dataset_io import iter_dataset, TRAINING_COLUMNS
+from feature_pipeline import FeaturePipeline, FEATURES
+from feature_store import FrequencyFeatureStore, SketchFrequencyStore
+
+
+def _fit_pass(path, chunk_size, counting):
+    """
+    First pass over the dataset: encoder vocabularies, login counts and labels
+    """
+    vocabularies = {'geo_location': [], 'device_id': []}
+    value_counts = {field: [] for field, _ in FrequencyFeatureStore.ENTITIES.values()}
+    sketch_store = SketchFrequencyStore() if counting == 'sketch' else None
+    labels = []
+    for chunk in iter_dataset(path, chunk_size, TRAINING_COLUMNS):
+        for field, parts in vocabularies.items():
+            parts.append(np.asarray(chunk[field].unique(), dtype=object))
+        if sketch_store is not None:
+            sketch_store.fit(chunk)
+        else:
+            for field, parts in value_counts.items():
+                counts = chunk[field].value_counts()
+                counts.index = counts.index.astype(object)
+                parts.append(counts[counts > 0])
+        labels.append(chunk['is_anomaly'].to_numpy())
+
+    pipeline = FeaturePipeline(CategoryEncoder(np.unique(np.concatenate(vocabularies['geo_location']))),
+                               CategoryEncoder(np.unique(np.concatenate(vocabularies['device_id']))))
+    if sketch_store is not None:
+        pipeline.feature_store = sketch_store
+        totals = None
+    else:
+        totals = {field: pd.concat(parts).groupby(level=0, sort=False).sum() for field, parts in value_counts.items()}
+        pipeline.feature_store = FrequencyFeatureStore().fit_counts(totals)
+    return pipeline, totals, np.concatenate(labels).astype(np.int64)
+
+
+def build_features_chunked(path, directory, chunk_size=1000000, counting='exact'):
+    """
+    Build the training feature matrix of a dataset too large to load at once.
+
+    Two passes over the dataset, chunk_size rows at a time: the first fits
+    the pipeline (encoder vocabularies and login counts over the whole
+    dataset), the second writes the float32 feature rows to
+    directory/features.npy. Returns (X, y, pipeline) with X memory-mapped,
+    holding the same features as load_and_preprocess_data.
+    """
+    pipeline, totals, y = _fit_pass(path, chunk_size, counting)
+
+    os.makedirs(directory, exist_ok=True)
+    X = np.lib.format.open_memmap(os.path.join(directory, 'features.npy'), mode='w+',
+                                  dtype=np.float32, shape=(len(y), len(FEATURES)))
+    offset = 0
+    for chunk in iter_dataset(path, chunk_size, TRAINING_COLUMNS):
+        # Login frequencies over the whole dataset, as value_counts() gives in memory
+        for entity, (field, column) in FrequencyFeatureStore.ENTITIES.items():
+            keys = chunk[field].to_numpy(dtype=object)
+            if totals is not None:
+                chunk[column] = totals[field].reindex(keys).to_numpy()
+            else:
+                chunk[column] = pipeline.feature_store.sketches[entity].query(keys)
+        X[offset:offset + len(chunk)] = pipeline.transform_frame(chunk, counts='frame').to_numpy(dtype=np.float32)
+        offset += len(chunk)
+    X.flush()
+    return X, y, pipeline
+
+
+def gather_rows(X, rows, path, chunk_size=1000000):
+    """
+    Copy X[rows] into a new memory-mapped .npy file at path, chunk_size rows at a time
+    """
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=X.dtype, shape=(len(rows), X.shape[1]))
+    for start in range(0, len(rows), chunk_size):
+        out[start:start + chunk_size] = X[rows[start:start + chunk_size]]
+    out.flush()
+    return out
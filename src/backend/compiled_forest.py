@@ -0,0 +1,212 @@
+import numpy as np
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous node arrays.
+
+    Every tree's nodes are concatenated into feature/threshold/left/right
+    arrays, and all rows and trees are walked together, one level per step,
+    with plain array indexing; pairs that reach a leaf drop out. Leaf
+    values are pre-normalized and summed tree by tree exactly as sklearn's
+    predict_proba does, so the probabilities match it bit for bit.
+
+    The array walk has almost no per-call overhead, which is what single
+    rows and small batches need; sklearn's compiled traversal wins on
+    large batches, so batches of more than max_rows rows are handed to the
+    fallback model when one is set.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, max_depth, classes,
+                 n_features, samples=None, fallback=None, max_rows=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.is_leaf = left == np.arange(len(left))
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        # Training samples per node, needed only for prune(min_samples=...)
+        self.samples = samples
+        self.fallback = fallback
+        self.max_rows = max_rows
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Compile a fitted sklearn RandomForestClassifier (or ExtraTreesClassifier)
+        """
+        if getattr(model, 'n_outputs_', 1) != 1 or not hasattr(model, 'estimators_'):
+            raise ValueError(f"Cannot compile {type(model).__name__}: expected a single-output tree ensemble classifier")
+
+        features, thresholds, lefts, rights, missing, values, samples, roots = [], [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            # Leaves point back at themselves (and never read a feature)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            missing.append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)))
+
+            # DecisionTreeClassifier.predict_proba: leaf values normalized by their sum
+            value = tree.value[:, 0, :model.n_classes_].copy()
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+            values.append(value)
+            samples.append(tree.n_node_samples)
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing).astype(bool),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            samples=np.concatenate(samples).astype(np.int32)
+        )
+
+    def prune(self, max_depth=None, min_samples=None, n_trees=None):
+        """
+        A smaller forest: only the first n_trees trees, cut at max_depth, and
+        without splits that leave a child with fewer than min_samples
+        training samples. Cut nodes become leaves predicting their class
+        distribution.
+        """
+        if min_samples is not None and self.samples is None:
+            raise ValueError('Pruning by min_samples needs the per-node sample counts of a forest compiled from sklearn')
+        keep = []
+        new_left, new_right, new_roots, depths = [], [], [], []
+        index = {}
+        for root in self.roots[:n_trees]:
+            new_roots.append(len(keep))
+            stack = [(int(root), 0)]
+            while stack:
+                node, depth = stack.pop()
+                index[node] = len(keep)
+                keep.append(node)
+                left, right = int(self.left[node]), int(self.right[node])
+                split = not self.is_leaf[node] and (max_depth is None or depth < max_depth)
+                if split and min_samples is not None:
+                    split = min(self.samples[left], self.samples[right]) >= min_samples
+                new_left.append(left if split else None)
+                new_right.append(right if split else None)
+                depths.append(depth)
+                if split:
+                    stack.append((right, depth + 1))
+                    stack.append((left, depth + 1))
+
+        keep = np.asarray(keep, dtype=np.intp)
+        positions = np.arange(len(keep))
+        left = np.array([position if child is None else index[child] for child, position in zip(new_left, positions)])
+        right = np.array([position if child is None else index[child] for child, position in zip(new_right, positions)])
+        leaf = left == positions
+        return CompiledForest(
+            feature=np.where(leaf, 0, self.feature[keep]).astype(self.feature.dtype),
+            threshold=self.threshold[keep],
+            left=left.astype(self.left.dtype),
+            right=right.astype(self.right.dtype),
+            missing_left=self.missing_left[keep],
+            value=self.value[keep],
+            roots=np.asarray(new_roots, dtype=self.roots.dtype),
+            # Depth of the deepest split, i.e. the number of steps to reach any leaf
+            max_depth=max((depth for depth, is_leaf in zip(depths, leaf) if is_leaf), default=0),
+            classes=self.classes_,
+            n_features=self.n_features_in_,
+            samples=self.samples[keep] if self.samples is not None else None
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """
+        Leaf node index reached in every tree, as an (n_trees, n_samples) array
+        """
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2D array with {self.n_features_in_} features")
+        n_samples, n_features = X.shape
+        flat = X.ravel()
+        has_missing = bool(np.isnan(flat).any())
+
+        # Walk all (tree, row) pairs together, dropping each one once it reaches a leaf
+        nodes = np.repeat(self.roots, n_samples)
+        offsets = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while len(active):
+            current = nodes[active]
+            x = flat[offsets[active] + self.feature[current]]
+            go_left = x <= self.threshold[current]
+            if has_missing:
+                go_left = np.where(np.isnan(x), self.missing_left[current], go_left)
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(self.n_trees, n_samples)
+
+    def predict_proba(self, X):
+        """
+        Class probabilities, identical to the compiled model's predict_proba
+        """
+        if self.fallback is not None and self.max_rows is not None and len(X) > self.max_rows:
+            return self.fallback.predict_proba(X)
+        leaves = self.apply(X)
+        # Sum the trees in order, as sklearn accumulates them, then average
+        proba = np.cumsum(self.value[leaves], axis=0)[-1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        """
+        Class labels, derived from the probabilities as RandomForestClassifier.predict does
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_model(model, backend='compiled', max_rows=512):
+    """
+    The model to score with: the compiled forest when backend='compiled' and the
+    model can be compiled (scoring batches over max_rows rows with the model), else
+    the sklearn model itself
+    """
+    if backend == 'sklearn':
+        return model
+    if backend != 'compiled':
+        raise ValueError(f"Unknown inference backend: {backend!r} (expected 'compiled' or 'sklearn')")
+    if hasattr(model, 'compile'):
+        # Unsupervised detectors (see detectors.py) compile their own scoring
+        try:
+            return model.compile(max_rows)
+        except ValueError as e:
+            print(f"Falling back to the sklearn model: {e}")
+            return model
+    try:
+        forest = CompiledForest.from_sklearn(model)
+    except (ValueError, AttributeError) as e:
+        print(f"Falling back to the sklearn model: {e}")
+        return model
+    forest.fallback = model
+    forest.max_rows = max_rows
+    return forest
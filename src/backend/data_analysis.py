@@ -1,17 +1,16 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import IsolationForest, RandomForestClassifier
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from sklearn.svm import OneClassSVM
+from sklearn.preprocessing import StandardScaler
+from feature_pipeline import FEATURES
+from dataset_io import read_dataset
+from feature_cache import features_frame
+from main import load_training_features
 import warnings
 warnings.filterwarnings('ignore')
 
-# Load the dataset
-df = pd.read_csv('../Dataset.csv')
+# Load the dataset (its Parquet/Feather conversion when there is one)
+df = read_dataset('../Dataset.csv')
 
 # Display basic information about the dataset
 print("Dataset Shape:", df.shape)
@@ -28,43 +27,10 @@ print(df.isnull().sum())
 print("\nAnomaly distribution:")
 print(df['is_anomaly'].value_counts())
 
-# Convert timestamp to datetime
-df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-# Extract time-based features
-df['login_hour'] = df['timestamp'].dt.hour
-df['login_day'] = df['timestamp'].dt.day
-df['login_month'] = df['timestamp'].dt.month
-df['login_year'] = df['timestamp'].dt.year
-df['login_weekday'] = df['timestamp'].dt.weekday
-
-# Encode categorical variables
-le_geo = LabelEncoder()
-le_device = LabelEncoder()
-
-df['geo_location_encoded'] = le_geo.fit_transform(df['geo_location'])
-df['device_id_encoded'] = le_device.fit_transform(df['device_id'])
-
-# Feature engineering
-# Calculate login frequency per user
-user_login_counts = df['user_id'].value_counts()
-df['user_login_frequency'] = df['user_id'].map(user_login_counts)
-
-# Calculate login frequency per device
-device_login_counts = df['device_id'].value_counts()
-df['device_login_frequency'] = df['device_id'].map(device_login_counts)
-
-# Calculate login frequency per location
-location_login_counts = df['geo_location'].value_counts()
-df['location_login_frequency'] = df['geo_location'].map(location_login_counts)
-
-# Select features for modeling
-features = [
-    'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-    'is_new_device', 'bytes_in', 'bytes_out', 'success',
-    'geo_location_encoded', 'device_id_encoded',
-    'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-]
+# Fit the shared feature pipeline on the dataset, or reuse its cached features
+X_all, y_all, pipeline = load_training_features('../Dataset.csv')
+df = features_frame(X_all, y_all)
+features = FEATURES
 
 X = df[features]
 y = df['is_anomaly']
@@ -0,0 +1,208 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Compact dtypes of the login dataset columns: categoricals for the low-cardinality
+# strings, 32-bit byte counts and 8-bit hours and flags
+DATASET_DTYPES = {
+    'geo_location': 'category',
+    'device_id': 'category',
+    'login_hour': 'uint8',
+    'is_new_device': 'uint8',
+    'bytes_in': 'int32',
+    'bytes_out': 'int32',
+    'success': 'uint8',
+    'is_anomaly': 'uint8'
+}
+
+# Raw columns the feature pipeline reads (login_hour is recomputed from the timestamp)
+PIPELINE_COLUMNS = ['user_id', 'timestamp', 'geo_location', 'device_id',
+                    'is_new_device', 'bytes_in', 'bytes_out', 'success']
+TRAINING_COLUMNS = PIPELINE_COLUMNS + ['is_anomaly']
+
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+
+def dataset_format(path):
+    """
+    Format of a dataset file from its extension (csv, parquet or feather)
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown dataset format for {path!r} (expected one of {', '.join(sorted(FORMATS))})")
+    return FORMATS[extension]
+
+
+def _require_pyarrow(file_format):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f'{file_format.capitalize()} datasets require pyarrow (pip install pyarrow)')
+
+
+def _check_columns(path, available, columns):
+    missing = [column for column in columns if column not in available]
+    if missing:
+        raise KeyError(f"{path} has no column(s): {', '.join(missing)}")
+
+
+def _columnar_column_names(path, file_format):
+    """
+    Column names of a Parquet or Feather file, from its schema
+    """
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    import pyarrow.feather as feather
+    return feather.read_table(path, memory_map=True).column_names
+
+
+def columnar_copy(path):
+    """
+    The Parquet or Feather conversion of a CSV dataset, if one exists next to it and is up to date
+    """
+    if dataset_format(path) != 'csv' or not os.path.exists(path):
+        return None
+    stem = os.path.splitext(path[:-3] if path.endswith('.gz') else path)[0]
+    for extension in ('.parquet', '.feather'):
+        candidate = stem + extension
+        if os.path.exists(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(path):
+            return candidate
+    return None
+
+
+def compact_dtypes(df):
+    """
+    Convert the known dataset columns to their compact dtypes, in place.
+
+    Numeric columns with missing values or values out of range keep their dtype.
+    """
+    for column, dtype in DATASET_DTYPES.items():
+        if column not in df or df[column].dtype == dtype:
+            continue
+        if dtype != 'category':
+            values = df[column]
+            if values.isna().any() or values.dtype.kind not in 'iub':
+                continue
+            limits = np.iinfo(dtype)
+            if len(values) and (values.min() < limits.min or values.max() > limits.max):
+                continue
+        df[column] = df[column].astype(dtype)
+    return df
+
+
+def optimize_dtypes(df, columns=None, max_category_ratio=0.5):
+    """
+    Shrink a DataFrame: keep only columns (when given), turn repetitive
+    string columns into categoricals and downcast integer columns to the
+    smallest type holding their range.
+
+    String columns with more than max_category_ratio distinct values per
+    row (e.g. timestamps) stay strings, where categories would not save
+    memory. Returns the optimized DataFrame.
+    """
+    if columns is not None:
+        df = df[columns]
+    df = df.copy(deep=False)
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) or not len(values):
+            continue
+        if pd.api.types.is_string_dtype(values.dtype) or values.dtype == object:
+            if values.nunique() <= max_category_ratio * len(values):
+                df[column] = values.astype('category')
+        elif values.dtype.kind in 'iu':
+            df[column] = pd.to_numeric(values, downcast='unsigned' if values.min() >= 0 else 'integer')
+    return df
+
+
+def read_dataset(path, columns=None, prefer_columnar=True):
+    """
+    Load a login dataset from CSV, Parquet or Feather with compact dtypes.
+
+    columns limits the load to those fields (e.g. TRAINING_COLUMNS); with a
+    columnar file only those columns are read from disk. When path is a
+    CSV and an up-to-date Parquet/Feather conversion sits next to it (see
+    scripts/convert_dataset.py), that copy is read instead.
+    """
+    if prefer_columnar:
+        path = columnar_copy(path) or path
+    file_format = dataset_format(path)
+    if file_format in COLUMNAR_FORMATS:
+        _require_pyarrow(file_format)
+        # pyarrow would fail on a missing column with its own error
+        if columns is not None:
+            _check_columns(path, _columnar_column_names(path, file_format), columns)
+    if file_format == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    elif file_format == 'feather':
+        df = pd.read_feather(path, columns=columns)
+    else:
+        usecols = (lambda column: column in columns) if columns is not None else None
+        # Categoricals are built while parsing; the integer columns are narrowed afterwards
+        dtypes = {column: dtype for column, dtype in DATASET_DTYPES.items() if dtype == 'category'}
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+    if columns is not None:
+        _check_columns(path, df.columns, columns)
+        df = df[columns]
+    return compact_dtypes(df)
+
+
+def iter_dataset(path, chunk_size=1000000, columns=None, prefer_columnar=True):
+    """
+    read_dataset() in DataFrames of at most chunk_size rows, for datasets too large to load at once
+    """
+    if prefer_columnar:
+        path = columnar_copy(path) or path
+    if dataset_format(path) in COLUMNAR_FORMATS:
+        yield from iter_dataset_batches(path, chunk_size, columns=columns)
+        return
+    usecols = (lambda column: column in columns) if columns is not None else None
+    dtypes = {column: dtype for column, dtype in DATASET_DTYPES.items() if dtype == 'category'}
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunk_size):
+        yield compact_dtypes(chunk[columns] if columns is not None else chunk)
+
+
+def write_dataset(df, path):
+    """
+    Save a login dataset as CSV, Parquet or Feather (from the extension), with compact dtypes
+    """
+    file_format = dataset_format(path)
+    df = compact_dtypes(df.copy())
+    if file_format == 'parquet':
+        _require_pyarrow(file_format)
+        df.to_parquet(path, index=False)
+    elif file_format == 'feather':
+        _require_pyarrow(file_format)
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+
+
+def iter_dataset_batches(path, batch_size=100000, skip_rows=0, columns=None):
+    """
+    Read a Parquet or Feather dataset in DataFrames of at most batch_size
+    rows, starting after skip_rows rows (to resume a checkpointed run)
+    """
+    file_format = dataset_format(path)
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"{path} is not a Parquet or Feather file")
+    _require_pyarrow(file_format)
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        batches = table.slice(skip_rows).to_batches(max_chunksize=batch_size)
+        skip_rows = 0
+    for batch in batches:
+        if skip_rows >= batch.num_rows:
+            skip_rows -= batch.num_rows
+            continue
+        if skip_rows:
+            batch = batch.slice(skip_rows)
+            skip_rows = 0
+        yield compact_dtypes(batch.to_pandas())
@@ -0,0 +1,223 @@
+import numpy as np
+from compiled_forest import CompiledForest
+
+# Detector backends main.py --detector trains; only the random forest needs labels
+DETECTORS = ('random_forest', 'isolation_forest', 'one_class_svm')
+UNSUPERVISED_DETECTORS = ('isolation_forest', 'one_class_svm')
+
+
+def average_path_length(n_samples):
+    """
+    Average path length of an unsuccessful search in a binary search tree of
+    n_samples nodes: what an isolation tree adds for a leaf it did not split
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros(n_samples.shape)
+    lengths[n_samples == 2] = 1.0
+    more = n_samples > 2
+    lengths[more] = 2.0 * (np.log(n_samples[more] - 1.0) + np.euler_gamma) - 2.0 * (n_samples[more] - 1.0) / n_samples[more]
+    return lengths
+
+
+class CompiledIsolationForest:
+    """
+    A fitted IsolationForest as a CompiledForest whose leaves hold their
+    path length (depth plus the average path length of the samples they
+    did not split), so a batch is scored with one array walk over all
+    trees. decision_function matches IsolationForest.decision_function.
+    """
+
+    def __init__(self, forest, denominator, offset):
+        self.forest = forest
+        self.denominator = denominator
+        self.offset = offset
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator, estimator_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            # Children are numbered after their parent, so one ordered pass sets every depth
+            depth = np.zeros(tree.node_count)
+            for node in np.flatnonzero(~leaf):
+                depth[tree.children_left[node]] = depth[tree.children_right[node]] = depth[node] + 1
+            # Trees fitted on a subset of the features index into that subset
+            features.append(np.where(leaf, 0, np.asarray(estimator_features)[np.where(leaf, 0, tree.feature)]))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            missing.append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)))
+            # Summed in the same order as sklearn: path nodes + average path length - 1
+            values.append(((depth + 1.0) + average_path_length(tree.n_node_samples) - 1.0)[:, np.newaxis])
+            roots.append(offset)
+            offset += tree.node_count
+
+        forest = CompiledForest(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing).astype(bool),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+            classes=np.array([0]),
+            n_features=model.n_features_in_
+        )
+        denominator = len(model.estimators_) * average_path_length([model.max_samples_])[0]
+        return cls(forest, denominator, model.offset_)
+
+    def decision_function(self, X):
+        depths = np.cumsum(self.forest.value[self.forest.apply(X), 0], axis=0)[-1]
+        if self.denominator == 0:
+            # A forest fitted on a single sample scores everything 2 ** -1
+            return np.full(len(depths), -0.5) - self.offset
+        # score_samples (the opposite of the anomaly score of the paper) minus the contamination offset
+        return -(2 ** -(depths / self.denominator)) - self.offset
+
+
+class CompiledOneClassSVM:
+    """
+    The decision function of a fitted RBF OneClassSVM evaluated with NumPy:
+    the kernel against every support vector is one matrix product per block
+    of rows (block_rows keeps the temporary kernel matrix in cache). Matches
+    OneClassSVM.decision_function up to floating point rounding.
+    """
+
+    def __init__(self, support_vectors, dual_coef, intercept, gamma, block_rows=64):
+        self.support_vectors = support_vectors
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+        self.gamma = gamma
+        self.block_rows = block_rows
+        self.support_norms = np.einsum('ij,ij->i', support_vectors, support_vectors)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if model.kernel != 'rbf' or not isinstance(model.gamma, (int, float)):
+            raise ValueError('Only an RBF OneClassSVM with a numeric gamma can be compiled')
+        return cls(np.asarray(model.support_vectors_, dtype=np.float64), np.asarray(model.dual_coef_[0], dtype=np.float64),
+                   float(model.intercept_[0]), float(model.gamma))
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        scores = np.empty(len(X))
+        for start in range(0, len(X), self.block_rows):
+            block = X[start:start + self.block_rows]
+            distances = np.einsum('ij,ij->i', block, block)[:, np.newaxis] - 2.0 * (block @ self.support_vectors.T)
+            distances += self.support_norms
+            np.maximum(distances, 0.0, out=distances)
+            scores[start:start + len(block)] = np.exp(-self.gamma * distances) @ self.dual_coef + self.intercept
+        return scores
+
+
+class UnsupervisedDetector:
+    """
+    An unsupervised outlier detector (IsolationForest or OneClassSVM) fitted
+    on standardized features, behind the classifier interface everything
+    else scores with: classes_ and predict_proba over the raw feature matrix.
+
+    The scaler is part of the model: its mean and scale are applied to every
+    batch with one vectorized expression, the same one the detector was
+    fitted on. The anomaly score is the negated decision function (above 0
+    means outlier); probability_anomaly is a logistic of the score divided by
+    score_scale (the spread of the training scores), so it is 0.5 exactly at
+    the detector's threshold and argmax gives the detector's own labels.
+
+    compile() switches scoring to CompiledIsolationForest or
+    CompiledOneClassSVM; batches over max_rows rows then go back to the
+    sklearn estimator when that is faster (the isolation forest).
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, name, estimator, scaler, score_scale=1.0):
+        self.name = name
+        self.estimator = estimator
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self.n_features_in_ = len(self.mean)
+        self.score_scale = score_scale
+        self.compiled = None
+        self.max_rows = None
+
+    def __getstate__(self):
+        # Compiled scorers are rebuilt after loading (see compile_model)
+        return dict(self.__dict__, compiled=None, max_rows=None)
+
+    def transform(self, X):
+        """
+        Standardize a raw feature matrix
+        """
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def compile(self, max_rows=None):
+        if self.name == 'isolation_forest':
+            self.compiled = CompiledIsolationForest.from_sklearn(self.estimator)
+            self.max_rows = max_rows
+        else:
+            self.compiled = CompiledOneClassSVM.from_sklearn(self.estimator)
+        return self
+
+    def anomaly_scores(self, X):
+        """
+        Negated decision function of the detector: above 0 is an outlier
+        """
+        X = self.transform(X)
+        if self.compiled is not None and (self.max_rows is None or len(X) <= self.max_rows):
+            return -self.compiled.decision_function(X)
+        return -self.estimator.decision_function(X)
+
+    def predict_proba(self, X):
+        scores = self.anomaly_scores(X)
+        probabilities = np.empty((len(scores), 2))
+        probabilities[:, 1] = 1.0 / (1.0 + np.exp(-scores / self.score_scale))
+        probabilities[:, 0] = 1.0 - probabilities[:, 1]
+        return probabilities
+
+    def predict(self, X):
+        return (self.anomaly_scores(X) > 0).astype(np.int64)
+
+
+def train_detector(name, X, contamination=0.1, max_samples=20000, n_jobs=None, random_state=42):
+    """
+    Fit an unsupervised detector on the raw feature rows X (no labels).
+
+    The scaler is fitted on X first and the detector on the standardized
+    rows. contamination is the expected share of anomalies: the
+    IsolationForest contamination, or the OneClassSVM nu. A OneClassSVM
+    scales quadratically with its training rows, so it is fitted on a
+    random subsample of max_samples of them.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    if name not in UNSUPERVISED_DETECTORS:
+        raise ValueError(f"Unknown unsupervised detector: {name!r} (expected one of {', '.join(UNSUPERVISED_DETECTORS)})")
+    X = np.asarray(X)
+    scaler = StandardScaler().fit(X)
+    detector = UnsupervisedDetector(name, None, scaler)
+    X_scaled = detector.transform(X)
+    if name == 'isolation_forest':
+        from sklearn.ensemble import IsolationForest
+        detector.estimator = IsolationForest(contamination=contamination, random_state=random_state, n_jobs=n_jobs)
+        detector.estimator.fit(X_scaled)
+        # Scoring a few rows is faster without a thread pool
+        detector.estimator.set_params(n_jobs=None)
+    else:
+        from sklearn.svm import OneClassSVM
+        if max_samples and len(X_scaled) > max_samples:
+            rows = np.random.RandomState(random_state).choice(len(X_scaled), max_samples, replace=False)
+            fit_rows = X_scaled[np.sort(rows)]
+        else:
+            fit_rows = X_scaled
+        # The 'scale' heuristic, made explicit so the fitted kernel can be evaluated outside libsvm
+        gamma = 1.0 / (fit_rows.shape[1] * fit_rows.var()) if fit_rows.var() > 0 else 1.0
+        detector.estimator = OneClassSVM(nu=contamination, gamma=gamma)
+        detector.estimator.fit(fit_rows)
+        X_scaled = fit_rows
+    scores = -detector.estimator.decision_function(X_scaled)
+    detector.score_scale = float(np.std(scores)) or 1.0
+    return detector, scaler
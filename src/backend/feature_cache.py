@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from feature_pipeline import FeaturePipeline, FEATURES, PIPELINE_VERSION
+from dataset_io import read_dataset, columnar_copy, TRAINING_COLUMNS
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Engineered feature matrices are cached under FEATURE_CACHE_DIR, keyed by the
+# content of the input file and of the feature code; FEATURE_CACHE=0 disables the cache
+FEATURE_CACHE_DIR = os.environ.get('FEATURE_CACHE_DIR', os.path.join(current_dir, '..', '..', 'data', 'feature_cache'))
+FEATURE_CACHE_ENABLED = os.environ.get('FEATURE_CACHE', '1') != '0'
+# Least recently used entries beyond this many are removed
+FEATURE_CACHE_MAX_ENTRIES = int(os.environ.get('FEATURE_CACHE_MAX_ENTRIES', 8))
+
+# Modules whose code determines the features: editing any of them invalidates the cache
+FEATURE_MODULES = ['feature_pipeline.py', 'category_encoder.py', 'timestamp_decoder.py', 'feature_store.py',
+                   'sketches.py', 'dataset_io.py', 'chunked_features.py']
+
+
+def file_digest(path, block_size=1 << 20):
+    """
+    SHA-256 of a file's content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_digest():
+    """
+    SHA-256 over the source of the feature modules
+    """
+    digest = hashlib.sha256()
+    for name in FEATURE_MODULES:
+        digest.update(name.encode('utf-8'))
+        with open(os.path.join(current_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Content-addressed store of engineered feature matrices.
+
+    An entry is a directory holding features.npy (float32, one row per
+    login, columns in FEATURES order), labels.npy and, for training
+    features, the fitted pipeline. Entries are loaded memory-mapped, so a
+    hit costs neither the feature computation nor a copy of the matrix.
+    Keys hash the input file content, PIPELINE_VERSION, the feature code
+    and the build parameters, so changed data or feature code simply
+    misses; stale entries age out least recently used first.
+    """
+
+    def __init__(self, directory=FEATURE_CACHE_DIR, max_entries=FEATURE_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _digest(self, path):
+        """
+        file_digest() remembered per (path, size, mtime), so unchanged large files are hashed once
+        """
+        stat = os.stat(path)
+        signature = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+        index_path = os.path.join(self.directory, 'digests.json')
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        entry = index.get(signature[0])
+        if entry and entry['signature'] == signature:
+            return entry['digest']
+        digest = file_digest(path)
+        index[signature[0]] = {'signature': signature, 'digest': digest}
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+        return digest
+
+    def key(self, data_path, mode, **params):
+        """
+        Cache key for the features of data_path built in mode ('train' or
+        'transform') with params (paths among them are hashed by content)
+        """
+        description = {
+            'data': self._digest(data_path),
+            'mode': mode,
+            'pipeline_version': PIPELINE_VERSION,
+            'features': FEATURES,
+            'code': code_digest(),
+            'params': {name: self._digest(value) if name.endswith('_path') else value
+                       for name, value in sorted(params.items())}
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """
+        (X, y, pipeline) of a cached entry, memory-mapped read-only, or None
+        """
+        path = self.path(key)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        X = np.load(os.path.join(path, 'features.npy'), mmap_mode='r')
+        y = np.load(os.path.join(path, 'labels.npy'), mmap_mode='r')
+        pipeline_path = os.path.join(path, 'pipeline.pkl')
+        pipeline = FeaturePipeline.load(pipeline_path) if os.path.exists(pipeline_path) else None
+        # Mark the entry as recently used
+        os.utime(os.path.join(path, 'meta.json'))
+        return X, y, pipeline
+
+    def staging(self, key):
+        """
+        A fresh directory to build an entry in before commit()
+        """
+        path = f"{self.path(key)}.{os.getpid()}.tmp"
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def commit(self, key, staging, y, pipeline=None, meta=None):
+        """
+        Complete an entry whose features.npy was written to staging and publish it atomically
+        """
+        np.save(os.path.join(staging, 'labels.npy'), np.asarray(y))
+        if pipeline is not None:
+            pipeline.save(os.path.join(staging, 'pipeline.pkl'))
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(dict(meta or {}, key=key, created=time.time()), f, indent=2)
+        try:
+            os.rename(staging, self.path(key))
+        except OSError:
+            # Another process published the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.prune()
+
+    def put(self, key, X, y, pipeline=None, meta=None):
+        """
+        Store a feature matrix (and labels, and the fitted pipeline for training features)
+        """
+        staging = self.staging(key)
+        np.save(os.path.join(staging, 'features.npy'), np.ascontiguousarray(X, dtype=np.float32))
+        self.commit(key, staging, y, pipeline, meta)
+
+    def entries(self):
+        """
+        Cached entries, least recently used first
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            meta_path = os.path.join(self.directory, name, 'meta.json')
+            if os.path.exists(meta_path):
+                entries.append((os.path.getmtime(meta_path), name))
+        return [name for _, name in sorted(entries)]
+
+    def prune(self):
+        entries = self.entries()
+        for name in entries[:max(len(entries) - self.max_entries, 0)]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+def default_cache(use_cache=True):
+    return FeatureCache() if use_cache and FEATURE_CACHE_ENABLED else None
+
+
+def cached_features(data_path, build, mode, params=None, cache=None):
+    """
+    (X, y, pipeline) for data_path from the cache, or from build() -> (X, y, pipeline), which is then cached
+    """
+    if cache is None:
+        X, y, pipeline = build()
+        return np.asarray(X, dtype=np.float32), np.asarray(y), pipeline
+    # The file actually read: an up-to-date columnar conversion of a CSV replaces it
+    source = columnar_copy(data_path) or data_path
+    key = cache.key(source, mode, **(params or {}))
+    entry = cache.get(key)
+    if entry is not None:
+        print(f"Using cached features {key} for {data_path}")
+        return entry
+    X, y, pipeline = build()
+    params = {name: os.path.abspath(value) if name.endswith('_path') else value
+              for name, value in (params or {}).items()}
+    cache.put(key, X, y, pipeline if mode == 'train' else None,
+              {'data': os.path.abspath(source), 'mode': mode, 'rows': len(y), 'params': params})
+    return cache.get(key)
+
+
+def training_features(data_path, build, counting='exact', cache=None):
+    """
+    Training features of data_path: build() -> (X, y, fitted pipeline) runs only on a cache miss
+    """
+    return cached_features(data_path, build, 'train', {'counting': counting}, cache)
+
+
+def evaluation_features(data_path, pipeline_path, cache=None):
+    """
+    (X, y) of data_path through the fitted pipeline saved at pipeline_path,
+    with login frequencies counted over the dataset as training does
+    """
+    def build():
+        df = read_dataset(data_path, TRAINING_COLUMNS)
+        features = FeaturePipeline.load(pipeline_path).transform_frame(df, counts='dataset')
+        return features.to_numpy(dtype=np.float32), df['is_anomaly'].to_numpy(dtype=np.int64), None
+
+    X, y, _ = cached_features(data_path, build, 'transform', {'pipeline_path': pipeline_path}, cache)
+    return X, y
+
+
+def features_frame(X, y=None):
+    """
+    The feature matrix as a DataFrame with the FEATURES columns (and is_anomaly), without copying it
+    """
+    df = pd.DataFrame(X, columns=FEATURES, copy=False)
+    if y is not None:
+        df['is_anomaly'] = np.asarray(y)
+    return df
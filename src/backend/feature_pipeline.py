@@ -0,0 +1,260 @@
+import numpy as np
+import joblib
+from category_encoder import CategoryEncoder
+from timestamp_decoder import TimestampDecoder
+from feature_store import FrequencyFeatureStore, SketchFrequencyStore
+
+# Bump whenever the features produced for the same input change
+PIPELINE_VERSION = 1
+
+# Features used by the model, in training order
+FEATURES = [
+    'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
+    'is_new_device', 'bytes_in', 'bytes_out', 'success',
+    'geo_location_encoded', 'device_id_encoded',
+    'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
+]
+
+# Raw fields a login record must provide to be scored
+REQUIRED_FIELDS = ['timestamp', 'geo_location', 'device_id', 'is_new_device', 'bytes_in', 'bytes_out', 'success']
+NUMERIC_FIELDS = ['is_new_device', 'bytes_in', 'bytes_out', 'success']
+
+# Fields the encoders and login counts key on: a list or object there cannot be looked up
+KEY_FIELDS = [field for field, _ in FrequencyFeatureStore.ENTITIES.values()]
+
+# Column positions in the feature matrix
+_FREQUENCY_COLUMNS = [FEATURES.index(column) for _, column in FrequencyFeatureStore.ENTITIES.values()]
+
+
+class FeaturePipeline:
+    """
+    The feature engineering shared by training, evaluation and serving.
+
+    fit_transform() is used at training time: it fits the category encoders
+    and the login frequency store and adds the feature columns to the
+    training DataFrame. The fitted pipeline is saved next to the model and
+    applied everywhere else, either to DataFrames (transform_frame) or,
+    on the serving fast path, straight from a list of record dicts to a
+    float32 matrix (transform_records).
+    """
+
+    def __init__(self, geo_encoder=None, device_encoder=None, feature_store=None):
+        # Fitted sklearn LabelEncoders (e.g. geo_encoder.pkl) are compiled into CategoryEncoders
+        if geo_encoder is not None and not isinstance(geo_encoder, CategoryEncoder):
+            geo_encoder = CategoryEncoder.from_label_encoder(geo_encoder)
+        if device_encoder is not None and not isinstance(device_encoder, CategoryEncoder):
+            device_encoder = CategoryEncoder.from_label_encoder(device_encoder)
+        self.geo_encoder = geo_encoder
+        self.device_encoder = device_encoder
+        self.feature_store = feature_store
+        self.timestamp_decoder = TimestampDecoder()
+
+    def set_unknown_policy(self, unknown='value', unknown_value=-1):
+        """
+        How unseen geo locations and devices are encoded: as unknown_value, or rejected with an error
+        """
+        if unknown not in CategoryEncoder.UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown policy must be one of {', '.join(CategoryEncoder.UNKNOWN_POLICIES)}")
+        for encoder in (self.geo_encoder, self.device_encoder):
+            encoder.unknown = unknown
+            encoder.unknown_value = unknown_value
+
+    def _add_time_features(self, df):
+        # Extract time-based features straight from the raw timestamps
+        for column, values in self.timestamp_decoder.decode_array(df['timestamp']).items():
+            df[column] = values
+
+    @staticmethod
+    def _add_dataset_frequencies(df, counting='exact'):
+        """
+        Login frequency per user/device/location counted over the DataFrame itself
+        """
+        if counting == 'sketch':
+            for column, values in SketchFrequencyStore().frequencies(df).items():
+                df[column] = values
+            return
+        for field, column in FrequencyFeatureStore.ENTITIES.values():
+            df[column] = df[field].map(df[field].value_counts())
+
+    def fit_transform(self, df, counting='exact'):
+        """
+        Fit the encoders and frequency store on a training DataFrame and add the feature columns to it
+        """
+        self._add_time_features(df)
+
+        # Encode categorical variables
+        self.geo_encoder = CategoryEncoder.fit(df['geo_location'])
+        self.device_encoder = CategoryEncoder.fit(df['device_id'])
+        df['geo_location_encoded'] = self.geo_encoder.transform(df['geo_location'])
+        df['device_id_encoded'] = self.device_encoder.transform(df['device_id'])
+
+        # Feature engineering
+        self._add_dataset_frequencies(df, counting)
+        store_class = SketchFrequencyStore if counting == 'sketch' else FrequencyFeatureStore
+        self.feature_store = store_class().fit(df)
+        return df
+
+    def partial_fit_transform(self, df):
+        """
+        Update the fitted pipeline with a DataFrame of new logins and add the feature columns to it.
+
+        Used by incremental retraining: categories not seen before are
+        appended to the encoder vocabularies, so existing codes do not
+        change, and the new logins are added to the login counts, so every
+        row gets the frequencies counted over all logins so far, as
+        fit_transform counts them over the whole dataset.
+        """
+        self._add_time_features(df)
+
+        self.geo_encoder = self.geo_encoder.extended(df['geo_location'])
+        self.device_encoder = self.device_encoder.extended(df['device_id'])
+        df['geo_location_encoded'] = self.geo_encoder.transform(df['geo_location'])
+        df['device_id_encoded'] = self.device_encoder.transform(df['device_id'])
+
+        self.feature_store.add_counts({field: df[field].value_counts() for field, _ in FrequencyFeatureStore.ENTITIES.values()})
+        for entity, (field, column) in FrequencyFeatureStore.ENTITIES.items():
+            df[column] = self.feature_store.counts_for(entity, df[field].to_numpy())
+        return df
+
+    def transform_frame(self, df, counts='store', update_counts=True):
+        """
+        Add the feature columns to a DataFrame of logins and return the feature block.
+
+        counts='store' takes the login frequencies from the running feature
+        store (serving), counts='dataset' recounts them over the DataFrame
+        itself, as training does (offline evaluation), and counts='frame'
+        uses frequency columns the DataFrame already has (counted by the
+        process that shards a stream across workers). Unseen categories
+        are encoded as -1.
+        """
+        self._add_time_features(df)
+
+        # Encode categorical variables (unseen categories follow the encoder's unknown policy)
+        df['geo_location_encoded'] = self.geo_encoder.transform(df['geo_location'])
+        df['device_id_encoded'] = self.device_encoder.transform(df['device_id'])
+
+        if counts == 'dataset':
+            self._add_dataset_frequencies(df)
+        elif counts == 'frame':
+            missing = [column for _, column in FrequencyFeatureStore.ENTITIES.values() if column not in df]
+            if missing:
+                raise KeyError(f"counts='frame' needs the frequency columns: {', '.join(missing)}")
+        elif update_counts:
+            self.feature_store.observe_frame(df)
+        else:
+            for entity, (field, column) in FrequencyFeatureStore.ENTITIES.items():
+                df[column] = [max(self.feature_store.lookup(entity, key), 1) for key in df[field]]
+        return df[FEATURES]
+
+    def parse_record(self, record):
+        """
+        The time, numeric and encoded category features of one login record,
+        as (values, None), or (None, error message) when it cannot be scored
+        """
+        if not isinstance(record, dict):
+            return None, 'Record must be a JSON object'
+        missing = [field for field in REQUIRED_FIELDS if record.get(field) is None]
+        if missing:
+            return None, f"Missing required fields: {', '.join(missing)}"
+        unhashable = next((field for field in KEY_FIELDS if isinstance(record.get(field), (list, dict))), None)
+        if unhashable:
+            return None, f"Invalid value for {unhashable}: expected a string"
+        try:
+            time_features = self.timestamp_decoder.decode(record['timestamp'])
+        except (TypeError, ValueError):
+            return None, f"Invalid timestamp: {record['timestamp']!r}"
+        try:
+            numeric = [float(record[field]) for field in NUMERIC_FIELDS]
+        except (TypeError, ValueError):
+            field = next(f for f in NUMERIC_FIELDS if not _is_number(record[f]))
+            return None, f"Invalid numeric value for {field}: {record[field]!r}"
+        try:
+            codes = (self.geo_encoder.encode(record['geo_location']), self.device_encoder.encode(record['device_id']))
+        except (TypeError, ValueError) as e:
+            return None, str(e)
+        return (*time_features, *numeric, *codes), None
+
+    def validate_records(self, records):
+        """
+        Positions of the records transform_records() would reject, mapped to their error messages
+        """
+        errors = {}
+        for i, record in enumerate(records):
+            _, error = self.parse_record(record)
+            if error is not None:
+                errors[i] = error
+        return errors
+
+    def transform_records(self, records, update_counts=True, frequencies=None):
+        """
+        Transform login record dicts straight into a float32 feature matrix.
+
+        Returns the matrix for the valid records, the positions of those
+        records in the input list, and a dict mapping the position of every
+        malformed record to an error message. The login frequency features
+        come from the feature store, which is updated with the valid records
+        unless update_counts is False, or from frequencies (frequency column
+        -> one value per input record) when they were counted beforehand.
+        """
+        X = np.empty((len(records), len(FEATURES)), dtype=np.float32)
+        parse_record = self.parse_record
+        positions = []
+        valid = []
+        errors = {}
+        row = 0
+        for i, record in enumerate(records):
+            values, error = parse_record(record)
+            if error is not None:
+                errors[i] = error
+                continue
+            X[row, :11] = values
+            positions.append(i)
+            valid.append(record)
+            row += 1
+
+        X = X[:row]
+        if frequencies is not None:
+            for (_, column), index in zip(FrequencyFeatureStore.ENTITIES.values(), _FREQUENCY_COLUMNS):
+                X[:, index] = np.asarray(frequencies[column])[positions]
+        elif update_counts:
+            frequencies = self.feature_store.observe(valid)
+            for column, index in zip(frequencies, _FREQUENCY_COLUMNS):
+                X[:, index] = frequencies[column]
+        else:
+            for (entity, (field, _)), index in zip(FrequencyFeatureStore.ENTITIES.items(), _FREQUENCY_COLUMNS):
+                X[:, index] = [max(self.feature_store.lookup(entity, record.get(field)), 1) for record in valid]
+        return X, positions, errors
+
+    def save(self, path):
+        """
+        Save the fitted pipeline
+        """
+        joblib.dump({
+            'version': PIPELINE_VERSION,
+            'features': FEATURES,
+            # Only the encoder vocabularies are stored, so loading does not depend on the sklearn version
+            'geo_classes': self.geo_encoder.classes_,
+            'device_classes': self.device_encoder.classes_,
+            'feature_store': self.feature_store.get_state() if self.feature_store is not None else None
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a pipeline saved with save()
+        """
+        state = joblib.load(path)
+        if state['features'] != FEATURES:
+            raise ValueError(f"Feature pipeline at {path} was saved with a different feature list")
+        feature_store = None
+        if state['feature_store'] is not None:
+            feature_store = FrequencyFeatureStore.from_state(state['feature_store'])
+        return cls(CategoryEncoder(state['geo_classes']), CategoryEncoder(state['device_classes']), feature_store)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
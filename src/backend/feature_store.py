@@ -0,0 +1,498 @@
+import pandas as pd
+import numpy as np
+import joblib
+import threading
+import time
+import os
+from collections import OrderedDict
+from sketches import CountMinSketch, HyperLogLog
+
+
+class FrequencyFeatureStore:
+    """
+    Running login counts per user, device and location for inference.
+
+    Training computes user_login_frequency, device_login_frequency and
+    location_login_frequency with value_counts() over the whole dataset.
+    This store is bootstrapped from those same counts and then updated with
+    every scored login, so inference sees the same kind of values the model
+    was trained on instead of a constant placeholder.
+
+    Each entity type keeps at most max_keys keys; when the limit is reached
+    the least recently seen key is evicted. With half_life_days set, a
+    time-decayed count is kept next to the exact one and served instead
+    (pass decayed=False to read the exact count).
+    """
+
+    # entity name -> (record field, feature column)
+    ENTITIES = {
+        'user': ('user_id', 'user_login_frequency'),
+        'device': ('device_id', 'device_login_frequency'),
+        'location': ('geo_location', 'location_login_frequency')
+    }
+
+    def __init__(self, max_keys=1000000, half_life_days=None):
+        self.max_keys = max_keys
+        self.half_life_days = half_life_days
+        # entity -> OrderedDict(key -> [count, decayed_count, last_seen]), least recently seen first
+        self.counts = {entity: OrderedDict() for entity in self.ENTITIES}
+        self.evicted = {entity: 0 for entity in self.ENTITIES}
+        self._lock = threading.Lock()
+
+    def _decay(self, value, last_seen, now):
+        if self.half_life_days is None or last_seen is None:
+            return value
+        elapsed_days = max(now - last_seen, 0) / 86400
+        return value * 0.5 ** (elapsed_days / self.half_life_days)
+
+    def _update(self, entity, key, now):
+        counts = self.counts[entity]
+        entry = counts.get(key)
+        if entry is None:
+            entry = counts[key] = [0, 0.0, None]
+            if len(counts) > self.max_keys:
+                counts.popitem(last=False)
+                self.evicted[entity] += 1
+        else:
+            counts.move_to_end(key)
+        entry[0] += 1
+        entry[1] = self._decay(entry[1], entry[2], now) + 1
+        entry[2] = now
+        return entry
+
+    def _value(self, entry, decayed, now):
+        if entry is None:
+            return 0
+        if decayed is None:
+            decayed = self.half_life_days is not None
+        if decayed:
+            return self._decay(entry[1], entry[2], now)
+        return entry[0]
+
+    def fit(self, df):
+        """
+        Bootstrap counts from a training DataFrame, using the same
+        value_counts() as load_and_preprocess_data
+        """
+        return self.fit_counts({field: df[field].value_counts() for field, _ in self.ENTITIES.values()})
+
+    def fit_counts(self, value_counts_by_field):
+        """
+        Bootstrap counts from precomputed value_counts() per record field
+        (e.g. summed over the chunks of a dataset too large to load at once)
+        """
+        now = time.time()
+        with self._lock:
+            for entity, (field, _) in self.ENTITIES.items():
+                # Insert the least frequent keys first so they are evicted first
+                value_counts = value_counts_by_field[field]
+                value_counts = value_counts[value_counts > 0].sort_values(kind='stable')
+                if len(value_counts) > self.max_keys:
+                    self.evicted[entity] += len(value_counts) - self.max_keys
+                    value_counts = value_counts.iloc[-self.max_keys:]
+                counts = self.counts[entity] = OrderedDict()
+                for key, count in value_counts.items():
+                    counts[key] = [int(count), float(count), now]
+        return self
+
+    def add_counts(self, value_counts_by_field):
+        """
+        Add value_counts() per record field of a batch of new logins to the
+        counts (incremental retraining), evicting the least recently seen keys
+        """
+        now = time.time()
+        with self._lock:
+            for entity, (field, _) in self.ENTITIES.items():
+                value_counts = value_counts_by_field[field]
+                for key, count in value_counts[value_counts > 0].items():
+                    entry = self._update(entity, key, now)
+                    entry[0] += int(count) - 1
+                    entry[1] += int(count) - 1
+        return self
+
+    def merge_forks(self, forks):
+        """
+        Add the logins counted by stores that started as copies of this one
+        (e.g. in the forked workers of the preforked server): only what each
+        fork counted on top of this store is added, so the counts they
+        started from are not counted once per fork
+        """
+        now = time.time()
+        with self._lock:
+            for entity in self.ENTITIES:
+                counts = self.counts[entity]
+                # key -> [new logins, their decayed count as of now], over all forks
+                added = {}
+                for fork in forks:
+                    for key, (count, decayed, last_seen) in fork.counts[entity].items():
+                        entry = counts.get(key)
+                        base_count = entry[0] if entry is not None else 0
+                        if count <= base_count:
+                            # No new logins (or the fork evicted the key and started it over)
+                            continue
+                        base_decayed = self._decay(entry[1], entry[2], now) if entry is not None else 0.0
+                        total = added.setdefault(key, [0, 0.0])
+                        total[0] += count - base_count
+                        total[1] += self._decay(decayed, last_seen, now) - base_decayed
+                for key, (count, decayed) in added.items():
+                    entry = counts.get(key)
+                    if entry is None:
+                        entry = counts[key] = [0, 0.0, None]
+                    else:
+                        counts.move_to_end(key)
+                    entry[0] += count
+                    entry[1] = self._decay(entry[1], entry[2], now) + decayed
+                    entry[2] = now
+                while len(counts) > self.max_keys:
+                    counts.popitem(last=False)
+                    self.evicted[entity] += 1
+                self.evicted[entity] += sum(max(fork.evicted[entity] - self.evicted[entity], 0) for fork in forks)
+        return self
+
+    def counts_for(self, entity, keys):
+        """
+        Current counts for a batch of keys as an int64 array (at least 1, like observe())
+        """
+        with self._lock:
+            counts = self.counts[entity]
+            return np.array([max(counts[key][0], 1) if key in counts else 1 for key in keys], dtype=np.int64)
+
+    def observe(self, records, timestamps=None, decayed=None):
+        """
+        Record logins and return their frequency features.
+
+        records is a list of dicts with user_id, device_id and geo_location.
+        Each login is counted before its features are read, matching the
+        training counts which include the row itself. Records missing an
+        entity field get a frequency of 1 for it and are not counted.
+        The values are the decayed counts when half_life_days is set (or
+        decayed=True), the exact ones otherwise.
+        Returns a dict mapping each feature column to a list of values.
+        """
+        now = time.time()
+        features = {column: [] for _, column in self.ENTITIES.values()}
+        with self._lock:
+            for i, record in enumerate(records):
+                seen = timestamps[i] if timestamps is not None else now
+                for entity, (field, column) in self.ENTITIES.items():
+                    key = record.get(field)
+                    if key is None:
+                        features[column].append(1)
+                        continue
+                    entry = self._update(entity, key, seen)
+                    features[column].append(self._value(entry, decayed, seen))
+        return features
+
+    def observe_frame(self, df, decayed=None):
+        """
+        Record the logins in a DataFrame and add the frequency feature columns to it
+        """
+        records = df[[field for field, _ in self.ENTITIES.values()]].to_dict('records')
+        for column, values in self.observe(records, decayed=decayed).items():
+            df[column] = values
+        return df
+
+    def lookup(self, entity, key, decayed=None):
+        """
+        Current count for one key without recording a login
+        """
+        with self._lock:
+            return self._value(self.counts[entity].get(key), decayed, time.time())
+
+    def stats(self):
+        """
+        Number of tracked and evicted keys per entity type
+        """
+        return {
+            entity: {'keys': len(self.counts[entity]), 'evicted': self.evicted[entity]}
+            for entity in self.ENTITIES
+        }
+
+    def get_state(self):
+        """
+        Plain-data snapshot of the counts (picklable without this module)
+        """
+        with self._lock:
+            return {
+                'backend': 'exact',
+                'max_keys': self.max_keys,
+                'half_life_days': self.half_life_days,
+                'counts': {entity: list(counts.items()) for entity, counts in self.counts.items()},
+                'evicted': dict(self.evicted)
+            }
+
+    def save(self, path):
+        """
+        Write a snapshot of the counts to disk
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(self.get_state(), tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Rebuild a store from get_state() output; sketch states are restored
+        as a SketchFrequencyStore
+        """
+        if state.get('backend') == 'sketch':
+            return SketchFrequencyStore.from_state(state)
+        store = FrequencyFeatureStore(max_keys=state['max_keys'], half_life_days=state['half_life_days'])
+        for entity, items in state['counts'].items():
+            store.counts[entity] = OrderedDict(items)
+        store.evicted.update(state['evicted'])
+        return store
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore a store from a snapshot written by save()
+        """
+        return cls.from_state(joblib.load(path))
+
+    @classmethod
+    def load_or_bootstrap(cls, paths, csv_path, backend='exact', **kwargs):
+        """
+        Load the first snapshot in paths that exists, otherwise bootstrap
+        from the training CSV (with an exact or sketch backend)
+        """
+        for path in paths:
+            if path and os.path.exists(path):
+                return FrequencyFeatureStore.load(path)
+        store_class = SketchFrequencyStore if backend == 'sketch' else cls
+        return store_class(**kwargs).fit(pd.read_csv(csv_path, usecols=[field for field, _ in cls.ENTITIES.values()]))
+
+
+class SketchFrequencyStore:
+    """
+    Fixed-memory variant of FrequencyFeatureStore for high-cardinality tenants.
+
+    Login counts per entity type are kept in Count-Min Sketches sized from
+    epsilon/delta (overcount of at most epsilon * logins seen, with
+    probability 1 - delta), so memory does not grow with the number of
+    distinct users or devices. Per-user distinct device and location counts
+    are kept in small HyperLogLogs, at most max_users of them, evicting the
+    least recently seen user. Stores built with the same parameters can be
+    merged, e.g. to combine the counts of several worker processes.
+
+    Unlike the exact store, a batch is added before it is read, so every
+    row of a batch sees the counts including the whole batch.
+    """
+
+    ENTITIES = FrequencyFeatureStore.ENTITIES
+
+    # Per-user distinct counters: name -> record field
+    DISTINCT = {'devices': 'device_id', 'locations': 'geo_location'}
+
+    def __init__(self, epsilon=1e-5, delta=1e-3, distinct_precision=6, max_users=100000):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.distinct_precision = distinct_precision
+        self.max_users = max_users
+        self.sketches = {entity: CountMinSketch.from_error(epsilon, delta) for entity in self.ENTITIES}
+        # user_id -> {name: HyperLogLog}, least recently seen first
+        self.distinct = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _add_distinct(self, user_ids, frame):
+        for user_id, group in frame.groupby(user_ids, sort=False):
+            sketches = self.distinct.get(user_id)
+            if sketches is None:
+                sketches = self.distinct[user_id] = {
+                    name: HyperLogLog(self.distinct_precision) for name in self.DISTINCT
+                }
+                if len(self.distinct) > self.max_users:
+                    self.distinct.popitem(last=False)
+            else:
+                self.distinct.move_to_end(user_id)
+            for name, field in self.DISTINCT.items():
+                sketches[name].add(group[field].to_numpy())
+
+    def fit(self, df):
+        """
+        Bootstrap the sketches from a training DataFrame
+        """
+        self.add_counts({field: df[field].value_counts() for field, _ in self.ENTITIES.values()})
+        with self._lock:
+            self._add_distinct(df['user_id'], df)
+        return self
+
+    def add_counts(self, value_counts_by_field):
+        """
+        Add value_counts() per record field to the sketches (see FrequencyFeatureStore.add_counts)
+        """
+        with self._lock:
+            for entity, (field, _) in self.ENTITIES.items():
+                value_counts = value_counts_by_field[field]
+                value_counts = value_counts[value_counts > 0]
+                self.sketches[entity].add(value_counts.index.to_numpy(), value_counts.to_numpy())
+        return self
+
+    def counts_for(self, entity, keys):
+        """
+        Estimated counts for a batch of keys as an int64 array (at least 1)
+        """
+        with self._lock:
+            return np.maximum(self.sketches[entity].query(np.asarray(keys, dtype=object)), 1)
+
+    def frequencies(self, df):
+        """
+        Approximate value_counts() mapping for the frequency columns of a
+        training DataFrame, without storing a counter per distinct key
+        """
+        sketches = {entity: CountMinSketch.from_error(self.epsilon, self.delta) for entity in self.ENTITIES}
+        features = {}
+        for entity, (field, column) in self.ENTITIES.items():
+            keys = df[field].to_numpy()
+            sketches[entity].add(keys)
+            features[column] = sketches[entity].query(keys)
+        return features
+
+    def observe(self, records, timestamps=None, decayed=False):
+        """
+        Record logins and return their frequency features (see FrequencyFeatureStore.observe)
+        """
+        if decayed:
+            raise ValueError('Decayed counts are not supported by the sketch store')
+        frame = pd.DataFrame(records, columns=[field for field, _ in self.ENTITIES.values()])
+        return self.observe_frame(frame)
+
+    def observe_frame(self, df, decayed=False):
+        """
+        Record the logins in a DataFrame and add the frequency feature columns to it
+        """
+        if decayed:
+            raise ValueError('Decayed counts are not supported by the sketch store')
+        features = {}
+        with self._lock:
+            for entity, (field, column) in self.ENTITIES.items():
+                present = df[field].notna().to_numpy()
+                keys = df[field].to_numpy()[present]
+                self.sketches[entity].add(keys)
+                values = np.ones(len(df), dtype=np.int64)
+                values[present] = self.sketches[entity].query(keys)
+                features[column] = values
+            users = df['user_id'].notna()
+            if users.any():
+                self._add_distinct(df.loc[users, 'user_id'], df[users])
+        for column, values in features.items():
+            df[column] = values
+        return {column: values.tolist() for column, values in features.items()}
+
+    def lookup(self, entity, key, decayed=False):
+        """
+        Estimated count for one key without recording a login
+        """
+        with self._lock:
+            return int(self.sketches[entity].query([key])[0])
+
+    def distinct_count(self, user_id, name):
+        """
+        Estimated number of distinct devices or locations seen for a user
+        """
+        with self._lock:
+            sketches = self.distinct.get(user_id)
+            return sketches[name].count() if sketches else 0
+
+    def merge(self, other):
+        """
+        Add the counts of another store built with the same parameters
+        """
+        with self._lock:
+            for entity, sketch in self.sketches.items():
+                sketch.merge(other.sketches[entity])
+            self._merge_distinct(other)
+        return self
+
+    def _merge_distinct(self, other):
+        for user_id, sketches in other.distinct.items():
+            if user_id in self.distinct:
+                for name, sketch in sketches.items():
+                    self.distinct[user_id][name].merge(sketch)
+            else:
+                self.distinct[user_id] = sketches
+                if len(self.distinct) > self.max_users:
+                    self.distinct.popitem(last=False)
+
+    def merge_forks(self, forks):
+        """
+        Add the logins counted by stores that started as copies of this one
+        (see FrequencyFeatureStore.merge_forks)
+        """
+        with self._lock:
+            for entity, sketch in self.sketches.items():
+                base_table, base_total = sketch.table.copy(), sketch.total
+                for fork in forks:
+                    # Sketch cells only grow, so a fork's cells are at least the ones it started from
+                    sketch.table += fork.sketches[entity].table - base_table
+                    sketch.total += fork.sketches[entity].total - base_total
+            # Distinct counters merge by taking register maxima, so the ones the forks share are not counted twice
+            for fork in forks:
+                self._merge_distinct(fork)
+        return self
+
+    def stats(self):
+        """
+        Memory footprint and error bound per entity type
+        """
+        stats = {
+            entity: {'bytes': sketch.nbytes, 'error_bound': sketch.error_bound, 'logins': sketch.total}
+            for entity, sketch in self.sketches.items()
+        }
+        stats['distinct_users'] = {
+            'keys': len(self.distinct),
+            'bytes': len(self.distinct) * len(self.DISTINCT) * 2 ** self.distinct_precision
+        }
+        return stats
+
+    def get_state(self):
+        """
+        Plain-data snapshot of the sketches (picklable without this module)
+        """
+        with self._lock:
+            return {
+                'backend': 'sketch',
+                'epsilon': self.epsilon,
+                'delta': self.delta,
+                'distinct_precision': self.distinct_precision,
+                'max_users': self.max_users,
+                'tables': {entity: (sketch.table, sketch.total) for entity, sketch in self.sketches.items()},
+                'distinct': [
+                    (user_id, {name: sketch.registers for name, sketch in sketches.items()})
+                    for user_id, sketches in self.distinct.items()
+                ]
+            }
+
+    def save(self, path):
+        """
+        Write a snapshot of the sketches to disk
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(self.get_state(), tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore a store from a snapshot written by save()
+        """
+        return cls.from_state(joblib.load(path))
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Rebuild a store from get_state() output
+        """
+        store = cls(epsilon=state['epsilon'], delta=state['delta'],
+                    distinct_precision=state['distinct_precision'], max_users=state['max_users'])
+        for entity, (table, total) in state['tables'].items():
+            store.sketches[entity].table = table
+            store.sketches[entity].total = total
+        for user_id, registers in state['distinct']:
+            sketches = {}
+            for name, values in registers.items():
+                sketch = HyperLogLog(store.distinct_precision)
+                sketch.registers = values
+                sketches[name] = sketch
+            store.distinct[user_id] = sketches
+        return store
@@ -1,22 +1,21 @@
 import pandas as pd
 import numpy as np
 import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
+from feature_pipeline import FEATURES
+from feature_cache import default_cache, evaluation_features, features_frame
 import warnings
 warnings.filterwarnings('ignore')
 
 def visualize_feature_importance():
+    # Plotting libraries load only when a report is drawn
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # Load the trained model
     model = joblib.load('anomaly_detection_model.pkl')
     
     # Define feature names
-    features = [
-        'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-        'is_new_device', 'bytes_in', 'bytes_out', 'success',
-        'geo_location_encoded', 'device_id_encoded',
-        'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-    ]
+    features = FEATURES
     
     # Get feature importances
     importances = model.feature_importances_
@@ -46,13 +45,14 @@ def visualize_feature_importance():
     print("\nFeature importance plot saved as 'feature_importance.png'")
     
     # Create correlation matrix
-    # Load sample data to calculate correlations
-    df = pd.read_csv('../../data/sample_dataset.csv')
-    
     # Select numerical features
     numerical_features = [
         'login_hour', 'is_new_device', 'bytes_in', 'bytes_out', 'success'
     ]
+
+    # Features of the sample data as the model sees them (cached between runs) to calculate correlations
+    X, y = evaluation_features('../../data/sample_dataset.csv', 'feature_pipeline.pkl', default_cache())
+    df = features_frame(X, y)
     
     # Calculate correlation matrix
     corr_matrix = df[numerical_features + ['is_anomaly']].corr()
@@ -0,0 +1,241 @@
+import os
+import json
+import math
+import time
+import hashlib
+import numpy as np
+from memory_report import PeakRssSampler
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Fold results are cached here, so rerunning a search (e.g. with a larger
+# budget) only evaluates what has not been evaluated before
+SEARCH_CACHE_DIR = os.environ.get('SEARCH_CACHE_DIR', os.path.join(current_dir, '..', '..', 'data', 'search_cache'))
+
+# Random forest hyperparameters searched over
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 400],
+    'max_depth': [None, 8, 12, 16, 24],
+    'min_samples_leaf': [1, 2, 5, 10],
+    'max_features': ['sqrt', 'log2', 0.5, None],
+    'class_weight': [None, 'balanced', 'balanced_subsample']
+}
+
+# Validation metrics recorded for every fold; the search ranks candidates by one of them
+METRICS = ('f1', 'average_precision', 'roc_auc', 'precision', 'recall', 'accuracy')
+
+# The current model, always evaluated first
+DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': None, 'min_samples_leaf': 1,
+                  'max_features': 'sqrt', 'class_weight': None}
+
+
+def sample_candidates(n_candidates, seed=42, space=SEARCH_SPACE):
+    """
+    The default parameters plus n_candidates - 1 distinct random draws from the search space
+    """
+    rng = np.random.RandomState(seed)
+    candidates = [dict(DEFAULT_PARAMS)]
+    seen = {json.dumps(DEFAULT_PARAMS, sort_keys=True)}
+    total = math.prod(len(values) for values in space.values())
+    while len(candidates) < min(n_candidates, total):
+        params = {name: values[rng.randint(len(values))] for name, values in space.items()}
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def data_digest(X, y, rows):
+    """
+    Digest of the training rows, part of every fold cache key
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (np.ascontiguousarray(rows), np.ascontiguousarray(y)):
+        digest.update(array.data)
+    # Hashing the feature matrix block by block keeps memory flat for memory-mapped matrices
+    for start in range(0, len(X), 1000000):
+        digest.update(np.ascontiguousarray(X[start:start + 1000000]).data)
+    return digest.hexdigest()
+
+
+def fold_metrics(y_true, y_pred, y_score):
+    from sklearn.metrics import (f1_score, average_precision_score, roc_auc_score, precision_score,
+                                 recall_score, accuracy_score)
+    both_classes = len(np.unique(y_true)) == 2
+    return {
+        'f1': float(f1_score(y_true, y_pred, zero_division=0)),
+        'average_precision': float(average_precision_score(y_true, y_score)) if both_classes else None,
+        'roc_auc': float(roc_auc_score(y_true, y_score)) if both_classes else None,
+        'precision': float(precision_score(y_true, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_true, y_pred, zero_division=0)),
+        'accuracy': float(accuracy_score(y_true, y_pred))
+    }
+
+
+class HyperparameterSearch:
+    """
+    Time-budgeted successive halving over random forest hyperparameters.
+
+    Every candidate is scored by stratified k-fold cross-validation on a
+    small stratified subsample of the training rows; only the best
+    1/factor of them move on to the next round, on factor times more rows,
+    until one candidate is left or the rows run out. Evaluation stops once
+    budget_seconds have passed, and the best candidate at the largest
+    subsample reached wins. Forests use n_jobs cores; subsamples, folds
+    and forests are seeded, so a search is reproducible. Each fold result
+    is cached by (training data, parameters, rows, fold), so a rerun only
+    pays for what it has not evaluated yet. report() has the wall time,
+    peak memory and validation metrics of every candidate fold.
+    """
+
+    def __init__(self, metric='f1', budget_seconds=600, n_candidates=30, factor=3, cv=3, min_rows=2000,
+                 max_rows=None, n_jobs=-1, seed=42, cache_dir=SEARCH_CACHE_DIR):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r} (expected one of {', '.join(METRICS)})")
+        self.metric = metric
+        self.budget_seconds = budget_seconds
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.cv = cv
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.n_jobs = n_jobs
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self.rounds = []
+        self.best = None
+        self.elapsed = 0.0
+        self.stopped_by_budget = False
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def _evaluate_fold(self, X, y, fold_rows, params, data_key, resource, fold):
+        """
+        Fit and score one candidate on one fold, or return its cached result
+        """
+        import sklearn
+        key = hashlib.sha256(json.dumps({
+            'data': data_key, 'params': params, 'rows': resource, 'fold': fold, 'cv': self.cv,
+            'seed': self.seed, 'sklearn': sklearn.__version__
+        }, sort_keys=True).encode('utf-8')).hexdigest()
+        path = self._cache_path(key) if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return dict(json.load(f), cached=True)
+
+        from sklearn.ensemble import RandomForestClassifier
+        train_rows, validation_rows = fold_rows
+        model = RandomForestClassifier(random_state=42, n_jobs=self.n_jobs, **params)
+        started = time.perf_counter()
+        with PeakRssSampler() as memory:
+            model.fit(X[train_rows], y[train_rows])
+            fit_seconds = time.perf_counter() - started
+            scores = model.predict_proba(X[validation_rows])[:, list(model.classes_).index(1)]
+        result = {
+            'fit_seconds': round(fit_seconds, 4),
+            'wall_seconds': round(time.perf_counter() - started, 4),
+            'peak_rss_mb': round(memory.peak_mb, 1),
+            'peak_rss_delta_mb': round(memory.delta_mb, 1),
+            'metrics': fold_metrics(y[validation_rows], (scores >= 0.5).astype(y.dtype), scores)
+        }
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        return dict(result, cached=False)
+
+    def _subsample(self, y, rows, size):
+        """
+        A stratified, seeded subsample of size rows, split into cv stratified folds
+        """
+        from sklearn.model_selection import train_test_split, StratifiedKFold
+        if size < len(rows):
+            rows, _ = train_test_split(rows, train_size=size, random_state=self.seed, stratify=y[rows])
+        folds = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.seed)
+        return [(rows[train], rows[validation]) for train, validation in folds.split(rows, y[rows])]
+
+    def _resources(self, n_rows, n_candidates):
+        """
+        Rows per round: factor times more each round, ending at n_rows
+        """
+        rounds = max(math.ceil(math.log(n_candidates, self.factor)), 0) + 1 if n_candidates > 1 else 1
+        first = max(self.min_rows, n_rows // self.factor ** (rounds - 1))
+        return [min(first * self.factor ** i, n_rows) for i in range(rounds)]
+
+    def run(self, X, y, rows=None, progress=True):
+        """
+        Search over the training rows of X, y (all rows by default); returns the best parameters
+        """
+        y = np.asarray(y)
+        rows = np.arange(len(y)) if rows is None else np.asarray(rows)
+        n_rows = min(len(rows), self.max_rows) if self.max_rows else len(rows)
+        data_key = data_digest(X, y, rows)
+        candidates = sample_candidates(self.n_candidates, self.seed)
+        started = time.perf_counter()
+
+        for resource in self._resources(n_rows, len(candidates)):
+            folds = self._subsample(y, rows, resource)
+            results = []
+            for params in candidates:
+                fold_results = []
+                for fold, fold_rows in enumerate(folds):
+                    if time.perf_counter() - started >= self.budget_seconds:
+                        self.stopped_by_budget = True
+                        break
+                    fold_results.append(self._evaluate_fold(X, y, fold_rows, params, data_key, resource, fold))
+                if len(fold_results) < len(folds):
+                    break
+                scores = [result['metrics'][self.metric] for result in fold_results]
+                scores = [score for score in scores if score is not None]
+                results.append({
+                    'params': params,
+                    'score': float(np.mean(scores)) if scores else None,
+                    'score_std': float(np.std(scores)) if scores else None,
+                    'wall_seconds': round(sum(result['wall_seconds'] for result in fold_results), 4),
+                    'peak_rss_mb': max(result['peak_rss_mb'] for result in fold_results),
+                    'cached_folds': sum(result['cached'] for result in fold_results),
+                    'folds': fold_results
+                })
+            if not results:
+                break
+            results.sort(key=lambda result: -1 if result['score'] is None else result['score'], reverse=True)
+            self.rounds.append({'rows': resource, 'candidates': results, 'complete': len(results) == len(candidates)})
+            self.best = results[0]
+            if progress:
+                print(f"Round {len(self.rounds)}: {len(results)}/{len(candidates)} candidates on {resource:,} rows, "
+                      f"best {self.metric} {self.best['score']:.4f} with {self.best['params']}")
+            if self.stopped_by_budget or len(results) == 1:
+                break
+            candidates = [result['params'] for result in results[:max(math.ceil(len(results) / self.factor), 1)]]
+
+        self.elapsed = time.perf_counter() - started
+        return self.best_params
+
+    @property
+    def best_params(self):
+        return dict(self.best['params']) if self.best else dict(DEFAULT_PARAMS)
+
+    def report(self):
+        """
+        Machine-readable summary of the search
+        """
+        import sklearn
+        return {
+            'metric': self.metric,
+            'budget_seconds': self.budget_seconds,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'stopped_by_budget': self.stopped_by_budget,
+            'n_jobs': self.n_jobs,
+            'cpus': os.cpu_count(),
+            'factor': self.factor,
+            'cv': self.cv,
+            'seed': self.seed,
+            'sklearn_version': sklearn.__version__,
+            'search_space': SEARCH_SPACE,
+            'best': {key: value for key, value in self.best.items() if key != 'folds'} if self.best else None,
+            'rounds': self.rounds
+        }
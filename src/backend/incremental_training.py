@@ -0,0 +1,170 @@
+import io
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from feature_pipeline import FEATURES
+from dataset_io import (dataset_format, compact_dtypes, iter_dataset_batches, DATASET_DTYPES, TRAINING_COLUMNS,
+                        COLUMNAR_FORMATS)
+
+# Bytes before the processed offset of a CSV whose digest is kept, to detect a rewritten (not appended) file
+TAIL_BYTES = 65536
+
+
+def _tail_digest(f, offset):
+    start = max(offset - TAIL_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def dataset_position(path):
+    """
+    Where a dataset ends now: the offset after its last complete line for a
+    CSV; for Parquet/Feather, rows is set to the row count once it is loaded
+    """
+    file_format = dataset_format(path)
+    position = {'data': os.path.abspath(path), 'format': file_format, 'rows': 0}
+    if file_format in COLUMNAR_FORMATS:
+        return position
+    if path.endswith('.gz'):
+        raise ValueError('Incremental training needs an uncompressed CSV (gzip streams cannot be resumed at an offset)')
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        # A line still being appended is left for the next run
+        f.seek(max(size - TAIL_BYTES, 0))
+        tail = f.read()
+        offset = size - len(tail) + tail.rfind(b'\n') + 1 if b'\n' in tail else size
+        position.update(offset=offset, tail_digest=_tail_digest(f, offset))
+    return position
+
+
+def read_delta(position, columns=TRAINING_COLUMNS):
+    """
+    The logins appended to a dataset since position (see dataset_position),
+    with compact dtypes, and the position after them.
+
+    For a CSV only the bytes after the stored offset are read; raises
+    ValueError when the file was rewritten rather than appended to.
+    """
+    path = position['data']
+    if position['format'] in COLUMNAR_FORMATS:
+        batches = list(iter_dataset_batches(path, skip_rows=position['rows'], columns=columns))
+        df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=columns)
+        return compact_dtypes(df), dict(position, rows=position['rows'] + len(df))
+
+    with open(path, 'rb') as f:
+        header = f.readline().decode('utf-8').strip().split(',')
+        size = f.seek(0, os.SEEK_END)
+        if size < position['offset'] or _tail_digest(f, position['offset']) != position['tail_digest']:
+            raise ValueError(f"{path} changed before the last processed offset; retrain from scratch with --train")
+        f.seek(position['offset'])
+        data = f.read()
+    # Only complete lines; a line still being appended is read by the next run
+    data = data[:data.rfind(b'\n') + 1]
+    dtypes = {column: dtype for column, dtype in DATASET_DTYPES.items() if dtype == 'category'}
+    if data:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=columns, dtype=dtypes)[columns]
+    else:
+        df = pd.DataFrame(columns=columns)
+    offset = position['offset'] + len(data)
+    with open(path, 'rb') as f:
+        tail_digest = _tail_digest(f, offset)
+    return compact_dtypes(df), dict(position, rows=position['rows'] + len(df), offset=offset, tail_digest=tail_digest)
+
+
+def load_state(path):
+    """
+    Incremental training state saved by save_state, or None before the first full training
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def initial_state(position, rows, n_trees):
+    """
+    State after a full training on the rows of a dataset up to position: all of them are processed
+    """
+    return {
+        'position': dict(position, rows=int(rows)),
+        'rounds': [{'round': 0, 'rows': int(rows), 'trees': int(n_trees), 'trained_at': time.time()}]
+    }
+
+
+def age_out(model, rounds, max_trees):
+    """
+    Drop the oldest trees beyond max_trees, updating the per-round tree counts
+    """
+    excess = len(model.estimators_) - max_trees
+    if excess <= 0:
+        return 0
+    model.estimators_ = model.estimators_[excess:]
+    model.n_estimators = len(model.estimators_)
+    dropped = excess
+    for entry in rounds:
+        removed = min(entry['trees'], dropped)
+        entry['trees'] -= removed
+        dropped -= removed
+    rounds[:] = [entry for entry in rounds if entry['trees'] > 0]
+    return excess
+
+
+def train_incremental(model, scaler, pipeline, state, delta_trees=20, max_trees=300, min_delta_rows=1000, n_jobs=-1):
+    """
+    Update a trained model with the logins appended to its dataset since the last run.
+
+    Only the delta is read and featurized (see FeaturePipeline.partial_fit_transform).
+    The previous model is first scored on it (how well it does on data it has
+    not seen), then delta_trees new trees are fitted on the delta alone and
+    appended to the forest (warm start), the scaler is updated, and the oldest
+    trees beyond max_trees are dropped, so the forest follows recent data.
+    model, scaler, pipeline and state are updated in place. Returns the
+    number of delta rows used, 0 when there were too few to train on (they
+    are then left for the next run).
+    """
+    from sklearn.metrics import accuracy_score, f1_score
+
+    df, position = read_delta(state['position'])
+    if len(df) < min_delta_rows:
+        print(f"{len(df):,} new rows since the last run (fewer than {min_delta_rows:,}); nothing to do.")
+        return 0
+    y = df['is_anomaly'].to_numpy(dtype=np.int64)
+    if len(np.unique(y)) < 2:
+        print(f"The {len(df):,} new rows have a single class; waiting for more data.")
+        return 0
+
+    print(f"Processing {len(df):,} new rows...")
+    df = pipeline.partial_fit_transform(df)
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    X_frame = pd.DataFrame(X, columns=FEATURES, copy=False)
+
+    # Test-then-train: the previous model on data it has not seen
+    predictions = model.predict(X_frame)
+    print(f"Previous model on the new rows: accuracy {accuracy_score(y, predictions):.4f}, "
+          f"F1 {f1_score(y, predictions, zero_division=0):.4f}")
+
+    round_number = state['rounds'][-1]['round'] + 1 if state['rounds'] else 1
+    # A seed per round, so appended trees never repeat the seeds of aged-out ones
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + delta_trees,
+                     random_state=42 + round_number, n_jobs=n_jobs)
+    model.fit(X_frame, y)
+    # All cores are for fitting only: scoring a few rows is faster without a thread pool
+    model.set_params(warm_start=False, n_jobs=None)
+    scaler.partial_fit(X)
+
+    state['rounds'].append({'round': round_number, 'rows': len(df), 'trees': delta_trees, 'trained_at': time.time()})
+    dropped = age_out(model, state['rounds'], max_trees)
+    state['position'] = position
+    print(f"Appended {delta_trees} trees, aged out {dropped}; the forest has {len(model.estimators_)} trees "
+          f"from rounds {', '.join(str(entry['round']) for entry in state['rounds'])}")
+    return len(df)
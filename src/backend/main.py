@@ -1,18 +1,29 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import argparse
 import warnings
 import os
+import json
+import shutil
+import tempfile
+from feature_pipeline import FeaturePipeline, FEATURES
+from dataset_io import read_dataset, optimize_dtypes, TRAINING_COLUMNS
+from memory_report import MemoryReport
+from feature_cache import default_cache, training_features, evaluation_features, features_frame
+from compiled_forest import CompiledForest
+from model_artifact import save_artifact
+from model_registry import ModelRegistry, file_sha256
+from incremental_training import dataset_position, initial_state, load_state, save_state, train_incremental
+from detectors import DETECTORS, UnsupervisedDetector
 warnings.filterwarnings('ignore')
 
-def load_and_preprocess_data(filepath):
+# Cores used to build the trees (-1 = all of them); the fitted model does not depend on it
+TRAINING_N_JOBS = int(os.environ.get('TRAINING_N_JOBS', -1))
+
+def dataset_path(filepath):
     """
-    Load and preprocess the dataset
+    The dataset to train on: filepath, or the sample dataset when it does not exist
     """
     # Check if file exists, if not use sample dataset
     if not os.path.exists(filepath):
@@ -20,59 +31,95 @@ def load_and_preprocess_data(filepath):
         filepath = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'sample_dataset.csv')
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Neither {filepath} nor sample dataset found.")
-    
+    return filepath
+
+def load_and_preprocess_data(filepath, counting='exact', memory=None):
+    """
+    Load and preprocess the dataset
+
+    CSV, Parquet and Feather datasets are read with compact dtypes and only
+    the columns the feature pipeline needs (see dataset_io.read_dataset),
+    and the returned frame keeps only the feature and label columns,
+    downcast. memory is an optional MemoryReport filled stage by stage.
+    With counting='sketch' the login frequency features are estimated with
+    Count-Min Sketches instead of exact value_counts(), for datasets with
+    too many distinct users/devices to count exactly.
+    """
+    filepath = dataset_path(filepath)
+    memory = memory or MemoryReport(enabled=False)
+
     # Load the dataset
-    df = pd.read_csv(filepath)
-    
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Extract time-based features
-    df['login_hour'] = df['timestamp'].dt.hour
-    df['login_day'] = df['timestamp'].dt.day
-    df['login_month'] = df['timestamp'].dt.month
-    df['login_year'] = df['timestamp'].dt.year
-    df['login_weekday'] = df['timestamp'].dt.weekday
-    
-    # Encode categorical variables
-    le_geo = LabelEncoder()
-    le_device = LabelEncoder()
-    
-    df['geo_location_encoded'] = le_geo.fit_transform(df['geo_location'])
-    df['device_id_encoded'] = le_device.fit_transform(df['device_id'])
-    
-    # Feature engineering
-    # Calculate login frequency per user
-    user_login_counts = df['user_id'].value_counts()
-    df['user_login_frequency'] = df['user_id'].map(user_login_counts)
-    
-    # Calculate login frequency per device
-    device_login_counts = df['device_id'].value_counts()
-    df['device_login_frequency'] = df['device_id'].map(device_login_counts)
-    
-    # Calculate login frequency per location
-    location_login_counts = df['geo_location'].value_counts()
-    df['location_login_frequency'] = df['geo_location'].map(location_login_counts)
-    
-    return df, le_geo, le_device
+    with memory.stage('load'):
+        df = read_dataset(filepath, TRAINING_COLUMNS)
+    memory.frame('raw columns, as loaded', df)
+
+    # Repetitive strings (user_id) become categoricals before the features are built
+    with memory.stage('optimize raw dtypes'):
+        df = optimize_dtypes(df)
+    memory.frame('raw columns, optimized', df)
+
+    # Fit the shared feature pipeline and add the feature columns
+    with memory.stage('feature engineering'):
+        pipeline = FeaturePipeline()
+        df = pipeline.fit_transform(df, counting=counting)
+    memory.frame('raw + feature columns', df)
 
-def train_model(df):
+    # Only the features and the label are needed from here on
+    with memory.stage('drop raw columns, downcast features'):
+        df = optimize_dtypes(df, FEATURES + ['is_anomaly'])
+    memory.frame('training frame', df)
+
+    return df, pipeline
+
+def load_training_features(filepath, counting='exact', memory=None, use_cache=True):
     """
-    Train the anomaly detection model
+    Training feature matrix, labels and fitted pipeline of a dataset.
+
+    The features come from the feature cache when the dataset and the
+    feature code are unchanged since they were last built, else from
+    load_and_preprocess_data (and are then cached). Returns (X, y, pipeline)
+    with X a float32 matrix in FEATURES order; features_frame(X, y) gives
+    the DataFrame train_model expects.
     """
-    # Select features for modeling
-    features = [
-        'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-        'is_new_device', 'bytes_in', 'bytes_out', 'success',
-        'geo_location_encoded', 'device_id_encoded',
-        'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-    ]
-    
-    X = df[features]
+    filepath = dataset_path(filepath)
+
+    def build():
+        df, pipeline = load_and_preprocess_data(filepath, counting=counting, memory=memory)
+        return df[FEATURES].to_numpy(dtype=np.float32), df['is_anomaly'].to_numpy(dtype=np.int64), pipeline
+
+    return training_features(filepath, build, counting, default_cache(use_cache))
+
+def split_data(df):
+    """
+    Train/test split of the feature columns, the same for training and model export
+    """
+    # sklearn is imported only by the commands that fit or score (see scripts/benchmark_import_time.py)
+    from sklearn.model_selection import train_test_split
+
+    X = df[FEATURES]
     y = df['is_anomaly']
-    
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+def forest_params(params=None, n_jobs=None):
+    """
+    Keyword arguments of the Random Forest: the defaults, overridden by
+    params (e.g. the best of a hyperparameter search), built on n_jobs cores
+    """
+    kwargs = dict(n_estimators=100, random_state=42)
+    kwargs.update(params or {})
+    kwargs['n_jobs'] = TRAINING_N_JOBS if n_jobs is None else n_jobs
+    return kwargs
+
+def train_model(df, params=None, n_jobs=None):
+    """
+    Train the anomaly detection model
+    """
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report, accuracy_score
+
     # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, y_train, y_test = split_data(df)
     
     # Scale the features
     scaler = StandardScaler()
@@ -81,7 +128,7 @@ def train_model(df):
     
     # Train Random Forest model
     print("Training Random Forest model...")
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(**forest_params(params, n_jobs))
     model.fit(X_train, y_train)
     
     # Predict anomalies
@@ -94,41 +141,472 @@ def train_model(df):
     
     return model, scaler, X_train, X_test, y_train, y_test
 
-def save_model(model, scaler, le_geo, le_device):
+def train_unsupervised(df, detector, contamination=0.1, max_samples=20000, n_jobs=None):
+    """
+    Train an unsupervised detector (see detectors.py) on the training rows
+    of the same split as train_model, without their labels; the labels of
+    the test rows are only used to evaluate it
+    """
+    from sklearn.metrics import classification_report, accuracy_score, roc_auc_score
+    from detectors import train_detector
+
+    # Split the data
+    X_train, X_test, y_train, y_test = split_data(df)
+
+    # The scaler is fitted with the detector and applied inside it
+    print(f"Training {detector.replace('_', ' ')} detector...")
+    model, scaler = train_detector(detector, X_train.to_numpy(dtype=np.float32), contamination, max_samples,
+                                   TRAINING_N_JOBS if n_jobs is None else n_jobs)
+
+    # Predict anomalies
+    scores = model.anomaly_scores(X_test)
+    predictions = (scores > 0).astype(np.int64)
+
+    # Evaluate model
+    print("\nModel Evaluation:")
+    print("Accuracy:", accuracy_score(y_test, predictions))
+    print("ROC AUC:", roc_auc_score(y_test, scores))
+    print(classification_report(y_test, predictions))
+
+    return model, scaler, X_train, X_test, y_train, y_test
+
+def train_model_chunked(X, y, directory, chunk_size=1000000, params=None, n_jobs=None):
+    """
+    Train the anomaly detection model on a memory-mapped feature matrix
+    (see chunked_features.build_features_chunked), with the same split,
+    scaler and model as train_model
+
+    The train and test rows are gathered into their own memory-mapped
+    files, so the matrix is never held in memory as a whole.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report, accuracy_score
+    from chunked_features import gather_rows
+
+    # The same stratified split as split_data, as row indices
+    train_rows, test_rows = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    X_train = gather_rows(X, train_rows, os.path.join(directory, 'train.npy'), chunk_size)
+    X_test = gather_rows(X, test_rows, os.path.join(directory, 'test.npy'), chunk_size)
+    y_train, y_test = y[train_rows], y[test_rows]
+
+    # Scale the features
+    scaler = StandardScaler()
+    for start in range(0, len(X_train), chunk_size):
+        scaler.partial_fit(X_train[start:start + chunk_size].astype(np.float64))
+
+    # Train Random Forest model on the float32 rows in place (wrapping them in a DataFrame does not copy)
+    print("Training Random Forest model...")
+    model = RandomForestClassifier(**forest_params(params, n_jobs))
+    model.fit(pd.DataFrame(X_train, columns=FEATURES, copy=False), y_train)
+
+    # Predict anomalies
+    predictions = np.concatenate([
+        model.predict(pd.DataFrame(X_test[start:start + chunk_size], columns=FEATURES))
+        for start in range(0, len(X_test), chunk_size)
+    ])
+
+    # Evaluate model
+    print("\nModel Evaluation:")
+    print("Accuracy:", accuracy_score(y_test, predictions))
+    print(classification_report(y_test, predictions))
+
+    return model, scaler, X_train, X_test, y_train, y_test
+
+def search_hyperparameters(X, y, args):
+    """
+    Successive-halving hyperparameter search on the training rows of the
+    train/test split (see hyperparameter_search.py); returns the search
+    """
+    from sklearn.model_selection import train_test_split
+    from hyperparameter_search import HyperparameterSearch
+
+    # The test rows of split_data stay out of the search
+    train_rows, _ = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    search = HyperparameterSearch(metric=args.search_metric, budget_seconds=args.search_budget,
+                                  n_candidates=args.search_candidates, max_rows=args.search_max_rows,
+                                  n_jobs=args.n_jobs)
+    print(f"Searching hyperparameters for up to {args.search_budget:g}s...")
+    search.run(X, y, train_rows)
+    return search
+
+def write_search_report(search, model, X_test, y_test, path):
+    """
+    Save the search report with the test metrics of the final model as JSON
+    """
+    from hyperparameter_search import fold_metrics
+
+    scores = model.predict_proba(X_test)[:, list(model.classes_).index(1)]
+    report = search.report()
+    report['final_model'] = {
+        'params': {name: value for name, value in model.get_params().items()
+                   if name in ('n_estimators', 'max_depth', 'min_samples_leaf', 'max_features', 'class_weight')},
+        'test_metrics': fold_metrics(np.asarray(y_test), model.predict(X_test), scores)
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSearch report written to {path}")
+
+def remove_stale_artifact(models_dir):
     """
-    Save the trained model and encoders
+    Remove the artifact exported from the previous model: the API would
+    serve it instead of the model just saved
     """
+    path = os.path.join(models_dir, 'anomaly_detection_model.bin')
+    if os.path.exists(path):
+        os.remove(path)
+        print("Removed the artifact of the previous model; run --export to export this one.")
+
+def write_model_files(model, scaler, pipeline, directory):
+    """
+    Write the files of a model version into directory; returns their paths (file name -> path)
+    """
+    paths = {name: os.path.join(directory, name) for name in ('anomaly_detection_model.pkl', 'scaler.pkl', 'feature_pipeline.pkl')}
+    joblib.dump(model, paths['anomaly_detection_model.pkl'])
+    joblib.dump(scaler, paths['scaler.pkl'])
+    pipeline.save(paths['feature_pipeline.pkl'])
+    return paths
+
+def save_model(model, scaler, pipeline, metadata=None, promote=True):
+    """
+    Save the trained model, the fitted feature pipeline and its encoders,
+    and publish them as a new version of the model registry (promoted to
+    be served unless promote is False). An unpromoted model is published
+    from a temporary directory: the files in models/ are left to the
+    model being served. Returns the version.
+    """
+    # All cores are for training only: the API scores a few rows per call, where a thread pool costs more than it saves
+    if not isinstance(model, UnsupervisedDetector):
+        model.set_params(n_jobs=None)
+    registry = ModelRegistry()
+    if not promote:
+        with tempfile.TemporaryDirectory(prefix='model-version-') as staging_dir:
+            version = registry.publish(write_model_files(model, scaler, pipeline, staging_dir), metadata, promote=False)
+        print(f"\nPublished model version {version} (not promoted)")
+        return version
+
     # Create models directory if it doesn't exist
     models_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'models')
     os.makedirs(models_dir, exist_ok=True)
-    
-    joblib.dump(model, os.path.join(models_dir, 'anomaly_detection_model.pkl'))
-    joblib.dump(scaler, os.path.join(models_dir, 'scaler.pkl'))
-    joblib.dump(le_geo, os.path.join(models_dir, 'geo_encoder.pkl'))
-    joblib.dump(le_device, os.path.join(models_dir, 'device_encoder.pkl'))
-    print("\nModel and encoders saved successfully.")
+    paths = write_model_files(model, scaler, pipeline, models_dir)
+    # The encoders are also saved on their own for older consumers. Extended
+    # vocabularies (incremental training) have no LabelEncoder equivalent, so the previous
+    # encoders are kept: they still give every category they know its code
+    if pipeline.geo_encoder.is_sorted and pipeline.device_encoder.is_sorted:
+        joblib.dump(pipeline.geo_encoder.to_label_encoder(), os.path.join(models_dir, 'geo_encoder.pkl'))
+        joblib.dump(pipeline.device_encoder.to_label_encoder(), os.path.join(models_dir, 'device_encoder.pkl'))
+    remove_stale_artifact(models_dir)
+    print("\nModel and feature pipeline saved successfully.")
+
+    version = registry.publish(paths, metadata)
+    print(f"Published model version {version} (promoted)")
+    return version
+
+def models_path(filename):
+    return os.path.join(os.path.dirname(__file__), '..', '..', 'models', filename)
+
+def training_position(filepath):
+    """
+    Where the dataset ends before it is loaded for training, so that
+    --incremental later reads only what is appended after it
+    """
+    try:
+        return dataset_position(dataset_path(filepath))
+    except ValueError as e:
+        print(f"Note: {e}; --incremental will not be available for this model.")
+        return None
+
+def save_training_state(position, rows, model, promote=True):
+    """
+    Mark the rows a full training used as processed for --incremental
+    """
+    # Only random forests grow incrementally, and only the model saved in models/
+    if promote and position is not None and not isinstance(model, UnsupervisedDetector):
+        save_state(models_path('incremental_state.json'), initial_state(position, rows, len(model.estimators_)))
+
+def artifact_size(forest, pipeline, scaler):
+    """
+    Size in bytes of the artifact a forest would be exported as
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        return save_artifact(os.path.join(tmp_dir, 'model.bin'), forest, pipeline, scaler)
+
+def report_pruning(forest, pipeline, scaler, X_test, y_test, depths, min_samples, tree_counts):
+    """
+    Print test accuracy and artifact size for a grid of pruning settings
+    """
+    from sklearn.metrics import accuracy_score
+
+    X_test = np.asarray(X_test, dtype=np.float32)
+    y_test = np.asarray(y_test)
+    reference = forest.predict(X_test)
+    print("\nPruning report (test split):")
+    print(f"{'trees':>6}{'max depth':>11}{'min samples':>13}{'nodes':>9}{'size KB':>10}{'accuracy':>10}{'agreement':>11}")
+    for n_trees in tree_counts:
+        for max_depth in depths:
+            for samples in min_samples:
+                pruned = forest.prune(max_depth=max_depth, min_samples=samples, n_trees=n_trees)
+                predictions = pruned.predict(X_test)
+                print(f"{pruned.n_trees:>6}{max_depth or '-':>11}{samples or '-':>13}{pruned.node_count:>9,}"
+                      f"{artifact_size(pruned, pipeline, scaler) / 1024:>10.1f}"
+                      f"{accuracy_score(y_test, predictions):>10.4f}{np.mean(predictions == reference):>11.4f}")
+
+def saved_model_version():
+    """
+    The promoted registry version, if it holds the model saved in models/
+    """
+    registry = ModelRegistry()
+    version = registry.current_version()
+    if (version and registry.manifest(version)['files']['anomaly_detection_model.pkl']
+            == file_sha256(models_path('anomaly_detection_model.pkl'))):
+        return version
+    return None
+
+def training_data_path():
+    """
+    The dataset the saved model was trained on, as recorded in its registry
+    version or else in the incremental training state; None when neither has it
+    """
+    version = saved_model_version()
+    if version:
+        data = ModelRegistry().manifest(version)['metadata'].get('data')
+        if data:
+            return data
+    state = load_state(models_path('incremental_state.json'))
+    return state['position'].get('data') if state else None
+
+def export_model(model, scaler, pipeline, X_test, y_test, path, max_depth=None, min_samples=None, n_trees=None,
+                 version=None, promote=True):
+    """
+    Export the model as a compact, memory-mappable artifact (see model_artifact.py), optionally pruned.
+
+    When the model is the registry version version, the export is published
+    as a new version holding its files and the artifact, with the pruning in
+    its metadata (a published version never changes), and promoted unless
+    promote is False. An unpromoted export is only published: path is not
+    written.
+    """
+    from sklearn.metrics import accuracy_score
+
+    if not promote and version is None:
+        print("Error: an unpromoted export needs a registry version to publish it as; nothing was exported.")
+        return
+    forest = CompiledForest.from_sklearn(model)
+    pruned = forest.prune(max_depth=max_depth, min_samples=min_samples, n_trees=n_trees)
+    predictions = pruned.predict(np.asarray(X_test, dtype=np.float32))
+    metadata = {
+        'pruning': {'max_depth': max_depth, 'min_samples': min_samples, 'n_trees': n_trees},
+        'test_accuracy': float(accuracy_score(y_test, predictions))
+    }
+    staging_dir = None if promote else tempfile.mkdtemp(prefix='model-artifact-')
+    if staging_dir:
+        path = os.path.join(staging_dir, 'anomaly_detection_model.bin')
+    try:
+        size = save_artifact(path, pruned, pipeline, scaler, metadata)
+        registry = ModelRegistry()
+        pickle_path = registry.files(version)['anomaly_detection_model.pkl'] if version else models_path('anomaly_detection_model.pkl')
+        if version and os.path.basename(path) == 'anomaly_detection_model.bin':
+            files = dict(registry.files(version), **{'anomaly_detection_model.bin': path})
+            exported = registry.publish(files, dict(registry.manifest(version)['metadata'], mode='export',
+                                                    exported_from=version, **metadata), promote)
+            print(f"\nPublished the export of {version} as model version {exported}"
+                  + (" (promoted)" if promote else " (not promoted)"))
+    finally:
+        if staging_dir:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    print(f"\nModel artifact {'published' if staging_dir else f'written to {path}'}: {pruned.n_trees} trees, "
+          f"{pruned.node_count:,} nodes, {size / 1024:.1f} KB (pickle: {os.path.getsize(pickle_path) / 1024:.1f} KB), "
+          f"test accuracy {metadata['test_accuracy']:.4f}")
+
+def parse_optional_ints(value):
+    # '0' or '-' means no limit
+    return [None if item in ('0', '-') else int(item) for item in value.split(',')]
 
 def main():
     parser = argparse.ArgumentParser(description='Anomaly Detection for Cloud Login Patterns')
     parser.add_argument('--train', action='store_true', help='Train the model')
-    parser.add_argument('--data', type=str, default=os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'Dataset.csv'), help='Path to the dataset CSV file')
+    parser.add_argument('--counting', choices=['exact', 'sketch'], default='exact',
+                        help='Exact login counts, or fixed-memory Count-Min Sketch estimates for high-cardinality data')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Path to the dataset (CSV, Parquet or Feather); default: data/Dataset.csv for --train, '
+                             'the data the saved model was trained on for --export and --prune-report')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Print the memory of the training data after each preprocessing stage and the peak')
+    parser.add_argument('--chunked', action='store_true',
+                        help='Build the features out of core, chunk by chunk, into memory-mapped files')
+    parser.add_argument('--chunk-size', type=int, default=1000000, help='Rows per chunk with --chunked')
+    parser.add_argument('--chunk-dir', type=str, default=None,
+                        help='Where --chunked keeps its feature files (default: a temporary directory, removed afterwards)')
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help='Recompute the features instead of reusing the feature cache (see feature_cache.py)')
+    parser.add_argument('--detector', choices=DETECTORS, default='random_forest',
+                        help='Model to train: the supervised random forest, or an unsupervised detector that needs no labels')
+    parser.add_argument('--contamination', type=float, default=0.1,
+                        help='Expected share of anomalies for an unsupervised --detector (IsolationForest contamination, OneClassSVM nu)')
+    parser.add_argument('--detector-max-samples', type=int, default=20000,
+                        help='Training rows --detector one_class_svm is fitted on (it scales quadratically with them)')
+    parser.add_argument('--n-jobs', type=int, default=TRAINING_N_JOBS,
+                        help='Cores used to build the trees (-1 = all cores, the default)')
+    parser.add_argument('--search', action='store_true',
+                        help='Pick the Random Forest hyperparameters by a time-budgeted successive-halving search')
+    parser.add_argument('--search-budget', type=float, default=600, help='Seconds the --search may spend evaluating candidates')
+    parser.add_argument('--search-candidates', type=int, default=30, help='Candidates sampled for --search')
+    parser.add_argument('--search-metric', choices=['f1', 'average_precision', 'roc_auc', 'precision', 'recall', 'accuracy'],
+                        default='f1', help='Validation metric --search ranks candidates by')
+    parser.add_argument('--search-max-rows', type=int, default=None,
+                        help='Training rows used by the last --search round (default: all of them)')
+    parser.add_argument('--search-report', type=str, default=models_path('search_report.json'),
+                        help='Where --search writes its JSON report')
+    parser.add_argument('--no-promote', action='store_true',
+                        help='Publish the trained model to the registry without making it the served version')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Update the saved model with the rows appended to its dataset since the last run')
+    parser.add_argument('--delta-trees', type=int, default=20, help='Trees --incremental fits on the new rows')
+    parser.add_argument('--max-trees', type=int, default=300,
+                        help='Trees kept by --incremental; the oldest beyond this are dropped')
+    parser.add_argument('--min-delta-rows', type=int, default=1000,
+                        help='Fewer new rows than this are left for the next --incremental run')
+    parser.add_argument('--export', action='store_true',
+                        help='Export the (trained or saved) model as a compact memory-mappable artifact')
+    parser.add_argument('--artifact', type=str, default=models_path('anomaly_detection_model.bin'),
+                        help='Path of the exported model artifact')
+    parser.add_argument('--prune-max-depth', type=int, help='Cut every tree of the exported model at this depth')
+    parser.add_argument('--prune-min-samples', type=int,
+                        help='Drop splits that leave a child with fewer training samples than this')
+    parser.add_argument('--prune-trees', type=int, help='Keep only the first N trees of the exported model')
+    parser.add_argument('--prune-report', action='store_true',
+                        help='Print test accuracy vs artifact size for a grid of pruning settings')
+    parser.add_argument('--report-depths', type=str, default='0,16,12,8,6', help='Max depths for --prune-report (0 = no limit)')
+    parser.add_argument('--report-min-samples', type=str, default='0,5,20', help='Min samples for --prune-report (0 = no limit)')
+    parser.add_argument('--report-trees', type=str, default='100,50,25', help='Tree counts for --prune-report')
     
     args = parser.parse_args()
+    cache = default_cache(not args.no_feature_cache)
+    if args.data is None and args.train:
+        args.data = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'Dataset.csv')
+    if args.train and args.detector != 'random_forest' and (args.chunked or args.search or args.export or args.prune_report):
+        parser.error('--chunked, --search, --export and --prune-report only apply to --detector random_forest')
     
-    if args.train:
+    if args.train and args.chunked:
+        # Two passes over the dataset in chunks; only the memory-mapped feature matrix grows with its size
+        from chunked_features import build_features_chunked
+        memory = MemoryReport(enabled=args.memory_report)
+        directory = args.chunk_dir or tempfile.mkdtemp(prefix='training-features-')
+        try:
+            data = dataset_path(args.data)
+            position = training_position(data)
+            print("Building features chunk by chunk...")
+            with memory.stage('chunked feature build'):
+                # The chunked features are the in-memory ones, so both modes share cache entries
+                X, y, pipeline = training_features(
+                    data, lambda: build_features_chunked(data, directory, args.chunk_size, args.counting),
+                    args.counting, cache
+                )
+            search = search_hyperparameters(X, y, args) if args.search else None
+            with memory.stage('training'):
+                model, scaler, X_train, X_test, y_train, y_test = train_model_chunked(
+                    X, y, directory, args.chunk_size, search.best_params if search else None, args.n_jobs
+                )
+            version = save_model(model, scaler, pipeline, {'mode': 'train', 'data': os.path.abspath(data), 'rows': len(y),
+                                                           'detector': args.detector}, not args.no_promote)
+            save_training_state(position, len(y), model, not args.no_promote)
+            if search:
+                write_search_report(search, model, pd.DataFrame(X_test, columns=FEATURES, copy=False), y_test,
+                                    args.search_report)
+        finally:
+            if args.chunk_dir is None:
+                shutil.rmtree(directory, ignore_errors=True)
+        memory.print()
+    elif args.train:
         # Load and preprocess data
         print("Loading and preprocessing data...")
-        df, le_geo, le_device = load_and_preprocess_data(args.data)
+        memory = MemoryReport(enabled=args.memory_report)
+        data = dataset_path(args.data)
+        position = training_position(data)
+        X, y, pipeline = load_training_features(data, args.counting, memory, not args.no_feature_cache)
         
+        # Optionally search the hyperparameters on the training rows first
+        search = search_hyperparameters(X, y, args) if args.search else None
+
         # Train the model
-        model, scaler, X_train, X_test, y_train, y_test = train_model(df)
+        with memory.stage('training'):
+            if args.detector == 'random_forest':
+                model, scaler, X_train, X_test, y_train, y_test = train_model(
+                    features_frame(X, y), search.best_params if search else None, args.n_jobs
+                )
+            else:
+                model, scaler, X_train, X_test, y_train, y_test = train_unsupervised(
+                    features_frame(X, y), args.detector, args.contamination, args.detector_max_samples, args.n_jobs
+                )
         
         # Save the model
-        save_model(model, scaler, le_geo, le_device)
+        version = save_model(model, scaler, pipeline, {'mode': 'train', 'data': os.path.abspath(data), 'rows': len(y),
+                                                       'detector': args.detector}, not args.no_promote)
+        save_training_state(position, len(y), model, not args.no_promote)
+        if search:
+            write_search_report(search, model, X_test, y_test, args.search_report)
+        memory.print()
+    elif args.incremental:
+        # Only the rows appended since the last full or incremental training are read
+        state = load_state(models_path('incremental_state.json'))
+        if state is None:
+            print("No incremental training state found; train the model once with --train first.")
+            return
+        model = joblib.load(models_path('anomaly_detection_model.pkl'))
+        if isinstance(model, UnsupervisedDetector):
+            print(f"The saved model is a {model.name} detector; --incremental only updates random forests.")
+            return
+        scaler = joblib.load(models_path('scaler.pkl'))
+        pipeline = FeaturePipeline.load(models_path('feature_pipeline.pkl'))
+        print(f"Reading new rows of {state['position']['data']}...")
+        try:
+            rows = train_incremental(model, scaler, pipeline, state, args.delta_trees, args.max_trees,
+                                     args.min_delta_rows, args.n_jobs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        if rows:
+            save_model(model, scaler, pipeline, {'mode': 'incremental', 'data': state['position']['data'],
+                                                 'rows': rows, 'trees': len(model.estimators_)}, not args.no_promote)
+            # An unpromoted update leaves models/ as it was, so the same rows are read again next time
+            if not args.no_promote:
+                save_state(models_path('incremental_state.json'), state)
+        return
+    elif args.export or args.prune_report:
+        # Export the saved model, evaluated on the same test split it was trained with
+        model = joblib.load(models_path('anomaly_detection_model.pkl'))
+        if isinstance(model, UnsupervisedDetector):
+            print(f"The saved model is a {model.name} detector; only random forests can be exported or pruned.")
+            return
+        scaler = joblib.load(models_path('scaler.pkl'))
+        pipeline = FeaturePipeline.load(models_path('feature_pipeline.pkl'))
+        data = args.data or training_data_path()
+        if data is None:
+            parser.error('the dataset the saved model was trained on is not recorded; pass it with --data')
+        if not os.path.exists(data):
+            parser.error(f"the saved model was trained on {data}, which no longer exists; pass its data with --data")
+        print(f"Evaluating the saved model on the test split of {data}")
+        X, y = evaluation_features(data, models_path('feature_pipeline.pkl'), cache)
+        X_train, X_test, y_train, y_test = split_data(features_frame(X, y))
+        version = saved_model_version()
     else:
         print("Please specify --train option to train the model.")
         print("Example: python main.py --train")
         print("To use a specific dataset: python main.py --train --data path/to/dataset.csv")
+        print("To train an unsupervised detector: python main.py --train --detector isolation_forest")
+        print("To update the model with newly appended rows: python main.py --incremental")
+        print("To export a compact model artifact: python main.py --export [--prune-max-depth 12] [--prune-report]")
+        return
+
+    if args.prune_report:
+        report_pruning(CompiledForest.from_sklearn(model), pipeline, scaler, X_test, y_test,
+                       parse_optional_ints(args.report_depths), parse_optional_ints(args.report_min_samples),
+                       parse_optional_ints(args.report_trees))
+    if args.export:
+        export_model(model, scaler, pipeline, X_test, y_test, args.artifact,
+                     args.prune_max_depth, args.prune_min_samples, args.prune_trees, version, not args.no_promote)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MB
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+class MemoryReport:
+    """
+    Peak memory per stage of a training run, measured with tracemalloc
+    (which sees Python objects and numpy/pandas buffers), plus the size of
+    the DataFrames between stages.
+
+    Disabled reports cost nothing: stages run untraced and print() is a no-op.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.rows = []
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self.rows.append(('stage', name, peak / 1e6, current / 1e6, time.perf_counter() - started))
+
+    def frame(self, name, df):
+        """
+        Record the deep memory usage of a DataFrame
+        """
+        if self.enabled:
+            self.rows.append(('frame', name, df.memory_usage(deep=True).sum() / 1e6, None, None))
+
+    def print(self):
+        if not self.enabled:
+            return
+        print("\nMemory report (MB):")
+        for kind, name, size, current, seconds in self.rows:
+            if kind == 'stage':
+                print(f"  {name:<40} peak {size:>9.1f}  retained {current:>9.1f}  ({seconds:.1f}s)")
+            else:
+                print(f"  {name:<40} frame {size:>8.1f}")
+        rss = peak_rss_mb()
+        if rss is not None:
+            print(f"  {'process peak RSS':<40} {rss:>14.1f}")
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process right now, in MB (Linux), else the peak so far
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+class PeakRssSampler:
+    """
+    Peak resident memory of this process while a block runs, sampled by a
+    background thread (so it also sees native allocations, e.g. tree
+    building in sklearn, and the threads of n_jobs).
+
+    with PeakRssSampler() as sampler: ...; sampler.peak_mb and sampler.delta_mb
+    (peak above the RSS when the block started) are set on exit.
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.start_mb = None
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb() or 0)
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = current_rss_mb() or 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb() or 0)
+
+    @property
+    def delta_mb(self):
+        return self.peak_mb - self.start_mb
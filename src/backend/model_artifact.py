@@ -0,0 +1,177 @@
+import numpy as np
+import json
+import os
+import time
+from compiled_forest import CompiledForest
+from feature_pipeline import FEATURES, PIPELINE_VERSION
+
+# Bump whenever the file layout changes
+ARTIFACT_FORMAT_VERSION = 1
+
+_MAGIC = b'ANOMDET\x00'
+# Arrays start on cache-line boundaries so they can be used in place from the mapped file
+_ALIGNMENT = 64
+
+
+def _float32_floor(values):
+    """
+    Largest float32 <= each float64 value.
+
+    Inputs are float32, so x <= threshold and x <= floor32(threshold) agree
+    for every x: the compact thresholds route rows exactly like the originals.
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _padding(position):
+    return -position % _ALIGNMENT
+
+
+def save_artifact(path, forest, pipeline=None, scaler=None, metadata=None):
+    """
+    Write a compiled forest, the encoder vocabularies, the feature list and the
+    scaler parameters to a single memory-mappable file.
+
+    Layout: magic, little-endian uint64 header length, JSON header, then
+    each array's raw bytes, 64-byte aligned. Node indices and features are
+    int32 and thresholds float32; leaf probabilities stay float64 so scores
+    are unchanged.
+    """
+    arrays = {
+        'feature': forest.feature.astype('<i4'),
+        'threshold': _float32_floor(np.asarray(forest.threshold, dtype=np.float64)).astype('<f4'),
+        'left': forest.left.astype('<i4'),
+        'right': forest.right.astype('<i4'),
+        'missing_left': forest.missing_left.astype(bool),
+        'value': forest.value.astype('<f8'),
+        'roots': forest.roots.astype('<i4'),
+        'classes': np.asarray(forest.classes_).astype('<i8')
+    }
+    if pipeline is not None:
+        # Vocabularies as fixed-width UTF-8 bytes (a quarter of the size of numpy unicode strings)
+        arrays['geo_classes'] = np.char.encode(np.asarray(pipeline.geo_encoder.classes_).astype(str), 'utf-8')
+        arrays['device_classes'] = np.char.encode(np.asarray(pipeline.device_encoder.classes_).astype(str), 'utf-8')
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype='<f8')
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype='<f8')
+
+    header = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created_at': time.time(),
+        'n_trees': forest.n_trees,
+        'node_count': forest.node_count,
+        'max_depth': forest.max_depth,
+        'n_features': forest.n_features_in_,
+        'metadata': metadata or {},
+        'arrays': {}
+    }
+    if pipeline is not None:
+        header['features'] = FEATURES
+        header['pipeline_version'] = PIPELINE_VERSION
+
+    # Offsets are relative to the end of the header, which is padded to the alignment
+    offset = 0
+    for name, array in arrays.items():
+        offset += _padding(offset)
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    encoded = json.dumps(header).encode('utf-8')
+    encoded += b' ' * _padding(len(_MAGIC) + 8 + len(encoded))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(np.uint64(len(encoded)).astype('<u8').tobytes())
+        f.write(encoded)
+        position = 0
+        for name, array in arrays.items():
+            f.write(b'\0' * _padding(position))
+            position += _padding(position)
+            f.write(np.ascontiguousarray(array).tobytes())
+            position += array.nbytes
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class ModelArtifact:
+    """
+    A model artifact opened read-only with mmap.
+
+    The arrays are views into the mapped file, so every process that opens
+    the same artifact shares one physical copy through the page cache, and
+    opening it costs one header parse.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self._map[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        header_length = int(self._map[len(_MAGIC):len(_MAGIC) + 8].view('<u8')[0])
+        start = len(_MAGIC) + 8
+        self.header = json.loads(bytes(self._map[start:start + header_length]).decode('utf-8'))
+        if self.header['format_version'] != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifact version {self.header['format_version']} in {path}")
+
+        data_start = start + header_length
+        self.arrays = {
+            name: np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=self._map,
+                             offset=data_start + spec['offset'])
+            for name, spec in self.header['arrays'].items()
+        }
+        self.forest = CompiledForest(
+            feature=self.arrays['feature'],
+            threshold=self.arrays['threshold'],
+            left=self.arrays['left'],
+            right=self.arrays['right'],
+            missing_left=self.arrays['missing_left'],
+            value=self.arrays['value'],
+            roots=self.arrays['roots'],
+            max_depth=self.header['max_depth'],
+            classes=self.arrays['classes'],
+            n_features=self.header['n_features']
+        )
+
+    def vocabulary(self, name):
+        """
+        Encoder vocabulary ('geo' or 'device') as a str array
+        """
+        return np.char.decode(self.arrays[f'{name}_classes'], 'utf-8')
+
+    def validate(self, pipeline):
+        """
+        Raise ValueError unless the artifact was exported with this feature pipeline
+        """
+        if self.features != FEATURES:
+            raise ValueError(f"Model artifact {self.path} was exported with a different feature list")
+        for name, encoder in (('geo', pipeline.geo_encoder), ('device', pipeline.device_encoder)):
+            if not np.array_equal(self.vocabulary(name), np.asarray(encoder.classes_).astype(str)):
+                raise ValueError(f"Model artifact {self.path} has a different {name} vocabulary than the feature pipeline")
+
+    @property
+    def features(self):
+        return self.header.get('features')
+
+    @property
+    def metadata(self):
+        return self.header['metadata']
+
+    @property
+    def nbytes(self):
+        return len(self._map)
+
+    def scale(self, X):
+        """
+        Standardize features with the saved StandardScaler parameters
+        """
+        return (np.asarray(X, dtype=np.float64) - self.arrays['scaler_mean']) / self.arrays['scaler_scale']
+
+
+def load_artifact(path):
+    """
+    Open a model artifact written by save_artifact()
+    """
+    return ModelArtifact(path)
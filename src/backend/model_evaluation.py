@@ -1,54 +1,19 @@
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
+from feature_pipeline import FEATURES
+from feature_cache import default_cache, evaluation_features, features_frame
 import warnings
 warnings.filterwarnings('ignore')
 
 def evaluate_model():
-    # Load the dataset
-    df = pd.read_csv('../Dataset.csv')
-    
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Extract time-based features
-    df['login_hour'] = df['timestamp'].dt.hour
-    df['login_day'] = df['timestamp'].dt.day
-    df['login_month'] = df['timestamp'].dt.month
-    df['login_year'] = df['timestamp'].dt.year
-    df['login_weekday'] = df['timestamp'].dt.weekday
-    
-    # Load encoders
-    le_geo = joblib.load('geo_encoder.pkl')
-    le_device = joblib.load('device_encoder.pkl')
-    
-    # Encode categorical variables
-    df['geo_location_encoded'] = le_geo.transform(df['geo_location'])
-    df['device_id_encoded'] = le_device.transform(df['device_id'])
-    
-    # Feature engineering
-    # Calculate login frequency per user
-    user_login_counts = df['user_id'].value_counts()
-    df['user_login_frequency'] = df['user_id'].map(user_login_counts)
-    
-    # Calculate login frequency per device
-    device_login_counts = df['device_id'].value_counts()
-    df['device_login_frequency'] = df['device_id'].map(device_login_counts)
-    
-    # Calculate login frequency per location
-    location_login_counts = df['geo_location'].value_counts()
-    df['location_login_frequency'] = df['geo_location'].map(location_login_counts)
-    
-    # Select features for modeling
-    features = [
-        'login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday',
-        'is_new_device', 'bytes_in', 'bytes_out', 'success',
-        'geo_location_encoded', 'device_id_encoded',
-        'user_login_frequency', 'device_login_frequency', 'location_login_frequency'
-    ]
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    # Apply the fitted feature pipeline to the dataset, counting login frequencies
+    # over the evaluation data the same way training does (cached between runs)
+    X_all, y_all = evaluation_features('../Dataset.csv', 'feature_pipeline.pkl', default_cache())
+    df = features_frame(X_all, y_all)
+    features = FEATURES
     
     X = df[features]
     y = df['is_anomaly']
@@ -67,7 +32,9 @@ def evaluate_model():
     # Create confusion matrix
     cm = confusion_matrix(y, y_pred)
     
-    # Plot confusion matrix
+    # Plot confusion matrix (plotting libraries load only when a report is drawn)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     plt.figure(figsize=(8, 6))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
                 xticklabels=['Normal', 'Anomaly'], 
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Versioned models: one directory per version plus a CURRENT file naming the one to serve
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', os.path.join(current_dir, '..', '..', 'models', 'registry'))
+
+# Files a version holds; the artifact is optional (see main.py --export)
+MODEL_FILES = ['anomaly_detection_model.pkl', 'scaler.pkl', 'feature_pipeline.pkl']
+OPTIONAL_FILES = ['anomaly_detection_model.bin']
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Directory of immutable, numbered model versions (v0001, v0002, ...).
+
+    publish() copies a trained model's files into a new version directory
+    with a manifest.json (file digests and metadata) and renames it into
+    place, so a version is never seen half written. promote() points the
+    CURRENT file at a version, atomically; serving processes watch that
+    file and hot-reload the version it names (see src/api/model_reloader.py),
+    and promoting an older version rolls back.
+    """
+
+    def __init__(self, directory=MODEL_REGISTRY_DIR):
+        self.directory = directory
+
+    def version_path(self, version):
+        return os.path.join(self.directory, version)
+
+    def versions(self):
+        """
+        Published versions, oldest first
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith('v') and os.path.exists(os.path.join(self.directory, name, 'manifest.json')))
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_path(version), 'manifest.json')) as f:
+            return json.load(f)
+
+    def current_path(self):
+        return os.path.join(self.directory, 'CURRENT')
+
+    def current_version(self):
+        """
+        The promoted version, or None when nothing was promoted yet
+        """
+        try:
+            with open(self.current_path()) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version or None
+
+    def publish(self, paths, metadata=None, promote=True):
+        """
+        Add a new version holding the files in paths (file name -> source
+        path); returns the version name
+        """
+        missing = [name for name in MODEL_FILES if name not in paths]
+        if missing:
+            raise ValueError(f"A model version needs {', '.join(missing)}")
+        os.makedirs(self.directory, exist_ok=True)
+        staging = os.path.join(self.directory, f".staging.{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        files = {}
+        for name, source in paths.items():
+            shutil.copyfile(source, os.path.join(staging, name))
+            files[name] = file_sha256(os.path.join(staging, name))
+
+        while True:
+            versions = self.versions()
+            version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+            manifest = {'version': version, 'created_at': time.time(), 'files': files, 'metadata': metadata or {}}
+            with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            try:
+                os.rename(staging, self.version_path(version))
+                break
+            except OSError:
+                # Another process published this number first; take the next one
+                if not os.path.exists(self.version_path(version)):
+                    raise
+        if promote:
+            self.promote(version)
+        return version
+
+    def promote(self, version):
+        """
+        Make version the one to serve
+        """
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        tmp_path = f"{self.current_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, self.current_path())
+
+    def files(self, version):
+        """
+        Paths of the files of a version (file name -> path)
+        """
+        directory = self.version_path(version)
+        return {name: os.path.join(directory, name) for name in MODEL_FILES + OPTIONAL_FILES
+                if os.path.exists(os.path.join(directory, name))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List, promote (or roll back to) model versions')
+    parser.add_argument('command', choices=['list', 'promote'])
+    parser.add_argument('version', nargs='?', help='Version to promote, e.g. v0003')
+    parser.add_argument('--registry', type=str, default=MODEL_REGISTRY_DIR, help='Registry directory')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'promote':
+        if not args.version:
+            parser.error('promote needs a version')
+        registry.promote(args.version)
+        print(f"Promoted {args.version}; serving processes reload it within MODEL_RELOAD_INTERVAL seconds")
+        return
+    current = registry.current_version()
+    for version in registry.versions():
+        manifest = registry.manifest(version)
+        created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manifest['created_at']))
+        print(f"{'*' if version == current else ' '} {version}  {created}  {json.dumps(manifest['metadata'])}")
+
+
+if __name__ == '__main__':
+    main()
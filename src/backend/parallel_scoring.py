@@ -0,0 +1,111 @@
+import os
+import time
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# The model and feature pipeline of a pool worker, loaded once by the initializer
+_worker_state = {}
+
+
+def _exit_with_parent(parent_pid):
+    # A worker whose parent was killed would otherwise wait for tasks forever
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(1)
+
+
+def _load_worker(model_path, pipeline_path, parent_pid):
+    import joblib
+    from feature_pipeline import FeaturePipeline
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+    _worker_state['model'] = joblib.load(model_path)
+    _worker_state['pipeline'] = FeaturePipeline.load(pipeline_path)
+
+
+def set_worker_model(model, pipeline):
+    """
+    Use an already loaded model in this process (to run tasks without a pool)
+    """
+    _worker_state['model'] = model
+    _worker_state['pipeline'] = pipeline
+
+
+def worker_model():
+    """
+    (model, pipeline) of the current pool worker
+    """
+    return _worker_state['model'], _worker_state['pipeline']
+
+
+def default_workers():
+    """
+    CPUs this process may run on
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def scoring_pool(model_path, pipeline_path, workers=None):
+    """
+    A process pool whose workers each load the model and feature pipeline once.
+
+    Tasks run in the workers get them from worker_model(); only the task
+    inputs and results cross process boundaries.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers or default_workers(),
+        initializer=_load_worker,
+        initargs=(os.path.abspath(model_path), os.path.abspath(pipeline_path), os.getpid())
+    )
+
+
+def ordered_map(executor, function, tasks, workers, max_pending=None):
+    """
+    Run function over tasks in the pool of workers processes and yield
+    (task, result) pairs in task order.
+
+    At most max_pending tasks (default: twice the worker count) are in
+    flight, so a long task iterator is consumed lazily and memory stays
+    bounded; the next task is submitted as soon as the oldest one is done.
+    """
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    for task in tasks:
+        pending.append((task, executor.submit(function, task)))
+        if len(pending) >= max_pending:
+            task, future = pending.popleft()
+            yield task, future.result()
+    while pending:
+        task, future = pending.popleft()
+        yield task, future.result()
+
+
+def validate_records_task(records):
+    """
+    Errors of a shard of login record dicts, keyed by position in the shard (see FeaturePipeline.validate_records)
+    """
+    _, pipeline = worker_model()
+    return pipeline.validate_records(records)
+
+
+def score_records_task(task):
+    """
+    Score a shard of login record dicts in a pool worker.
+
+    task is (records, frequencies), with the login frequency columns counted
+    beforehand by the parent, so shards can be scored in any order. Returns
+    (predictions, probabilities, errors) with errors keyed by position in the shard.
+    """
+    records, frequencies = task
+    model, pipeline = worker_model()
+    features, positions, errors = pipeline.transform_records(records, update_counts=False, frequencies=frequencies)
+    if not len(positions):
+        return [], [], errors
+    # Labels from the probabilities, as the model's predict() derives them, without scoring twice
+    probabilities = model.predict_proba(features)
+    predictions = model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+    return predictions, probabilities, errors
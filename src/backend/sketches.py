@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import math
+
+# Fixed hash key so sketches built in different processes are mergeable
+_HASH_KEY = 'anomaly-detect-1'
+
+
+def hash_keys(keys, hash_key=_HASH_KEY):
+    """
+    Hash a sequence of keys to uint64, vectorized and stable across processes
+    """
+    values = np.asarray(keys, dtype=object)
+    return pd.util.hash_array(values, hash_key=hash_key, categorize=False)
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch for approximate per-key counts in fixed memory.
+
+    Estimates never undercount; with probability 1 - delta they overcount by
+    at most epsilon * (total number of additions). Two sketches with the
+    same width and depth can be merged by adding their tables.
+    """
+
+    def __init__(self, width=2 ** 16, depth=4):
+        self.width = int(width)
+        self.depth = int(depth)
+        self.table = np.zeros((self.depth, self.width), dtype=np.uint32)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon=1e-4, delta=1e-3):
+        """
+        Size a sketch for an additive error of epsilon * total with probability 1 - delta
+        """
+        return cls(width=math.ceil(math.e / epsilon), depth=math.ceil(math.log(1 / delta)))
+
+    def _indexes(self, keys):
+        # Double hashing on the two 32-bit halves of one 64-bit hash: row i uses h1 + i * h2
+        hashes = hash_keys(keys)
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, keys, counts=1):
+        """
+        Add occurrences of keys (counts may be a scalar or one count per key)
+        """
+        if len(keys) == 0:
+            return
+        indexes = self._indexes(keys)
+        if np.isscalar(counts):
+            weights = None
+            self.total += int(counts) * len(keys)
+        else:
+            weights = np.asarray(counts, dtype=np.float64)
+            self.total += int(weights.sum())
+        for row in range(self.depth):
+            added = np.bincount(indexes[row], weights=weights, minlength=self.width)
+            if weights is None and counts != 1:
+                added *= counts
+            self.table[row] += added.astype(np.uint32)
+
+    def query(self, keys):
+        """
+        Estimated counts for keys
+        """
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        indexes = self._indexes(keys)
+        return self.table[np.arange(self.depth)[:, None], indexes].min(axis=0).astype(np.int64)
+
+    def merge(self, other):
+        """
+        Add the counts of another sketch of the same shape
+        """
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError('Cannot merge Count-Min sketches of different shapes')
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def error_bound(self):
+        """
+        Additive error bound (epsilon * total) holding with probability 1 - exp(-depth)
+        """
+        return math.e / self.width * self.total
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2 ** precision one-byte registers.
+
+    The relative standard error is about 1.04 / sqrt(2 ** precision).
+    Sketches with the same precision merge by taking register maxima.
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 18:
+            raise ValueError('precision must be between 4 and 18')
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    @classmethod
+    def from_error(cls, relative_error=0.01):
+        """
+        Size a sketch for a relative standard error
+        """
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        return cls(precision=min(max(precision, 4), 18))
+
+    def add(self, keys):
+        """
+        Add keys to the set
+        """
+        if len(keys) == 0:
+            return
+        hashes = hash_keys(keys)
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << bits) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining bits; frexp gives the bit length
+        rank = (bits - np.frexp(remainder.astype(np.float64))[1] + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        """
+        Estimated number of distinct keys added
+        """
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """
+        Union with another sketch of the same precision
+        """
+        if self.precision != other.precision:
+            raise ValueError('Cannot merge HyperLogLog sketches of different precision')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    @property
+    def nbytes(self):
+        return self.registers.nbytes
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# Time feature columns, in the order decode() returns them
+TIME_FEATURES = ['login_hour', 'login_day', 'login_month', 'login_year', 'login_weekday']
+
+# Layouts decoded by the vectorized fast path: '%Y-%m-%d %H:%M:%S' (data/Dataset.csv),
+# the same with a 'T' separator (ISO-8601), and both without seconds (the frontend's datetime-local input)
+_FIXED_LENGTHS = (19, 16)
+_DIGIT_MASKS = {length: np.array([position not in (4, 7, 10, 13, 16) for position in range(length)])
+                for length in _FIXED_LENGTHS}
+_SEPARATORS = {19: {4: b'-', 7: b'-', 13: b':', 16: b':'}, 16: {4: b'-', 7: b'-', 13: b':'}}
+_DAYS_IN_MONTH = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def days_from_civil(year, month, day):
+    """
+    Days since 1970-01-01 for proleptic Gregorian dates (vectorized)
+    """
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def civil_from_days(days):
+    """
+    (year, month, day) for days since 1970-01-01 (vectorized)
+    """
+    days = days + 719468
+    era = np.floor_divide(days, 146097)
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = mp + np.where(mp < 10, 3, -9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def weekday_from_days(days):
+    """
+    Monday=0 weekday for days since 1970-01-01 (a Thursday)
+    """
+    return (days + 3) % 7
+
+
+class TimestampDecoder:
+    """
+    Decodes login timestamps straight into the integer time features.
+
+    Strings in the fixed '%Y-%m-%d %H:%M:%S' layout (optionally with a 'T'
+    separator and/or without seconds) are parsed from their bytes in one
+    vectorized pass; anything else is decoded once per distinct value with
+    datetime.fromisoformat, falling back to pandas' parser, and cached.
+    Numbers are epoch seconds (UTC). Values with a UTC offset keep their
+    wall-clock fields, as written.
+    """
+
+    def __init__(self, cache_size=65536):
+        self.cache_size = cache_size
+        self._decode_string = lru_cache(maxsize=cache_size)(self._parse_string)
+
+    @staticmethod
+    def _fields(timestamp):
+        return timestamp.hour, timestamp.day, timestamp.month, timestamp.year, timestamp.weekday()
+
+    @classmethod
+    def _parse_string(cls, value):
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except ValueError:
+            try:
+                timestamp = pd.Timestamp(value)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"Invalid timestamp: {value!r}")
+            if pd.isna(timestamp):
+                raise ValueError(f"Invalid timestamp: {value!r}")
+        return cls._fields(timestamp)
+
+    def decode(self, value):
+        """
+        (hour, day, month, year, weekday) of a single timestamp; raises ValueError if it cannot be parsed
+        """
+        if isinstance(value, str):
+            return self._decode_string(value.strip())
+        if isinstance(value, datetime):
+            return self._fields(value)
+        if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+            try:
+                return self._fields(datetime.fromtimestamp(value, tz=timezone.utc))
+            except (ValueError, OverflowError, OSError):
+                raise ValueError(f"Invalid epoch timestamp: {value!r}")
+        raise ValueError(f"Invalid timestamp: {value!r}")
+
+    def decode_array(self, values):
+        """
+        Time feature columns for a batch of timestamps, as a dict of int32 arrays keyed by TIME_FEATURES
+        """
+        values = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+        if values.dtype.kind in 'iuf':
+            return self._decode_epoch(values)
+        if values.dtype.kind == 'M':
+            return self._decode_datetime64(values)
+
+        n = len(values)
+        columns = {column: np.empty(n, dtype=np.int32) for column in TIME_FEATURES}
+        pending = np.ones(n, dtype=bool)
+
+        # Fixed-layout strings are joined and parsed from their ASCII bytes, one layout at a time
+        items = values.tolist()
+        try:
+            lengths = np.fromiter(map(len, items), dtype=np.int64, count=n)
+        except TypeError:
+            lengths = np.fromiter((len(item) if isinstance(item, str) else -1 for item in items), dtype=np.int64, count=n)
+        for length in _FIXED_LENGTHS:
+            rows = lengths == length
+            everything = rows.all()
+            if not everything and not rows.any():
+                continue
+            try:
+                raw = ''.join(items if everything else values[rows].tolist()).encode('ascii')
+            except (TypeError, UnicodeEncodeError):
+                continue
+            valid, parsed = self._decode_fixed(np.frombuffer(raw, dtype=np.uint8).reshape(-1, length), length)
+            rows = slice(None) if everything else np.flatnonzero(rows)
+            for column, array in parsed.items():
+                columns[column][rows] = array
+            if everything:
+                pending = ~valid
+                break
+            pending[rows[valid]] = False
+
+        # Everything else is decoded once per distinct value
+        rows = np.flatnonzero(pending)
+        if len(rows):
+            codes, uniques = pd.factorize(values[rows], use_na_sentinel=False)
+            decoded = np.array([self.decode(value) for value in uniques], dtype=np.int32).reshape(-1, len(TIME_FEATURES))
+            for index, column in enumerate(TIME_FEATURES):
+                columns[column][rows] = decoded[codes, index]
+        return columns
+
+    @staticmethod
+    def _decode_fixed(chars, length):
+        """
+        Parse a matrix of fixed-layout ASCII bytes; returns the valid row mask and the columns of all rows
+        (rows that are not valid hold garbage and are decoded again by the caller)
+        """
+        # One contiguous row per character position; bytes below '0' wrap around, so only digits are < 10
+        chars = np.ascontiguousarray(chars.T)
+        digits = chars - np.uint8(ord('0'))
+        valid = ((digits < 10) == _DIGIT_MASKS[length][:, None]).all(axis=0)
+        digits = digits.astype(np.int32)
+        valid &= (chars[10] == ord(' ')) | (chars[10] == ord('T'))
+        for position, separator in _SEPARATORS[length].items():
+            valid &= chars[position] == ord(separator)
+
+        year = digits[0] * 1000 + digits[1] * 100 + digits[2] * 10 + digits[3]
+        month = digits[5] * 10 + digits[6]
+        day = digits[8] * 10 + digits[9]
+        hour = digits[11] * 10 + digits[12]
+        minute = digits[14] * 10 + digits[15]
+        second = digits[17] * 10 + digits[18] if length == 19 else 0
+
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_days = _DAYS_IN_MONTH[np.clip(month, 0, 12)] - ((month == 2) & ~leap)
+        valid &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+        valid &= (hour < 24) & (minute < 60) & (second < 60)
+
+        weekday = weekday_from_days(days_from_civil(year, month, day))
+        return valid, dict(zip(TIME_FEATURES, (hour, day, month, year, weekday)))
+
+    @staticmethod
+    def _decode_epoch(seconds):
+        if seconds.dtype.kind == 'f' and not np.isfinite(seconds).all():
+            raise ValueError('Invalid epoch timestamp: NaN or infinite value')
+        seconds = np.floor(seconds).astype(np.int64)
+        days = np.floor_divide(seconds, 86400)
+        hour = np.remainder(seconds, 86400) // 3600
+        year, month, day = civil_from_days(days)
+        return {column: np.asarray(array, dtype=np.int32) for column, array in
+                zip(TIME_FEATURES, (hour, day, month, year, weekday_from_days(days)))}
+
+    @classmethod
+    def _decode_datetime64(cls, values):
+        if np.isnat(values).any():
+            raise ValueError('Invalid timestamp: NaT')
+        return cls._decode_epoch(values.astype('datetime64[s]').astype(np.int64))
@@ -25,14 +25,14 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Fetch and display recent predictions
     function fetchRecentPredictions() {
-        fetch('/predictions/history')
+        // Only the last 10 predictions are shown, newest first
+        fetch('/predictions/history?limit=10&fields=timestamp,input_data,prediction')
             .then(response => response.json())
             .then(data => {
                 const predictionsBody = document.getElementById('predictions-body');
                 predictionsBody.innerHTML = '';
                 
-                // Show last 10 predictions
-                const recentPredictions = data.slice(-10).reverse();
+                const recentPredictions = data.items;
                 
                 recentPredictions.forEach(prediction => {
                     const row = document.createElement('div');
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+
+
+@pytest.fixture(scope='session')
+def api(tmp_path_factory):
+    """
+    The Flask API module, imported once with its history, stats, feature store
+    snapshot and model registry in a temporary directory instead of data/ and models/
+    """
+    tmp_dir = tmp_path_factory.mktemp('api')
+    os.environ['PREDICTIONS_HISTORY_DB'] = str(tmp_dir / 'history.db')
+    os.environ['PREDICTION_STATS_SNAPSHOT'] = str(tmp_dir / 'stats.json')
+    os.environ['FEATURE_STORE_SNAPSHOT'] = str(tmp_dir / 'feature_store.pkl')
+    os.environ['MODEL_REGISTRY_DIR'] = str(tmp_dir / 'registry')
+    os.environ['MAX_BATCH_SIZE'] = '100'
+    os.environ['HISTORY_FLUSH_INTERVAL'] = '0.05'
+    sys.path.insert(0, os.path.join(ROOT, 'src', 'api'))
+    sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+    import api
+    return api
+
+
+@pytest.fixture(scope='session')
+def records():
+    """
+    Login records of the sample dataset, without the label
+    """
+    return pd.read_csv(SAMPLE, nrows=200).drop(columns=['is_anomaly']).to_dict('records')
+
+
+@pytest.fixture(scope='session')
+def flush_history(api):
+    """
+    flush(): block until the background history writer has stored every queued prediction
+    """
+    def flush(timeout=10):
+        deadline = time.time() + timeout
+        while True:
+            metrics = api.history_writer.metrics()
+            if metrics['flushed'] + metrics['dropped'] >= metrics['enqueued']:
+                return
+            if time.time() > deadline:
+                raise TimeoutError('The history writer did not flush in time')
+            time.sleep(0.02)
+    return flush
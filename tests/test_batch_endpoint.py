@@ -0,0 +1,70 @@
+import json
+
+
+def test_batch_scores_every_record(api, records):
+    client = api.app.test_client()
+    batch = client.post('/predict/batch', json=records[:20]).get_json()
+    assert batch['count'] == 20
+    assert batch['error_count'] == 0
+    for result in batch['results']:
+        assert set(result) == {'anomaly', 'probability_normal', 'probability_anomaly', 'model_version'}
+        assert abs(result['probability_normal'] + result['probability_anomaly'] - 1) < 1e-9
+
+
+def test_malformed_records_get_error_slots(api, records):
+    client = api.app.test_client()
+    batch = [dict(records[0]), {'user_id': 'u1'}, dict(records[1], timestamp='garbage'),
+             dict(records[2], bytes_in='many'), 'not a record', dict(records[3])]
+    response = client.post('/predict/batch', json=batch)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 6
+    assert data['error_count'] == 4
+    results = data['results']
+    assert 'anomaly' in results[0] and 'anomaly' in results[5]
+    assert results[1]['error'].startswith('Missing required fields')
+    assert results[2]['error'] == "Invalid timestamp: 'garbage'"
+    assert results[3]['error'] == "Invalid numeric value for bytes_in: 'many'"
+    assert results[4]['error'] == 'Record must be a JSON object'
+
+
+def test_ndjson_body_keeps_line_positions(api, records):
+    client = api.app.test_client()
+    lines = [json.dumps(records[0]), '{not json', '', json.dumps(records[1])]
+    response = client.post('/predict/batch', data='\n'.join(lines) + '\n', content_type='application/x-ndjson')
+    assert response.status_code == 200
+    data = response.get_json()
+    # Blank lines are skipped; invalid JSON lines keep their slot
+    assert data['count'] == 3
+    assert data['error_count'] == 1
+    assert 'anomaly' in data['results'][0]
+    assert data['results'][1]['error'].startswith('Invalid JSON')
+    assert 'anomaly' in data['results'][2]
+
+
+def test_records_object_and_bad_bodies(api, records):
+    client = api.app.test_client()
+    assert client.post('/predict/batch', json={'records': records[:3]}).get_json()['count'] == 3
+    assert client.post('/predict/batch', json={'user_id': 'u1'}).status_code == 400
+    assert client.post('/predict/batch', data='[', content_type='application/json').status_code == 400
+
+
+def test_oversized_batch_is_rejected(api, records):
+    client = api.app.test_client()
+    response = client.post('/predict/batch', json=[records[0]] * (api.MAX_BATCH_SIZE + 1))
+    assert response.status_code == 413
+    assert 'Batch too large' in response.get_json()['error']
+
+
+def test_batch_is_recorded_in_history(api, records, flush_history):
+    client = api.app.test_client()
+    batch = [dict(records[0], user_id='history-a'), {'user_id': 'history-b'}, dict(records[1], user_id='history-c')]
+    client.post('/predict/batch', json=batch)
+    flush_history()
+    # Only the scored records are stored
+    stored = {user_id: api.history_store.query(filters={'user_id': user_id})[0]
+              for user_id in ('history-a', 'history-b', 'history-c')}
+    assert len(stored['history-a']) == 1
+    assert stored['history-a'][0]['input_data'] == batch[0]
+    assert stored['history-b'] == []
+    assert len(stored['history-c']) == 1
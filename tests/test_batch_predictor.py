@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+import batch_predictor
+from batch_predictor import BatchAnomalyDetector
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+MODELS = os.path.join(ROOT, 'models')
+CHUNK_SIZE = 2000
+
+
+def detector():
+    return BatchAnomalyDetector(os.path.join(MODELS, 'anomaly_detection_model.pkl'),
+                                os.path.join(MODELS, 'feature_pipeline.pkl'))
+
+
+def read_parts(directory):
+    names = sorted(os.listdir(directory))
+    return names, pd.concat([pd.read_parquet(os.path.join(directory, name)) for name in names], ignore_index=True)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parquet_resume_keeps_every_part(tmp_path, monkeypatch, workers):
+    pytest.importorskip('pyarrow')
+    rows = sum(1 for _ in open(SAMPLE)) - 1
+    expected_parts = [f'part-{number:05d}.parquet' for number in range(-(-rows // CHUNK_SIZE))]
+
+    reference_dir = str(tmp_path / 'reference')
+    detector().score_stream(SAMPLE, reference_dir, output_format='parquet', chunk_size=CHUNK_SIZE,
+                            progress=False, workers=workers)
+    reference_names, reference = read_parts(reference_dir)
+    assert reference_names == expected_parts
+    assert len(reference) == rows
+
+    # Interrupt the run right after the third chunk was written, before its checkpoint
+    output_dir = str(tmp_path / 'output')
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    write_encoded = batch_predictor.ChunkWriter.write_encoded
+    calls = []
+
+    def interrupted_write(self, data, columns):
+        write_encoded(self, data, columns)
+        calls.append(1)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(batch_predictor.ChunkWriter, 'write_encoded', interrupted_write)
+    with pytest.raises(KeyboardInterrupt):
+        detector().score_stream(SAMPLE, output_dir, output_format='parquet', chunk_size=CHUNK_SIZE,
+                                checkpoint_path=checkpoint, progress=False, workers=workers)
+    monkeypatch.setattr(batch_predictor.ChunkWriter, 'write_encoded', write_encoded)
+
+    summary = detector().score_stream(SAMPLE, output_dir, output_format='parquet', chunk_size=CHUNK_SIZE,
+                                      checkpoint_path=checkpoint, progress=False, workers=workers)
+    names, resumed = read_parts(output_dir)
+    assert names == expected_parts
+    assert summary['rows'] == rows
+    assert len(resumed) == rows
+    pd.testing.assert_frame_equal(resumed, reference)
+
+
+def test_csv_resume_matches_uninterrupted_run(tmp_path, monkeypatch):
+    reference_path = str(tmp_path / 'reference.csv')
+    detector().score_stream(SAMPLE, reference_path, chunk_size=CHUNK_SIZE, progress=False)
+
+    output_path = str(tmp_path / 'output.csv')
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    write_encoded = batch_predictor.ChunkWriter.write_encoded
+    calls = []
+
+    def interrupted_write(self, data, columns):
+        write_encoded(self, data, columns)
+        calls.append(1)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(batch_predictor.ChunkWriter, 'write_encoded', interrupted_write)
+    with pytest.raises(KeyboardInterrupt):
+        detector().score_stream(SAMPLE, output_path, chunk_size=CHUNK_SIZE, checkpoint_path=checkpoint, progress=False)
+    monkeypatch.setattr(batch_predictor.ChunkWriter, 'write_encoded', write_encoded)
+
+    detector().score_stream(SAMPLE, output_path, chunk_size=CHUNK_SIZE, checkpoint_path=checkpoint, progress=False)
+    with open(reference_path, 'rb') as reference, open(output_path, 'rb') as output:
+        assert output.read() == reference.read()
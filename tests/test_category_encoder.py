@@ -0,0 +1,68 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+from category_encoder import CategoryEncoder
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+
+
+@pytest.fixture(scope='module')
+def locations():
+    return pd.read_csv(SAMPLE, usecols=['geo_location'])['geo_location']
+
+
+@pytest.mark.parametrize('method', ['categorical', 'searchsorted'])
+def test_codes_match_label_encoder(locations, method):
+    label_encoder = LabelEncoder().fit(locations)
+    encoder = CategoryEncoder.fit(locations)
+    assert encoder.classes_.tolist() == label_encoder.classes_.tolist()
+    expected = label_encoder.transform(locations)
+    codes = encoder.transform(locations, method=method)
+    assert codes.dtype == np.int32
+    assert codes.tolist() == expected.tolist()
+    assert [encoder.encode(value) for value in locations.iloc[:100]] == expected[:100].tolist()
+
+
+@pytest.mark.parametrize('method', ['categorical', 'searchsorted'])
+def test_unknown_values(locations, method):
+    encoder = CategoryEncoder.fit(locations)
+    values = ['France', 'Atlantis', 'Japan']
+    codes = encoder.transform(values, method=method)
+    assert codes.tolist() == [encoder.encode('France'), -1, encoder.encode('Japan')]
+    assert encoder.encode('Atlantis') == -1
+    assert CategoryEncoder.fit(locations, unknown_value=99).transform(values, method=method)[1] == 99
+
+    strict = CategoryEncoder.fit(locations, unknown='error')
+    with pytest.raises(ValueError):
+        strict.transform(values, method=method)
+    with pytest.raises(ValueError):
+        strict.encode('Atlantis')
+    with pytest.raises(ValueError):
+        CategoryEncoder(['a'], unknown='ignore')
+
+
+def test_extended_vocabulary_keeps_existing_codes(locations):
+    encoder = CategoryEncoder.fit(locations)
+    extended = encoder.extended(['Atlantis', 'France', 'Agartha', 'Atlantis'])
+    assert len(extended) == len(encoder) + 2
+    assert extended.transform(locations).tolist() == encoder.transform(locations).tolist()
+    assert extended.transform(['Agartha', 'Atlantis'], method='searchsorted').tolist() == [len(encoder), len(encoder) + 1]
+    assert encoder.extended(['France']) is encoder
+    assert encoder.is_sorted and not extended.is_sorted
+    with pytest.raises(ValueError):
+        extended.to_label_encoder()
+
+
+def test_label_encoder_round_trip(locations):
+    label_encoder = LabelEncoder().fit(locations)
+    encoder = CategoryEncoder.from_label_encoder(label_encoder)
+    assert encoder.transform(locations).tolist() == label_encoder.transform(locations).tolist()
+    restored = encoder.to_label_encoder()
+    assert restored.transform(['France', 'Japan']).tolist() == label_encoder.transform(['France', 'Japan']).tolist()
@@ -0,0 +1,99 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+from compiled_forest import CompiledForest, compile_model
+from feature_pipeline import FEATURES, FeaturePipeline
+from model_artifact import load_artifact, save_artifact
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+
+
+@pytest.fixture(scope='module')
+def trained():
+    """
+    A forest fitted on the first 8000 rows of the sample dataset, and the remaining rows to score
+    """
+    df = pd.read_csv(SAMPLE)
+    pipeline = FeaturePipeline()
+    pipeline.fit_transform(df)
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df['is_anomaly'].to_numpy()
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(X[:8000], y[:8000])
+    scaler = StandardScaler().fit(X[:8000])
+    return model, pipeline, scaler, X[8000:]
+
+
+def test_matches_sklearn_bit_for_bit(trained):
+    model, _, _, X = trained
+    forest = CompiledForest.from_sklearn(model)
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(forest.predict(X), model.predict(X))
+    # Single rows take the same path as batches
+    for row in X[:20]:
+        assert np.array_equal(forest.predict_proba(row[np.newaxis]), model.predict_proba(row[np.newaxis]))
+
+
+def test_missing_values_follow_sklearn(trained):
+    _, _, _, X = trained
+    X_missing = X[:2000].copy()
+    X_missing[::7, FEATURES.index('bytes_in')] = np.nan
+    y = np.arange(len(X_missing)) % 2
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X_missing, y)
+    forest = CompiledForest.from_sklearn(model)
+    assert np.array_equal(forest.predict_proba(X_missing), model.predict_proba(X_missing))
+
+
+def test_unpruned_copy_is_identical(trained):
+    model, _, _, X = trained
+    forest = CompiledForest.from_sklearn(model)
+    pruned = forest.prune()
+    assert pruned.node_count == forest.node_count
+    assert np.array_equal(pruned.predict_proba(X), forest.predict_proba(X))
+    smaller = forest.prune(max_depth=4, n_trees=5)
+    assert smaller.n_trees == 5
+    assert smaller.max_depth <= 4
+    assert np.allclose(smaller.predict_proba(X).sum(axis=1), 1.0)
+
+
+def test_large_batches_use_the_fallback(trained):
+    model, _, _, X = trained
+    forest = compile_model(model, max_rows=100)
+    assert isinstance(forest, CompiledForest)
+    assert forest.fallback is model
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    assert compile_model(model, backend='sklearn') is model
+
+
+def test_artifact_round_trip(trained, tmp_path):
+    model, pipeline, scaler, X = trained
+    forest = CompiledForest.from_sklearn(model)
+    path = str(tmp_path / 'model.bin')
+    size = save_artifact(path, forest, pipeline, scaler, metadata={'source': 'test'})
+
+    artifact = load_artifact(path)
+    assert artifact.nbytes == size
+    assert artifact.metadata == {'source': 'test'}
+    assert artifact.features == FEATURES
+    artifact.validate(pipeline)
+    assert np.array_equal(artifact.vocabulary('geo'), np.asarray(pipeline.geo_encoder.classes_).astype(str))
+    assert np.array_equal(artifact.vocabulary('device'), np.asarray(pipeline.device_encoder.classes_).astype(str))
+    # float32 thresholds route float32 rows exactly as the float64 ones
+    assert np.array_equal(artifact.forest.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(artifact.forest.predict(X), model.predict(X))
+    assert np.allclose(artifact.scale(X), scaler.transform(X.astype(np.float64)))
+
+
+def test_artifact_rejects_other_files(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    with open(path, 'wb') as f:
+        f.write(b'not a model artifact at all')
+    with pytest.raises(ValueError):
+        load_artifact(path)
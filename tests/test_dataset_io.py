@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+from dataset_io import (TRAINING_COLUMNS, compact_dtypes, iter_dataset, iter_dataset_batches, read_dataset,
+                        write_dataset)
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+FORMATS = ['csv', 'parquet', 'feather']
+
+
+@pytest.fixture(scope='module')
+def sample():
+    return compact_dtypes(pd.read_csv(SAMPLE, nrows=1000))
+
+
+def needs_pyarrow(file_format):
+    if file_format != 'csv':
+        pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_round_trip(tmp_path, sample, file_format):
+    needs_pyarrow(file_format)
+    path = str(tmp_path / f'logins.{file_format}')
+    write_dataset(sample, path)
+    pd.testing.assert_frame_equal(read_dataset(path), sample)
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_round_trip_columns(tmp_path, sample, file_format):
+    needs_pyarrow(file_format)
+    path = str(tmp_path / f'logins.{file_format}')
+    write_dataset(sample, path)
+    pd.testing.assert_frame_equal(read_dataset(path, columns=TRAINING_COLUMNS), sample[TRAINING_COLUMNS])
+    with pytest.raises(KeyError):
+        read_dataset(path, columns=TRAINING_COLUMNS + ['no_such_column'])
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_chunks_match_whole_read(tmp_path, sample, file_format):
+    needs_pyarrow(file_format)
+    path = str(tmp_path / f'logins.{file_format}')
+    write_dataset(sample, path)
+    chunks = list(iter_dataset(path, chunk_size=300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    # Categories are per chunk, so compare the values
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True).astype(object),
+                                  sample.astype(object))
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'feather'])
+def test_batches_resume_after_skipped_rows(tmp_path, sample, file_format):
+    needs_pyarrow(file_format)
+    path = str(tmp_path / f'logins.{file_format}')
+    write_dataset(sample, path)
+    rest = pd.concat(iter_dataset_batches(path, batch_size=256, skip_rows=700), ignore_index=True)
+    pd.testing.assert_frame_equal(rest.astype(object), sample.iloc[700:].reset_index(drop=True).astype(object))
+
+
+def test_up_to_date_columnar_copy_is_preferred(tmp_path, sample):
+    pytest.importorskip('pyarrow')
+    csv_path = str(tmp_path / 'logins.csv')
+    write_dataset(sample, csv_path)
+    write_dataset(sample.iloc[:10], str(tmp_path / 'logins.parquet'))
+    assert len(read_dataset(csv_path)) == 10
+    assert len(read_dataset(csv_path, prefer_columnar=False)) == len(sample)
+
+    # A CSV changed after the conversion is read itself
+    os.utime(csv_path, (os.path.getmtime(csv_path) + 10,) * 2)
+    assert len(read_dataset(csv_path)) == len(sample)
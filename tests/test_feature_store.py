@@ -0,0 +1,124 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+from feature_store import FrequencyFeatureStore
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+FIELDS = ['user_id', 'device_id', 'geo_location']
+
+
+@pytest.fixture(scope='module')
+def logins():
+    return pd.read_csv(SAMPLE, usecols=FIELDS)
+
+
+def login(user, device='d1', location='France'):
+    return {'user_id': user, 'device_id': device, 'geo_location': location}
+
+
+def copy(store):
+    return FrequencyFeatureStore.from_state(store.get_state())
+
+
+def test_observe_counts_each_login_before_reading(logins):
+    store = FrequencyFeatureStore()
+    features = store.observe([login('a'), login('a'), login('b'), login('a', location='Japan')])
+    assert features['user_login_frequency'] == [1, 2, 1, 3]
+    assert features['device_login_frequency'] == [1, 2, 3, 4]
+    assert features['location_login_frequency'] == [1, 2, 3, 1]
+
+    # Over a whole dataset, the last login of every key sees its training value_counts()
+    store = FrequencyFeatureStore()
+    store.observe(logins.to_dict('records'))
+    for entity, (field, _) in FrequencyFeatureStore.ENTITIES.items():
+        expected = logins[field].value_counts()
+        assert {key: store.lookup(entity, key) for key in expected.index} == expected.to_dict()
+
+
+def test_fit_matches_training_counts(logins):
+    store = FrequencyFeatureStore().fit(logins)
+    counts = logins['device_id'].value_counts()
+    assert store.counts_for('device', counts.index[:50]).tolist() == counts.iloc[:50].tolist()
+    # Unseen keys count as 1, like a first login
+    assert store.counts_for('device', ['never-seen']).tolist() == [1]
+    assert store.lookup('device', 'never-seen') == 0
+
+
+def test_missing_fields_are_not_counted():
+    store = FrequencyFeatureStore()
+    features = store.observe([{'user_id': 'a'}, {'user_id': 'a', 'device_id': None}])
+    assert features['user_login_frequency'] == [1, 2]
+    assert features['device_login_frequency'] == [1, 1]
+    assert store.stats()['device']['keys'] == 0
+
+
+def test_least_recently_seen_keys_are_evicted():
+    store = FrequencyFeatureStore(max_keys=2)
+    store.observe([login('a'), login('b'), login('a'), login('c')])
+    assert store.lookup('user', 'b') == 0
+    assert store.lookup('user', 'a') == 2
+    assert store.lookup('user', 'c') == 1
+    assert store.stats()['user']['evicted'] == 1
+
+    # Bootstrapping keeps the most frequent keys
+    fitted = FrequencyFeatureStore(max_keys=1).fit_counts({
+        'user_id': pd.Series({'rare': 1, 'common': 5}), 'device_id': pd.Series(dtype=int),
+        'geo_location': pd.Series(dtype=int)
+    })
+    assert fitted.lookup('user', 'common') == 5
+    assert fitted.lookup('user', 'rare') == 0
+    assert fitted.stats()['user']['evicted'] == 1
+
+
+def test_merged_forks_equal_sequential_counting(logins):
+    records = logins.to_dict('records')
+    base = FrequencyFeatureStore().fit(logins.iloc[:4000])
+    sequential = copy(base)
+    sequential.observe(records[4000:])
+
+    forks = [copy(base), copy(base), copy(base)]
+    for i, fork in enumerate(forks):
+        fork.observe(records[4000 + i * 2000:4000 + (i + 1) * 2000])
+    base.merge_forks(forks)
+    for entity in FrequencyFeatureStore.ENTITIES:
+        assert {key: entry[0] for key, entry in base.counts[entity].items()} == \
+            {key: entry[0] for key, entry in sequential.counts[entity].items()}
+
+
+def test_merge_forks_respects_max_keys():
+    base = FrequencyFeatureStore(max_keys=3)
+    base.observe([login('a')])
+    forks = [copy(base), copy(base)]
+    forks[0].observe([login('b'), login('c')])
+    forks[1].observe([login('d'), login('d')])
+    base.merge_forks(forks)
+    assert len(base.counts['user']) == 3
+    assert base.lookup('user', 'd') == 2
+
+
+def test_decayed_counts():
+    store = FrequencyFeatureStore(half_life_days=1)
+    day = 86400
+    store.observe([login('a')], timestamps=[0])
+    features = store.observe([login('a')], timestamps=[day])
+    # One login a half-life ago plus the current one
+    assert features['user_login_frequency'] == [1.5]
+    store.observe([login('a')], timestamps=[3 * day], decayed=False)
+    assert store.counts['user']['a'][0] == 3
+    assert store.counts['user']['a'][1] == pytest.approx(1.5 * 0.25 + 1)
+    assert store.lookup('user', 'a', decayed=False) == 3
+
+
+def test_snapshot_round_trip(tmp_path, logins):
+    store = FrequencyFeatureStore(max_keys=500, half_life_days=7).fit(logins)
+    path = str(tmp_path / 'store.pkl')
+    store.save(path)
+    restored = FrequencyFeatureStore.load(path)
+    assert isinstance(restored, FrequencyFeatureStore)
+    assert restored.max_keys == 500 and restored.half_life_days == 7
+    assert restored.get_state() == store.get_state()
@@ -0,0 +1,72 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def history(api, records, flush_history):
+    """
+    Ten predictions of one user and ten of another, stored
+    """
+    client = api.app.test_client()
+    client.post('/predict/batch', json=[dict(record, user_id='page-a') for record in records[:10]]
+                + [dict(record, user_id='page-b') for record in records[10:20]])
+    flush_history()
+    return client
+
+
+def test_cursor_pages_cover_every_row_once(history):
+    ids = []
+    cursor = None
+    while True:
+        url = '/predictions/history?user_id=page-a&limit=3&fields=id,user_id'
+        data = history.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        assert all(item['user_id'] == 'page-a' for item in data['items'])
+        ids += [item['id'] for item in data['items']]
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert len(ids) == 10
+    # Newest first, without gaps or repeats
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_ascending_order_offset_and_fields(history):
+    newest = history.get('/predictions/history?user_id=page-b&limit=10&fields=id').get_json()['items']
+    oldest = history.get('/predictions/history?user_id=page-b&limit=10&fields=id&order=asc').get_json()['items']
+    assert oldest == newest[::-1]
+    assert set(oldest[0]) == {'id'}
+    page = history.get('/predictions/history?user_id=page-b&limit=2&offset=4&fields=id&order=asc').get_json()
+    assert page['items'] == oldest[4:6]
+
+    item = history.get('/predictions/history?user_id=page-b&limit=1').get_json()['items'][0]
+    assert set(item) == {'id', 'timestamp', 'input_data', 'prediction'}
+    assert item['input_data']['user_id'] == 'page-b'
+    assert history.get('/predictions/history?fields=password').status_code == 400
+
+
+def test_filters_and_time_range(history):
+    page = history.get('/predictions/history?user_id=page-a&limit=100&fields=anomaly').get_json()
+    anomalies = sum(item['anomaly'] for item in page['items'])
+    filtered = history.get('/predictions/history?user_id=page-a&anomaly=1&limit=100').get_json()
+    assert filtered['count'] == anomalies
+    assert history.get('/predictions/history?user_id=page-a&since=2000-01-01T00:00:00Z').get_json()['count'] == 10
+    assert history.get('/predictions/history?user_id=page-a&until=0').get_json()['count'] == 0
+
+
+def test_etag_answers_304_until_history_changes(history, api, records, flush_history):
+    url = '/predictions/history?user_id=page-a&limit=5'
+    response = history.get(url)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    cached = history.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    # Another query has another tag
+    assert history.get(url + '&order=asc').headers['ETag'] != etag
+
+    history.post('/predict/batch', json=[dict(records[0], user_id='page-a')])
+    flush_history()
+    changed = history.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['count'] == 5
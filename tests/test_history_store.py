@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'api'))
+from history_store import PredictionHistoryStore
+
+
+def prediction(i, user_id='u1', anomaly=0, timestamp=None):
+    record = {
+        'input_data': {'user_id': user_id, 'geo_location': 'France', 'device_id': f'd{i}'},
+        'prediction': {'anomaly': anomaly, 'probability_anomaly': 0.9 if anomaly else 0.1}
+    }
+    if timestamp:
+        record['timestamp'] = timestamp
+    return record
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PredictionHistoryStore(str(tmp_path / 'history.db'), max_records=None, compact_interval=0)
+    yield store
+    store.close()
+
+
+def test_append_and_load_in_order(store):
+    store.append([prediction(i) for i in range(5)])
+    store.append([prediction(5, timestamp='2025-01-02T03:04:05')])
+    records = store.load()
+    assert [record['input_data']['device_id'] for record in records] == [f'd{i}' for i in range(6)]
+    assert records[-1]['timestamp'] == '2025-01-02T03:04:05'
+    assert [record['input_data']['device_id'] for record in store.load(limit=2)] == ['d4', 'd5']
+    assert store.last_id() == 6
+
+
+def test_concurrent_appends_keep_every_row(store):
+    def append(thread):
+        for i in range(20):
+            store.append([prediction(i, user_id=f'thread-{thread}')])
+
+    threads = [threading.Thread(target=append, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for thread in range(4):
+        assert len(store.query(filters={'user_id': f'thread-{thread}'}, limit=100)[0]) == 20
+
+
+def test_second_process_sees_the_same_rows(store):
+    store.append([prediction(i) for i in range(3)])
+    other = PredictionHistoryStore(store.db_path, max_records=None, compact_interval=0)
+    other.append([prediction(3)])
+    assert store.last_id() == 4
+    assert len(store.load()) == 4
+    other.close()
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / 'history.json'
+    legacy.write_text(json.dumps([prediction(i, timestamp='2024-05-01T10:00:00') for i in range(3)]))
+    db_path = str(tmp_path / 'history.db')
+    store = PredictionHistoryStore(db_path, compact_interval=0, legacy_json_path=str(legacy))
+    assert len(store.load()) == 3
+    store.close()
+    store = PredictionHistoryStore(db_path, compact_interval=0, legacy_json_path=str(legacy))
+    assert len(store.load()) == 3
+    store.close()
+
+
+def test_compaction_keeps_unread_rows(store):
+    store.max_records = 5
+    store.append([prediction(i) for i in range(10)])
+    store.mark_read('reader', 3)
+    # Rows 4 and later are unread, so only 1-3 can go
+    assert store.compact() == 3
+    assert len(store.load()) == 7
+    store.mark_read('reader', 10)
+    assert store.compact() == 2
+    assert [record['input_data']['device_id'] for record in store.load()] == [f'd{i}' for i in range(5, 10)]
+
+
+def test_consumers_refresh_before_compaction(store):
+    store.max_records = 2
+    store.append([prediction(i) for i in range(6)])
+    store.mark_read('reader', 0)
+    store.before_compact.append(lambda: store.mark_read('reader', store.last_id()))
+    assert store.compact() == 4
+
+
+def test_age_retention(store):
+    store.max_age_days = 1
+    old = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - 3 * 86400))
+    store.append([prediction(0, timestamp=old), prediction(1)])
+    assert store.compact() == 1
+    assert [record['input_data']['device_id'] for record in store.load()] == ['d1']
+
+
+def test_version_changes_with_writes_and_compaction(store):
+    store.append([prediction(i) for i in range(3)])
+    version = store.version()
+    assert store.version() == version
+    store.append([prediction(3)])
+    assert store.version() != version
+    version = store.version()
+    store.max_records = 1
+    store.compact()
+    assert store.version() != version
@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'api'))
+from history_writer import HistoryWriter
+
+
+class RecordingStore:
+    """
+    Stand-in history store that records each group commit, optionally waiting for a release first
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def append(self, records):
+        self.release.wait(10)
+        if self.fail:
+            raise OSError('disk full')
+        self.batches.append(list(records))
+
+
+def predictions(count, start=0):
+    return [{'input_data': {'user_id': f'u{i}'}, 'prediction': {'anomaly': 0}} for i in range(start, start + count)]
+
+
+def test_group_commits_in_submission_order():
+    store = RecordingStore()
+    writer = HistoryWriter(store, flush_interval=0.05, flush_size=4)
+    writer.start()
+    assert writer.submit(predictions(10)) == 10
+    writer.stop()
+    users = [record['input_data']['user_id'] for batch in store.batches for record in batch]
+    assert users == [f'u{i}' for i in range(10)]
+    assert all(len(batch) <= 4 for batch in store.batches)
+    assert all('timestamp' in record for batch in store.batches for record in batch)
+    metrics = writer.metrics()
+    assert metrics['enqueued'] == metrics['flushed'] == 10
+    assert metrics['flush_batches'] == len(store.batches)
+    assert not metrics['running']
+
+
+def test_full_queue_drops_and_counts():
+    store = RecordingStore()
+    store.release.clear()
+    writer = HistoryWriter(store, max_queue=5, flush_interval=0.01, flush_size=1)
+    writer.start()
+    # The writer holds one record while the store is blocked, so the queue fills at 5 more
+    writer.submit(predictions(1))
+    time.sleep(0.1)
+    assert writer.submit(predictions(8, start=1)) == 5
+    assert writer.metrics()['dropped'] == 3
+    assert writer.metrics()['queued'] == 5
+    store.release.set()
+    writer.stop()
+    assert writer.metrics()['flushed'] == 6
+
+
+def test_block_policy_waits_for_room():
+    store = RecordingStore()
+    store.release.clear()
+    writer = HistoryWriter(store, max_queue=1, flush_interval=0.01, flush_size=1, policy='block', block_timeout=2)
+    writer.start()
+    writer.submit(predictions(2))
+    time.sleep(0.1)
+    threading.Timer(0.2, store.release.set).start()
+    started = time.perf_counter()
+    assert writer.submit(predictions(1, start=2)) == 1
+    assert time.perf_counter() - started >= 0.1
+    writer.stop()
+    assert writer.metrics()['dropped'] == 0
+    assert writer.metrics()['flushed'] == 3
+
+
+def test_store_errors_are_counted_not_raised():
+    store = RecordingStore()
+    store.fail = True
+    writer = HistoryWriter(store, flush_interval=0.01)
+    writer.start()
+    writer.submit(predictions(3))
+    writer.stop()
+    metrics = writer.metrics()
+    assert metrics['flush_errors'] >= 1
+    assert metrics['dropped'] == 3
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        HistoryWriter(RecordingStore(), policy='spill')
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from benchmark_import_time import ENTRY_POINTS, check_entry_point, export_artifact
+
+# Budgets from scripts/benchmark_import_time.py, scaled for slower machines with IMPORT_TIME_BUDGET_SCALE
+BUDGET_SCALE = float(os.environ.get('IMPORT_TIME_BUDGET_SCALE', 1.0))
+
+
+def test_import_time_budgets():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifact = os.path.join(tmp_dir, 'model.bin')
+        export_artifact(artifact)
+        problems = []
+        for module, spec in ENTRY_POINTS.items():
+            total_ms, module_problems = check_entry_point(module, spec['budget_ms'] * BUDGET_SCALE,
+                                                          env={'MODEL_ARTIFACT': artifact})
+            print(f"{module}: {total_ms:.0f} ms")
+            problems.extend(module_problems)
+    assert not problems, '\n'.join(problems)
+
+
+if __name__ == "__main__":
+    test_import_time_budgets()
+    print("Import time budgets OK")
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'api'))
+from micro_batcher import MicroBatcher
+
+
+class RecordingScorer:
+    """
+    score_batch stand-in that doubles each item and records the batches it was called with
+    """
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+        if self.fail_on in items:
+            raise ValueError(f"cannot score {self.fail_on}")
+        return [item * 2 for item in items]
+
+
+def run(batcher, items):
+    """
+    Submit every item concurrently and return the results (exceptions in place)
+    """
+    async def main():
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        await batcher.stop()
+        return results
+    return asyncio.run(main())
+
+
+def test_concurrent_items_are_scored_in_batches():
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=8, max_wait_ms=50)
+    assert run(batcher, list(range(20))) == [item * 2 for item in range(20)]
+    assert [len(batch) for batch in scorer.batches] == [8, 8, 4]
+    assert [item for batch in scorer.batches for item in batch] == list(range(20))
+    metrics = batcher.metrics()
+    assert metrics['requests'] == 20 and metrics['batches'] == 3 and metrics['errors'] == 0
+    assert metrics['mean_batch_size'] == pytest.approx(20 / 3)
+    assert metrics['batch_size_histogram'] == {'3-4': 1, '5-8': 2}
+    assert metrics['queue_delay_ms']['count'] == 20
+
+
+def test_failing_batch_is_rescored_one_at_a_time():
+    scorer = RecordingScorer(fail_on=3)
+    batcher = MicroBatcher(scorer, max_batch_size=8, max_wait_ms=50)
+    results = run(batcher, list(range(6)))
+    assert [result for index, result in enumerate(results) if index != 3] == [0, 2, 4, 8, 10]
+    assert isinstance(results[3], ValueError)
+    # The failed batch, then each of its items alone
+    assert scorer.batches == [list(range(6))] + [[item] for item in range(6)]
+    assert batcher.metrics()['errors'] == 1
+
+
+def test_exception_results_fail_only_their_caller():
+    def score_batch(items):
+        return [KeyError(item) if item == 'bad' else item.upper() for item in items]
+
+    results = run(MicroBatcher(score_batch, max_batch_size=4, max_wait_ms=50), ['a', 'bad', 'c'])
+    assert results[0] == 'A' and results[2] == 'C'
+    assert isinstance(results[1], KeyError)
+
+
+def test_wrong_result_count_fails_every_item():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50)
+    results = run(batcher, [1, 2, 3])
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.metrics()['errors'] == 3
+
+
+def test_stop_scores_queued_items():
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=2, max_wait_ms=1000)
+
+    async def main():
+        batcher.start()
+        pending = [asyncio.ensure_future(batcher.submit(item)) for item in range(5)]
+        await asyncio.sleep(0)
+        await batcher.stop()
+        return [task.result() for task in pending]
+
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8]
+    assert batcher.metrics()['queued'] == 0
+
+
+def test_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MicroBatcher(RecordingScorer(), max_batch_size=0)
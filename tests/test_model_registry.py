@@ -0,0 +1,136 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'api'))
+from model_registry import MODEL_FILES, ModelRegistry, file_sha256
+from model_reloader import ModelReloader, ServingModel
+
+MODELS_DIR = os.path.join(ROOT, 'models')
+
+
+def model_files(tmp_path, label):
+    """
+    Stand-in model files whose content names the model they belong to
+    """
+    directory = tmp_path / f"files-{label}"
+    directory.mkdir()
+    for name in MODEL_FILES:
+        (directory / name).write_text(f"{label}:{name}")
+    return {name: str(directory / name) for name in MODEL_FILES}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'registry'))
+
+
+def test_publish_numbers_versions_and_records_digests(registry, tmp_path):
+    assert registry.versions() == [] and registry.current_version() is None
+    first = registry.publish(model_files(tmp_path, 'a'), metadata={'auc': 0.9})
+    second = registry.publish(model_files(tmp_path, 'b'), promote=False)
+    assert (first, second) == ('v0001', 'v0002')
+    assert registry.versions() == ['v0001', 'v0002']
+    # An unpromoted version is published but not served
+    assert registry.current_version() == 'v0001'
+
+    manifest = registry.manifest('v0001')
+    assert manifest['metadata'] == {'auc': 0.9}
+    files = registry.files('v0001')
+    assert sorted(files) == sorted(MODEL_FILES)
+    assert {name: file_sha256(path) for name, path in files.items()} == manifest['files']
+    with open(files['scaler.pkl']) as f:
+        assert f.read() == 'a:scaler.pkl'
+    assert not [name for name in os.listdir(registry.directory) if name.startswith('.staging')]
+
+
+def test_publish_needs_every_model_file(registry, tmp_path):
+    paths = model_files(tmp_path, 'a')
+    del paths['scaler.pkl']
+    with pytest.raises(ValueError):
+        registry.publish(paths)
+    assert registry.versions() == []
+
+
+def test_promote_and_roll_back(registry, tmp_path):
+    registry.publish(model_files(tmp_path, 'a'))
+    registry.publish(model_files(tmp_path, 'b'))
+    assert registry.current_version() == 'v0002'
+    registry.promote('v0001')
+    assert registry.current_version() == 'v0001'
+    with pytest.raises(ValueError):
+        registry.promote('v0042')
+    assert registry.current_version() == 'v0001'
+
+
+def stub_reloader(registry, broken=()):
+    """
+    A ModelReloader whose models are the content of their scaler.pkl; versions in broken fail to warm up
+    """
+    def load(version):
+        with open(registry.files(version)['scaler.pkl']) as f:
+            return ServingModel(version, pipeline=None, predictor=f.read())
+
+    def warm_up(serving):
+        if serving.version in broken:
+            raise RuntimeError(f"{serving.version} does not score")
+
+    return ModelReloader(load, warm_up, registry, interval=0)
+
+
+def test_reload_swaps_in_the_current_version(registry, tmp_path):
+    registry.publish(model_files(tmp_path, 'a'))
+    reloader = stub_reloader(registry)
+    assert reloader.reload()['status'] == 'reloaded'
+    assert reloader.active.predictor == 'a:scaler.pkl'
+    assert reloader.reload() == {'status': 'unchanged', 'version': 'v0001'}
+    assert reloader.reload(force=True)['status'] == 'reloaded'
+
+    registry.publish(model_files(tmp_path, 'b'))
+    result = reloader.reload()
+    assert (result['status'], result['version'], result['previous']) == ('reloaded', 'v0002', 'v0001')
+    assert reloader.active.predictor == 'b:scaler.pkl'
+
+    # Rolling back is promoting the older version again
+    registry.promote('v0001')
+    assert reloader.reload()['version'] == 'v0001'
+    assert reloader.active.predictor == 'a:scaler.pkl'
+    assert [entry['version'] for entry in reloader.status()['history']] == ['v0001', 'v0001', 'v0002', 'v0001']
+
+
+def test_failed_reload_keeps_the_active_model(registry, tmp_path):
+    registry.publish(model_files(tmp_path, 'a'))
+    reloader = stub_reloader(registry, broken={'v0002'})
+    reloader.reload()
+    registry.publish(model_files(tmp_path, 'b'))
+    result = reloader.reload()
+    assert result['status'] == 'failed' and result['version'] == 'v0001'
+    assert reloader.active.version == 'v0001'
+    assert reloader.last_error['version'] == 'v0002'
+    assert len(reloader.history) == 1
+    # A version missing from the registry fails the same way
+    assert reloader.reload('v0042')['status'] == 'failed'
+    assert reloader.active.predictor == 'a:scaler.pkl'
+
+
+def test_api_reloads_and_rolls_back_registry_versions(api, records):
+    client = api.app.test_client()
+    paths = {name: os.path.join(MODELS_DIR, name) for name in MODEL_FILES}
+    first = api.registry.publish(paths, metadata={'label': 'first'})
+    second = api.registry.publish(paths, metadata={'label': 'second'}, promote=False)
+
+    response = client.post('/admin/reload', json={'version': second, 'promote': True, 'wait': True})
+    assert response.status_code == 200 and response.get_json()['version'] == second
+    assert api.registry.current_version() == second
+    prediction = client.post('/predict', json=records[0]).get_json()
+    assert prediction['model_version'] == second
+
+    response = client.post('/admin/reload', json={'version': first, 'promote': True, 'wait': True})
+    assert response.get_json()['previous'] == second
+    status = client.get('/admin/model').get_json()
+    assert status['version'] == first and status['registry']['current'] == first
+    assert client.post('/predict', json=records[0]).get_json()['model_version'] == first
+    assert client.post('/admin/reload', json={'version': 'v9999', 'promote': True}).status_code == 404
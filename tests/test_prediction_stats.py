@@ -0,0 +1,125 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'api'))
+from history_store import PredictionHistoryStore
+from prediction_stats import PredictionStats, RollingCounter
+
+GEOS = ['France', 'Canada', 'Japan', None]
+
+
+def predictions(count, seed):
+    """
+    Predictions recorded at random times over the last ten days
+    """
+    generator = random.Random(seed)
+    now = time.time()
+    records = []
+    for _ in range(count):
+        recorded_at = now - generator.uniform(0, 10 * 86400)
+        records.append({
+            'timestamp': datetime.fromtimestamp(recorded_at).isoformat(),
+            'input_data': {'user_id': 'u1', 'geo_location': generator.choice(GEOS), 'device_id': 'd1'},
+            'prediction': {'anomaly': generator.choice([0, 0, 0, 1])}
+        })
+    return records
+
+
+def recount(store):
+    """
+    The stats computed from scratch over everything in the store
+    """
+    records = store.load()
+    anomalies = sum(record['prediction']['anomaly'] for record in records)
+    hourly = {hour: 0 for hour in range(24)}
+    geo = {}
+    for record in records:
+        hourly[datetime.fromisoformat(record['timestamp']).hour] += 1
+        location = record['input_data']['geo_location']
+        if location:
+            geo[location] = geo.get(location, 0) + 1
+    return {
+        'total_predictions': len(records),
+        'anomaly_count': anomalies,
+        'normal_count': len(records) - anomalies,
+        'hourly_distribution': hourly,
+        'geographic_distribution': geo
+    }
+
+
+def ages(store):
+    now = time.time()
+    return [now - datetime.fromisoformat(record['timestamp']).timestamp() for record in store.load()]
+
+
+def assert_matches_recount(summary, store):
+    for key, value in recount(store).items():
+        assert summary[key] == value, key
+    # The 7-day window counts whole hourly buckets, so rows in its oldest hour may or may not be in it
+    week = summary['windows']['7d']['total']
+    assert sum(age < 7 * 86400 - 3600 for age in ages(store)) <= week <= sum(age < 7 * 86400 for age in ages(store))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PredictionHistoryStore(str(tmp_path / 'history.db'), max_records=None, compact_interval=0)
+    yield store
+    store.close()
+
+
+def test_incremental_stats_match_a_recount(store):
+    stats = PredictionStats(store)
+    for seed in range(5):
+        store.append(predictions(200, seed))
+        assert_matches_recount(stats.summary(), store)
+
+
+def test_snapshot_resumes_from_the_last_row(store, tmp_path):
+    snapshot = str(tmp_path / 'stats.json')
+    stats = PredictionStats(store, snapshot_path=snapshot)
+    store.append(predictions(300, 1))
+    stats.refresh()
+    stats.save_snapshot()
+
+    store.append(predictions(100, 2))
+    restored = PredictionStats(store, snapshot_path=snapshot)
+    assert restored.last_id == 300
+    assert_matches_recount(restored.summary(), store)
+
+
+def test_totals_survive_compaction(store):
+    stats = PredictionStats(store)
+    store.before_compact.append(stats.refresh)
+    store.append(predictions(100, 3))
+    store.max_records = 10
+    store.compact()
+    assert len(store.load()) == 10
+    assert stats.summary()['total_predictions'] == 100
+
+
+def test_recreated_store_is_recounted(store, tmp_path):
+    stats = PredictionStats(store)
+    store.append(predictions(50, 4))
+    stats.refresh()
+    fresh = PredictionHistoryStore(str(tmp_path / 'other.db'), max_records=None, compact_interval=0)
+    fresh.append(predictions(20, 5))
+    stats.store = fresh
+    assert stats.summary()['total_predictions'] == 20
+    fresh.close()
+
+
+def test_rolling_counter_expires_old_buckets():
+    counter = RollingCounter(window_seconds=60, bucket_seconds=10)
+    counter.add(1000, 1, now=1000)
+    counter.add(1035, 0, now=1035)
+    assert counter.counts(now=1040) == {'total': 2, 'anomaly_count': 1}
+    assert counter.counts(now=1065) == {'total': 1, 'anomaly_count': 0}
+    # Too old to count at all
+    counter.add(900, 1, now=1065)
+    assert counter.counts(now=1065) == {'total': 1, 'anomaly_count': 0}
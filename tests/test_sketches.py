@@ -0,0 +1,128 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+from feature_store import FrequencyFeatureStore, SketchFrequencyStore
+from sketches import CountMinSketch, HyperLogLog
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+
+
+@pytest.fixture(scope='module')
+def logins():
+    return pd.read_csv(SAMPLE, usecols=['user_id', 'device_id', 'geo_location'])
+
+
+def test_count_min_never_undercounts(logins):
+    keys = logins['device_id'].to_numpy()
+    sketch = CountMinSketch.from_error(epsilon=1e-3, delta=1e-3)
+    sketch.add(keys)
+    exact = logins['device_id'].value_counts()
+    estimates = sketch.query(exact.index.to_numpy())
+    assert sketch.total == len(keys)
+    assert (estimates >= exact.to_numpy()).all()
+    assert (estimates - exact.to_numpy() <= sketch.error_bound).mean() > 0.99
+
+
+def test_count_min_weighted_adds_and_merge(logins):
+    counts = logins['user_id'].value_counts()
+    weighted = CountMinSketch(width=4096, depth=4)
+    weighted.add(counts.index.to_numpy(), counts.to_numpy())
+    halves = [CountMinSketch(width=4096, depth=4), CountMinSketch(width=4096, depth=4)]
+    halves[0].add(logins['user_id'].to_numpy()[:5000])
+    halves[1].add(logins['user_id'].to_numpy()[5000:])
+    merged = halves[0].merge(halves[1])
+    assert np.array_equal(merged.table, weighted.table)
+    assert merged.total == weighted.total == len(logins)
+    with pytest.raises(ValueError):
+        merged.merge(CountMinSketch(width=1024, depth=4))
+
+
+def test_hyperloglog_estimate_and_union():
+    keys = np.array([f'key-{i}' for i in range(20000)], dtype=object)
+    left, right = HyperLogLog(precision=12), HyperLogLog(precision=12)
+    left.add(keys[:12000])
+    right.add(keys[8000:])
+    tolerance = 4 * left.relative_error
+    assert abs(left.count() - 12000) / 12000 < tolerance
+    assert abs(left.merge(right).count() - 20000) / 20000 < tolerance
+    # Adding keys again does not change the estimate
+    estimate = left.count()
+    left.add(keys[:100])
+    assert left.count() == estimate
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(precision=10))
+
+
+def test_sketch_store_overestimates_exact_counts(logins):
+    records = logins.to_dict('records')
+    exact = FrequencyFeatureStore()
+    sketch = SketchFrequencyStore(epsilon=1e-3)
+    for start in range(0, len(records), 1000):
+        batch = records[start:start + 1000]
+        exact_features = exact.observe(batch)
+        sketch_features = sketch.observe(batch)
+        for column, values in exact_features.items():
+            # A batch is added before it is read, so rows see at least their exact count
+            assert (np.asarray(sketch_features[column]) >= np.asarray(values)).all()
+    for entity, (field, _) in SketchFrequencyStore.ENTITIES.items():
+        expected = logins[field].value_counts()
+        estimates = sketch.counts_for(entity, expected.index.to_numpy())
+        assert (estimates >= expected.to_numpy()).all()
+        assert (estimates - expected.to_numpy()).max() <= 2 * sketch.sketches[entity].error_bound
+
+
+def test_sketch_store_merges(logins):
+    records = logins.to_dict('records')
+    whole = SketchFrequencyStore(epsilon=1e-3).fit(logins.iloc[:4000])
+    whole.observe(records[4000:])
+
+    base = SketchFrequencyStore(epsilon=1e-3).fit(logins.iloc[:4000])
+    forks = [SketchFrequencyStore.from_state(base.get_state()) for _ in range(3)]
+    for i, fork in enumerate(forks):
+        fork.observe(records[4000 + i * 2000:4000 + (i + 1) * 2000])
+    base.merge_forks(forks)
+    for entity, sketch in base.sketches.items():
+        assert np.array_equal(sketch.table, whole.sketches[entity].table)
+        assert sketch.total == whole.sketches[entity].total
+    for user_id in logins['user_id'].unique()[:50]:
+        assert base.distinct_count(user_id, 'devices') == whole.distinct_count(user_id, 'devices')
+
+    # Independent stores merge by adding their counts
+    first = SketchFrequencyStore(epsilon=1e-3).fit(logins.iloc[:5000])
+    second = SketchFrequencyStore(epsilon=1e-3).fit(logins.iloc[5000:])
+    everything = SketchFrequencyStore(epsilon=1e-3).fit(logins)
+    first.merge(second)
+    for entity, sketch in first.sketches.items():
+        assert np.array_equal(sketch.table, everything.sketches[entity].table)
+
+
+def test_distinct_counters_evict_least_recent_users():
+    store = SketchFrequencyStore(epsilon=1e-3, max_users=2)
+    store.observe([{'user_id': 'a', 'device_id': 'd1', 'geo_location': 'France'},
+                   {'user_id': 'b', 'device_id': 'd2', 'geo_location': 'France'}])
+    store.observe([{'user_id': 'a', 'device_id': 'd3', 'geo_location': 'Japan'}])
+    store.observe([{'user_id': 'c', 'device_id': 'd4', 'geo_location': 'France'}])
+    assert list(store.distinct) == ['a', 'c']
+    assert store.distinct_count('a', 'devices') == 2
+    assert store.distinct_count('a', 'locations') == 2
+    assert store.distinct_count('b', 'devices') == 0
+
+
+def test_sketch_store_state_round_trip(tmp_path, logins):
+    store = SketchFrequencyStore(epsilon=1e-3).fit(logins)
+    path = str(tmp_path / 'sketch.pkl')
+    store.save(path)
+    # Snapshots of either backend load through FrequencyFeatureStore.load
+    restored = FrequencyFeatureStore.load(path)
+    assert isinstance(restored, SketchFrequencyStore)
+    keys = logins['device_id'].unique()[:100]
+    assert np.array_equal(restored.counts_for('device', keys), store.counts_for('device', keys))
+    assert restored.distinct_count('U9401', 'devices') == store.distinct_count('U9401', 'devices')
+    with pytest.raises(ValueError):
+        restored.observe([{'user_id': 'a'}], decayed=True)
@@ -0,0 +1,88 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+from timestamp_decoder import TIME_FEATURES, TimestampDecoder
+
+SAMPLE = os.path.join(ROOT, 'data', 'sample_dataset.csv')
+
+
+def expected_columns(values, **kwargs):
+    """
+    The time features as the original pipeline computed them, through pd.to_datetime
+    """
+    parsed = pd.to_datetime(pd.Series(values), **kwargs)
+    return {
+        'login_hour': parsed.dt.hour.tolist(),
+        'login_day': parsed.dt.day.tolist(),
+        'login_month': parsed.dt.month.tolist(),
+        'login_year': parsed.dt.year.tolist(),
+        'login_weekday': parsed.dt.weekday.tolist()
+    }
+
+
+def assert_columns(columns, expected):
+    assert list(columns) == TIME_FEATURES
+    for column in TIME_FEATURES:
+        assert columns[column].dtype == np.int32
+        assert columns[column].tolist() == expected[column], column
+
+
+@pytest.fixture(scope='module')
+def timestamps():
+    return pd.read_csv(SAMPLE, usecols=['timestamp'])['timestamp']
+
+
+def test_dataset_timestamps_match_pandas(timestamps):
+    assert_columns(TimestampDecoder().decode_array(timestamps), expected_columns(timestamps))
+
+
+def test_other_layouts_match_pandas(timestamps):
+    iso = timestamps.str.replace(' ', 'T')
+    assert_columns(TimestampDecoder().decode_array(iso), expected_columns(iso))
+    # The frontend's datetime-local input has no seconds
+    minutes = timestamps.str.slice(0, 16)
+    assert_columns(TimestampDecoder().decode_array(minutes), expected_columns(minutes))
+
+
+def test_mixed_and_irregular_strings_match_pandas():
+    values = ['2024-02-29 23:59:59', '2024-02-29T00:00', '2023-12-31 12:00:00.250', '2025-03-01',
+              ' 2025-01-05 08:30:00 ', '2025-01-05T08:30:00+05:00', '1999-12-31 23:59:59']
+    decoder = TimestampDecoder()
+    expected = expected_columns([value.strip()[:19] for value in values], format='ISO8601')
+    assert_columns(decoder.decode_array(np.array(values, dtype=object)), expected)
+    for index, value in enumerate(values):
+        assert decoder.decode(value) == tuple(expected[column][index] for column in TIME_FEATURES)
+
+
+def test_epoch_and_datetime_values():
+    epochs = np.array([0, 951782400, 1735689599.9, 1735689600])
+    expected = expected_columns(np.floor(epochs).astype(np.int64), unit='s')
+    decoder = TimestampDecoder()
+    assert_columns(decoder.decode_array(epochs), expected)
+    assert_columns(decoder.decode_array(pd.to_datetime(epochs.astype(np.int64), unit='s').to_numpy()),
+                   expected_columns(epochs.astype(np.int64), unit='s'))
+    assert decoder.decode(951782400) == (0, 29, 2, 2000, 1)
+    assert decoder.decode(datetime(2025, 8, 13, 3, 43)) == (3, 13, 8, 2025, 2)
+
+
+@pytest.mark.parametrize('value', ['not a time', '2025-13-01 00:00:00', '2025-02-30 10:00:00', '', None])
+def test_invalid_timestamps_raise(value):
+    decoder = TimestampDecoder()
+    with pytest.raises(ValueError):
+        decoder.decode(value)
+    with pytest.raises(ValueError):
+        decoder.decode_array(np.array(['2025-01-01 00:00:00', value], dtype=object))
+
+
+def test_invalid_numbers_raise():
+    with pytest.raises(ValueError):
+        TimestampDecoder().decode_array(np.array([0.0, np.nan]))
+    with pytest.raises(ValueError):
+        TimestampDecoder().decode_array(np.array(['2025-01-01', 'NaT'], dtype='datetime64[s]'))